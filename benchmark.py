@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+import gc
+import os
+import sys
+import json
+import time
+import resource
+import statistics
+import tracemalloc
+import argparse
+import tempfile
+import subprocess
+
+from sly import Lexer
+
+from c_lasse_trabalhora import (AnalisadorLexico, GeradorCodigo, AnalisadorDescendente,
+                                EmissorC, No, _compilar, compilar_codigo)
+
+def gerar_programa(n_instrucoes):
+    # Programa sintético com uma única natureza() de n instruções,
+    # parecido com o que o nosso gerador de código produz.
+    linhas = ['tunelVazio natureza() {', '    formigaInteira x = 0;']
+    for i in range(n_instrucoes):
+        linhas.append(f'    x = x + {i % 97};')
+    linhas.append('}')
+    return '\n'.join(linhas) + '\n'
+
+def gerar_programa_funcoes(n_instrucoes, por_funcao=100):
+    # Mesmo número de instruções, repartido em muitas funções pequenas.
+    linhas = []
+    for f in range(max(1, n_instrucoes // por_funcao)):
+        linhas.append(f'tunelVazio rotina{f}() {{')
+        linhas.append('    formigaInteira x = 0;')
+        for i in range(por_funcao):
+            linhas.append(f'    x = x + {i % 97};')
+        linhas.append('}')
+    linhas.append('tunelVazio natureza() { }')
+    return '\n'.join(linhas) + '\n'
+
+def pico_rss_kb():
+    # ru_maxrss de um filho herda o pico do pai no fork (Linux); VmHWM é
+    # zerado no exec, então mede só este processo.
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def tamanhos_ate(maximo):
+    tamanhos = []
+    n = 1000
+    while n <= maximo:
+        tamanhos.append(n)
+        n *= 10
+    return tamanhos
+
+def medir_emissao(args):
+    print(f"{'instruções':>12} {'tempo (s)':>10} {'µs/instr':>10}")
+    for n in tamanhos_ate(args.max):
+        codigo = gerar_programa(n)
+        inicio = time.perf_counter()
+        programa = GeradorCodigo().parse(AnalisadorLexico().tokenize(codigo))
+        EmissorC().emitir(programa)
+        decorrido = time.perf_counter() - inicio
+        print(f'{n:>12} {decorrido:>10.3f} {decorrido / n * 1e6:>10.2f}')
+
+def medir_pilha_uma_vez(n):
+    # Executado num processo próprio para que o pico de RSS seja só deste tamanho.
+    codigo = gerar_programa(n)
+    gerador = GeradorCodigo()
+    profundidade_maxima = 0
+
+    def tokens_observados():
+        nonlocal profundidade_maxima
+        for tok in AnalisadorLexico().tokenize(codigo):
+            profundidade_maxima = max(profundidade_maxima, len(gerador.statestack))
+            yield tok
+
+    gerador.parse(tokens_observados())
+    rss_kb = pico_rss_kb()
+    print(json.dumps({'n': n, 'pilha': profundidade_maxima, 'rss_kb': rss_kb}))
+
+def medir_pilha(args):
+    if args.tamanho:
+        medir_pilha_uma_vez(args.tamanho)
+        return
+
+    print(f"{'instruções':>12} {'pilha máx.':>10} {'pico RSS (MB)':>14}")
+    for n in tamanhos_ate(args.max):
+        saida = subprocess.run([sys.executable, __file__, 'pilha', '--tamanho', str(n)],
+                               capture_output=True, text=True, check=True).stdout
+        r = json.loads(saida)
+        print(f"{r['n']:>12} {r['pilha']:>10} {r['rss_kb'] / 1024:>14.1f}")
+
+def contar_nos(raiz):
+    total = 0
+    pendentes = [raiz]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, list):
+            pendentes.extend(item)
+        elif isinstance(item, No):
+            total += 1
+            pendentes.extend(getattr(item, campo) for campo in item.__slots__)
+    return total
+
+def medir_memoria(args):
+    # Memória da AST dividida pelo número de nós: inclui os próprios nós,
+    # as listas de instruções e os nomes/literais que eles referenciam.
+    print(f"{'instruções':>12} {'nós':>10} {'AST (MB)':>10} {'bytes/nó':>10}")
+    for n in tamanhos_ate(args.max):
+        codigo = gerar_programa(n)
+        tracemalloc.start()
+        antes = tracemalloc.get_traced_memory()[0]
+        programa = GeradorCodigo().parse(AnalisadorLexico().tokenize(codigo))
+        depois = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        nos = contar_nos(programa)
+        print(f'{n:>12} {nos:>10} {(depois - antes) / 2**20:>10.1f} {(depois - antes) / nos:>10.1f}')
+        del programa
+
+def medir_fluxo_uma_vez(caminho, modo):
+    lexico = AnalisadorLexico()
+    if modo == 'fluxo':
+        tokens = lexico.tokenizar_arquivo(caminho)
+    else:
+        with open(caminho, encoding='utf-8') as f:
+            tokens = lexico.tokenize(f.read())
+    total = sum(1 for _ in tokens)
+    rss_kb = pico_rss_kb()
+    print(json.dumps({'tokens': total, 'rss_kb': rss_kb}))
+
+def medir_fluxo(args):
+    if args.arquivo:
+        medir_fluxo_uma_vez(args.arquivo, args.modo)
+        return
+
+    print(f"{'instruções':>12} {'fonte (MB)':>10} {'RSS read()':>11} {'RSS fluxo':>10}")
+    for n in tamanhos_ate(args.max):
+        with tempfile.NamedTemporaryFile('w', suffix='.formiga', delete=False) as f:
+            f.write(gerar_programa(n))
+        rss = {}
+        for modo in ('inteiro', 'fluxo'):
+            saida = subprocess.run([sys.executable, __file__, 'fluxo', '--arquivo', f.name,
+                                    '--modo', modo],
+                                   capture_output=True, text=True, check=True).stdout
+            rss[modo] = json.loads(saida)['rss_kb'] / 1024
+        tamanho = os.path.getsize(f.name) / 2**20
+        os.unlink(f.name)
+        print(f"{n:>12} {tamanho:>10.1f} {rss['inteiro']:>9.1f}MB {rss['fluxo']:>8.1f}MB")
+
+def medir_escrita(args):
+    if args.arquivo:
+        _compilar(args.arquivo, AnalisadorLexico(), GeradorCodigo())
+        print(json.dumps({'rss_kb': pico_rss_kb()}))
+        return
+
+    print(f"{'instruções':>12} {'RSS 1 função':>13} {'RSS funções de 100':>19}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'programa.formiga')
+        for n in tamanhos_ate(args.max):
+            rss = []
+            for gerar in (gerar_programa, gerar_programa_funcoes):
+                with open(caminho, 'w') as f:
+                    f.write(gerar(n))
+                saida = subprocess.run([sys.executable, __file__, 'escrita', '--arquivo', caminho],
+                                       capture_output=True, text=True, check=True).stdout
+                rss.append(json.loads(saida)['rss_kb'] / 1024)
+            print(f"{n:>12} {rss[0]:>11.1f}MB {rss[1]:>17.1f}MB")
+
+# --- Vazão do lexer ----------------------------------------------------
+# A base guarda, por corpus, quantas vezes o nosso tokenize() é mais
+# rápido que o sly.Lexer.tokenize original, medido na mesma execução e na
+# mesma máquina: tokens/s absolutos mudam de uma máquina para outra.
+ARQUIVO_BASE_LEXER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'benchmark_lexer_base.json')
+
+PALAVRAS_CHAVE = ['formigaInteira', 'formigaFlutuante', 'formigaFlutuante^2', 'formigaLetra',
+                  'formigaSentinela', 'formigaAncia', 'formigaLarva', 'operario', 'tunelVazio',
+                  'vigia', 'descansa', 'seObstaculo', 'senaoCavar', 'senaoSeOutroObstaculo',
+                  'enquantoHouverComida', 'marchar', 'cavarAteEnquanto', 'inspecionarTunel',
+                  'caminho', 'retornarAoNinho', 'ignorarFolha', 'sinalizar', 'colonia',
+                  'construir', 'descansar']
+
+def _corpus(gerar_linha, tamanho):
+    linhas = []
+    total = 0
+    i = 0
+    while total < tamanho:
+        linha = gerar_linha(i)
+        linhas.append(linha)
+        total += len(linha) + 1
+        i += 1
+    return '\n'.join(linhas) + '\n'
+
+def corpora_lexer(tamanho):
+    # Textos sintéticos e determinísticos; o lexer não exige que sejam
+    # programas válidos.
+    return {
+        'palavras-chave': _corpus(
+            lambda i: '    ' + ' '.join(PALAVRAS_CHAVE[(i + k) % len(PALAVRAS_CHAVE)] for k in range(6)),
+            tamanho),
+        'identificadores': _corpus(
+            lambda i: f'    carga_{i % 1000} = peso{i % 37} + total_formigas_{i % 11} * fator;',
+            tamanho),
+        'numeros': _corpus(
+            lambda i: f'    {i} + {i % 97},{i % 10} - {i * 7 % 1000}.25 * {i % 13};',
+            tamanho),
+        'comentarios': _corpus(
+            lambda i: (f'    /* bloco {i}\n       segue aqui */ x = {i}; // linha {i}'
+                       if i % 2 else f'    // só comentário {i}'),
+            tamanho),
+    }
+
+def _tempo_tokenize(tokenize, texto):
+    # Sem o coletor de lixo, como no timeit: uma coleta a mais numa das
+    # versões pesaria mais que a diferença entre elas.
+    lexico = AnalisadorLexico()
+    gc.disable()
+    try:
+        inicio = time.perf_counter()
+        total = sum(1 for _ in tokenize(lexico, texto))
+        return time.perf_counter() - inicio, total
+    finally:
+        gc.enable()
+
+def medir_lexer(args):
+    print(f"{'corpus':<16} {'tokens':>9} {'Mtokens/s':>10} {'MB/s':>7} {'sly':>7} "
+          f"{'ganho':>6} {'base':>6} {'variação':>9}")
+    base = {}
+    if os.path.exists(ARQUIVO_BASE_LEXER):
+        with open(ARQUIVO_BASE_LEXER) as f:
+            base = json.load(f)
+
+    resultados = {}
+    regressao = False
+    for nome, texto in corpora_lexer(args.tamanho).items():
+        # As duas versões se alternam, e o ganho é a mediana das razões de
+        # cada par: uma variação da máquina durante a medição atinge as
+        # duas medidas do par.
+        melhor = referencia = float('inf')
+        razoes = []
+        for _ in range(args.repeticoes):
+            tempo, total = _tempo_tokenize(AnalisadorLexico.tokenize, texto)
+            tempo_sly, _ = _tempo_tokenize(Lexer.tokenize, texto)
+            razoes.append(tempo_sly / tempo)
+            melhor = min(melhor, tempo)
+            referencia = min(referencia, tempo_sly)
+        ganho = statistics.median(razoes)
+        resultados[nome] = ganho
+        linha = (f'{nome:<16} {total:>9} {total / melhor / 1e6:>10.3f} '
+                 f'{len(texto) / melhor / 2**20:>7.2f} {total / referencia / 1e6:>7.3f} '
+                 f'{ganho:>5.2f}x')
+        if nome in base:
+            variacao = ganho / base[nome] - 1
+            linha += f' {base[nome]:>5.2f}x {variacao:>+8.1%}'
+            if variacao < -args.tolerancia:
+                linha += '  REGRESSÃO'
+                regressao = True
+        print(linha)
+
+    if args.salvar_base:
+        with open(ARQUIVO_BASE_LEXER, 'w') as f:
+            json.dump(resultados, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f'Base salva em {ARQUIVO_BASE_LEXER}')
+    elif regressao:
+        sys.exit(1)
+
+# --- Despacho: cadeia de seObstaculo vs. switch ------------------------
+def gerar_programa_despacho(ramos, iteracoes):
+    # Um laço que escolhe, a cada volta, um de 'ramos' tratamentos pela
+    # cadeia seObstaculo (op == 0) ... senaoSeOutroObstaculo (op == n).
+    linhas = ['colonia Despacho;', 'tunelVazio natureza() {',
+              '    formigaAncia total = 0;', '    formigaInteira estado = 1;',
+              f'    marchar (formigaInteira i = 0; i < {iteracoes}; i = i + 1) {{',
+              '        estado = (estado * 1103 + 12345) % 65536;',
+              f'        formigaInteira op = estado % {ramos};']
+    for r in range(ramos):
+        palavra = 'seObstaculo' if r == 0 else '} senaoSeOutroObstaculo'
+        linhas.append(f'        {palavra} (op == {r}) {{')
+        linhas.append(f'            total = total + (i % {r + 3}) * {r + 1};')
+    linhas += ['        }', '    }', '    sinalizar(total);', '}']
+    return '\n'.join(linhas) + '\n'
+
+def medir_despacho(args):
+    # -O0 e -O1 do nosso compilador, cada um passado pelo compilador C com
+    # cada conjunto de flags. O gcc converte sozinho cadeias simples a
+    # partir do -O1 (passagem if-to-switch); sem otimização, não.
+    cc = os.environ.get('CC', 'cc')
+    print(f"{'flags C':<10} {'ramos':>6} {'-O0 (s)':>9} {'-O1 (s)':>9} {'ganho':>7}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for cflags, ramos in ((c, r) for c in args.cflags for r in args.ramos):
+            fonte = gerar_programa_despacho(ramos, args.iteracoes)
+            tempos = []
+            saidas = set()
+            for otimizacao in (0, 1):
+                caminho_c = os.path.join(diretorio, f'despacho{otimizacao}.c')
+                executavel = os.path.join(diretorio, f'despacho{otimizacao}')
+                with open(caminho_c, 'w') as f:
+                    f.write(compilar_codigo(fonte, otimizacao).codigo)
+                subprocess.run([cc, *cflags.split(), caminho_c, '-o', executavel], check=True)
+                melhor = float('inf')
+                for _ in range(args.repeticoes):
+                    inicio = time.perf_counter()
+                    saidas.add(subprocess.run([executavel], capture_output=True,
+                                              check=True).stdout)
+                    melhor = min(melhor, time.perf_counter() - inicio)
+                tempos.append(melhor)
+            if len(saidas) != 1:
+                sys.exit(f'ERRO: saídas diferentes com {ramos} ramos')
+            print(f'{cflags:<10} {ramos:>6} {tempos[0]:>9.3f} {tempos[1]:>9.3f} {tempos[0] / tempos[1]:>6.2f}x')
+
+# --- Parsers: SLY vs. descendente ---------------------------------------
+def corpora_parsers(n):
+    # Atribuições simples em muitas funções, e programas do gerador do teste
+    # diferencial (controle aninhado, expressões longas) até ~n instruções.
+    from diferencial import GeradorProgramas
+    gerados = []
+    k = 0
+    while sum(p.count(';') for p in gerados) < n:
+        gerados.append(GeradorProgramas(k).programa().replace('natureza', f'natureza{k}'))
+        k += 1
+    return {'atribuicoes': gerar_programa_funcoes(n), 'gerados': '\n'.join(gerados)}
+
+def medir_parsers(args):
+    # Só a análise sintática: os tokens são gerados antes, e as funções
+    # entregues ao callback são descartadas.
+    GeradorCodigo()
+    origem = 'cache' if GeradorCodigo.tabelas_do_cache else 'construídas'
+    print(f"Tabelas LALR do SLY ({origem}): {GeradorCodigo.tempo_construcao * 1000:.1f} ms; "
+          f"o descendente não monta nada.")
+    print(f"{'corpus':<12} {'instruções':>10} {'tokens':>9} {'sly (s)':>9} {'fast (s)':>9} "
+          f"{'ganho':>7}")
+    for n in tamanhos_ate(args.max):
+        for nome, codigo in corpora_parsers(n).items():
+            tokens = list(AnalisadorLexico().tokenize(codigo))
+            tempos = []
+            for classe in (GeradorCodigo, AnalisadorDescendente):
+                parser = classe()
+                melhor = float('inf')
+                for _ in range(args.repeticoes):
+                    inicio = time.perf_counter()
+                    parser.parse(iter(tokens), lambda declaracao: None)
+                    melhor = min(melhor, time.perf_counter() - inicio)
+                tempos.append(melhor)
+            print(f'{nome:<12} {n:>10} {len(tokens):>9} {tempos[0]:>9.3f} {tempos[1]:>9.3f} '
+                  f'{tempos[0] / tempos[1]:>6.2f}x')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do compilador C-lasse Trabalhadora')
+    sub = parser.add_subparsers(dest='comando')
+
+    emissao = sub.add_parser('emissao', help='tempo de compilação por número de instruções')
+    emissao.add_argument('--max', type=int, default=1_000_000,
+                         help='maior número de instruções a medir (padrão: 1000000)')
+    emissao.set_defaults(func=medir_emissao)
+
+    pilha = sub.add_parser('pilha', help='profundidade da pilha LALR e pico de RSS')
+    pilha.add_argument('--max', type=int, default=1_000_000,
+                       help='maior número de instruções a medir (padrão: 1000000)')
+    pilha.add_argument('--tamanho', type=int, help=argparse.SUPPRESS)
+    pilha.set_defaults(func=medir_pilha)
+
+    memoria = sub.add_parser('memoria', help='memória ocupada por nó da AST')
+    memoria.add_argument('--max', type=int, default=100_000,
+                         help='maior número de instruções a medir (padrão: 100000)')
+    memoria.set_defaults(func=medir_memoria)
+
+    fluxo = sub.add_parser('fluxo', help='pico de RSS do lexer: arquivo inteiro vs. em blocos')
+    fluxo.add_argument('--max', type=int, default=1_000_000,
+                       help='maior número de instruções a medir (padrão: 1000000)')
+    fluxo.add_argument('--arquivo', help=argparse.SUPPRESS)
+    fluxo.add_argument('--modo', help=argparse.SUPPRESS)
+    fluxo.set_defaults(func=medir_fluxo)
+
+    escrita = sub.add_parser('escrita', help='pico de RSS da compilação completa com saída em fluxo')
+    escrita.add_argument('--max', type=int, default=1_000_000,
+                         help='maior número de instruções a medir (padrão: 1000000)')
+    escrita.add_argument('--arquivo', help=argparse.SUPPRESS)
+    escrita.set_defaults(func=medir_escrita)
+
+    lexer = sub.add_parser('lexer', help='vazão do lexer (tokens/s e MB/s) e ganho sobre o '
+                                         'tokenize do SLY, comparado à base salva')
+    lexer.add_argument('--tamanho', type=int, default=2 * 2**20,
+                       help='tamanho de cada corpus em bytes (padrão: 2 MiB)')
+    lexer.add_argument('--repeticoes', type=int, default=5,
+                       help='repetições por corpus; vale o melhor tempo (padrão: 5)')
+    lexer.add_argument('--tolerancia', type=float, default=0.10,
+                       help='queda máxima aceita no ganho em relação à base (padrão: 0.10)')
+    lexer.add_argument('--salvar-base', action='store_true',
+                       help='grava os resultados como nova base')
+    lexer.set_defaults(func=medir_lexer)
+
+    despacho = sub.add_parser('despacho', help='tempo de execução de uma cadeia seObstaculo '
+                                               'com -O0 e transformada em switch com -O1')
+    despacho.add_argument('--ramos', type=int, nargs='+', default=[4, 16, 64],
+                          help='tamanhos da cadeia (padrão: 4 16 64)')
+    despacho.add_argument('--iteracoes', type=int, default=50_000_000,
+                          help='voltas do laço (padrão: 50000000)')
+    despacho.add_argument('--repeticoes', type=int, default=3,
+                          help='execuções de cada binário; vale o melhor tempo (padrão: 3)')
+    despacho.add_argument('--cflags', nargs='+', default=['-O0', '-O2'],
+                          help='conjuntos de flags do compilador C (padrão: -O0 -O2)')
+    despacho.set_defaults(func=medir_despacho)
+
+    parsers = sub.add_parser('parsers', help='tempo da análise sintática com o SLY e com o '
+                                             '--parser=fast')
+    parsers.add_argument('--max', type=int, default=100_000,
+                         help='maior número de instruções a medir (padrão: 100000)')
+    parsers.add_argument('--repeticoes', type=int, default=3,
+                         help='repetições por corpus; vale o melhor tempo (padrão: 3)')
+    parsers.set_defaults(func=medir_parsers)
+
+    args = parser.parse_args()
+    if not args.comando:
+        parser.print_help()
+        sys.exit(1)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
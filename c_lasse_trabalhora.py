@@ -1,14 +1,121 @@
 #!/usr/bin/env python3
 import sys
 import os
+import time
+import pickle
+import hashlib
+import argparse
+import json
+import math
+import re
+import tempfile
+import shutil
+import subprocess
+import io
+import threading
+import queue
+import socket
+import socketserver
+import signal
+import struct
+import array
+import concurrent.futures
+import cProfile
+import itertools
+import operator
+from types import GeneratorType
+import sly
 from sly import Lexer, Parser
 
+# Cadeias e comentários de bloco podem atravessar o limite entre dois
+# blocos lidos do arquivo. Esta expressão encontra os que estão completos
+# e, pelas duas últimas alternativas, o início de um que ficou aberto.
+_RE_FRONTEIRA = re.compile(r'"[^"]*"|/\*.*?\*/|//[^\n]*|/\*|"', re.DOTALL)
+TAMANHO_BLOCO = 1 << 20
+
+def _ultimo_espaco(texto, inicio, fim):
+    return max(texto.rfind('\n', inicio, fim), texto.rfind(' ', inicio, fim),
+               texto.rfind('\t', inicio, fim))
+
+def _ponto_de_corte(texto):
+    # Maior prefixo de texto que pode ser tokenizado sozinho: termina num
+    # espaço em branco que não está dentro de uma cadeia ou comentário e que
+    # vem antes de qualquer cadeia/comentário ainda aberto.
+    corte = 0
+    inicio = 0
+    for m in _RE_FRONTEIRA.finditer(texto):
+        espaco = _ultimo_espaco(texto, inicio, m.start())
+        if espaco >= 0:
+            corte = espaco + 1
+        if m.group() in ('"', '/*'):
+            return corte
+        inicio = m.end()
+    espaco = _ultimo_espaco(texto, inicio, len(texto))
+    return espaco + 1 if espaco >= 0 else corte
+
+def _converter_numero(texto):
+    # '2,5' e '2.5' viram float; só dígitos viram int.
+    if texto.isdigit():
+        return int(texto)
+    return float(texto.replace(',', '.'))
+
+# Erros léxicos e sintáticos são acumulados em vez de impressos na hora,
+# para que uma única compilação mostre todos eles. Cada um guarda a posição
+# (em caracteres) no arquivo; linha e coluna só são calculadas no fim,
+# relendo o fonte, para não pesar no caminho sem erros. Os da análise
+# semântica vêm da AST, que só conhece a linha.
+class Diagnostico:
+    __slots__ = ('categoria', 'mensagem', 'indice', 'linha', 'coluna')
+
+    def __init__(self, categoria, mensagem, indice, linha=None):
+        self.categoria = categoria
+        self.mensagem = mensagem
+        self.indice = indice  # None com linha None: fim do arquivo
+        self.linha = linha
+        self.coluna = None
+
+    def __str__(self):
+        if self.linha is None:
+            return f"{self.categoria}: {self.mensagem}"
+        posicao = self.linha if self.coluna is None else f"{self.linha}:{self.coluna}"
+        return f"{posicao}: {self.categoria}: {self.mensagem}"
+
+def _localizar(linhas, diagnosticos):
+    # Preenche linha/coluna a partir do índice percorrendo as linhas do
+    # fonte uma única vez.
+    pendentes = sorted((d for d in diagnosticos if d.indice is not None),
+                       key=lambda d: d.indice)
+    fim = [d for d in diagnosticos if d.indice is None and d.linha is None]
+    numero, inicio, linha = 0, 0, ''
+    for numero, linha in enumerate(linhas, 1):
+        while pendentes and pendentes[0].indice < inicio + len(linha):
+            d = pendentes.pop(0)
+            d.linha, d.coluna = numero, d.indice - inicio + 1
+        inicio += len(linha)
+    for d in pendentes + fim:
+        d.linha, d.coluna = max(numero, 1), len(linha.rstrip('\n')) + 1
+
+class ErroCompilacao(ValueError):
+    def __init__(self, arquivo, diagnosticos):
+        self.arquivo = arquivo
+        self.diagnosticos = diagnosticos
+        super().__init__(str(self))
+
+    def __str__(self):
+        linhas = [f"{self.arquivo}:{d}" for d in self.diagnosticos]
+        quantidade = len(self.diagnosticos)
+        linhas.append(f"ERRO: Compilação interrompida: {quantidade} "
+                      f"{'erro encontrado' if quantidade == 1 else 'erros encontrados'}.")
+        return '\n'.join(linhas)
+
+_inicio_construcao_lexico = time.perf_counter()
+
 class AnalisadorLexico(Lexer):
     tokens = {
         TIPO_INT, TIPO_FLOAT, TIPO_DOUBLE, TIPO_CHAR, TIPO_BOOL, TIPO_LONG,
         TIPO_SHORT, TIPO_UNSIGNED, TIPO_VOID, BOOL_TRUE, BOOL_FALSE,
-        IF, ELSE, ELSEIF, WHILE, FOR, DO, SWITCH, CASE, BREAK, CONTINUE,
-        PRINT,
+        IF, ELSE, ELSEIF, WHILE, FOR, PARALLEL_FOR, DO, SWITCH, CASE, BREAK, CONTINUE,
+        PRINT, RETURN, FILL, COPY, SUM,
 
         PROGRAMA, INICIO, FIM,
         
@@ -23,7 +130,7 @@ class AnalisadorLexico(Lexer):
     
     ignore_comment_line = r'//.*'
     
-    @_(r'/\*(.|\n)*?\*/')
+    @_(r'/\*[\s\S]*?\*/')
     def ignore_comment_block(self, t):
         self.lineno += t.value.count('\n')
 
@@ -45,7 +152,7 @@ class AnalisadorLexico(Lexer):
     DIVIDE = r'/'
     MODULO = r'%'
     
-    literals = { '(', ')', '{', '}', ';', ':', ',', '.' }
+    literals = { '(', ')', '{', '}', '[', ']', ';', ':', ',', '.' }
 
     STRING = r'\"[^"]*\"'
 
@@ -67,36 +174,516 @@ class AnalisadorLexico(Lexer):
     ID['senaoSeOutroObstaculo'] = ELSEIF
     ID['enquantoHouverComida'] = WHILE
     ID['marchar'] = FOR
+    ID['marcharJuntas'] = PARALLEL_FOR
     ID['cavarAteEnquanto'] = DO
     ID['inspecionarTunel'] = SWITCH
     ID['caminho'] = CASE
     ID['retornarAoNinho'] = BREAK
     ID['ignorarFolha'] = CONTINUE
     ID['sinalizar'] = PRINT
+    ID['entregar'] = RETURN
+    ID['preencher'] = FILL
+    ID['copiar'] = COPY
+    ID['somar'] = SUM
     ID['colonia'] = PROGRAMA
     ID['construir'] = INICIO
     ID['descansar'] = FIM
 
-    @_(r'\d+[,\.]\d+|\d+')
+    @_(r'\d+(?:[,\.]\d+)?')
     def NUMERO(self, t):
-        t.value = t.value.replace(',', '.')
-        t.value = float(t.value) if '.' in t.value else int(t.value)
+        t.value = _converter_numero(t.value)
         return t
 
     @_(r'\n+')
     def newline(self, t):
         self.lineno += len(t.value)
 
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.diagnosticos = []
+
     def error(self, t):
-        print(f"Erro Léxico: Caractere ilegal '{t.value[0]}' na linha {self.lineno}")
-        self.index += 1
+        # Uma sequência de caracteres ilegais vira um único diagnóstico.
+        cls = type(self)
+        fim = self.index + 1
+        while fim < len(self.text):
+            m = cls._re_rapida.match(self.text, fim)
+            if m.lastgroup != '_ilegal' or m.start('_ilegal') != fim:
+                break
+            fim += 1
+        trecho = self.text[self.index:fim]
+        mensagem = (f"Caractere ilegal '{trecho}'" if len(trecho) == 1
+                    else f"Caracteres ilegais '{trecho}'")
+        self.diagnosticos.append(Diagnostico('Erro Léxico', mensagem, self.index))
+        self.index = fim
+
+    def tokenize(self, text, lineno=1, index=0):
+        # Versão especializada do laço do SLY. Uma única expressão regular
+        # (veja _montar_regex_rapida) cobre espaços, tokens, literais e
+        # caracteres ilegais, e é percorrida com finditer em vez de um
+        # match() por token. ID/palavra-chave, NUMERO e quebras de linha são
+        # tratados aqui mesmo; as demais regras com função seguem o protocolo
+        # do SLY (self.index/self.lineno). Não há suporte a estados do lexer
+        # nem a mark/accept/reject, que esta linguagem não usa.
+        cls = type(self)
+        palavras_chave = cls._remapping.get('ID', {})
+        remapeamentos = cls._remapping
+        funcoes = cls._token_funcs
+        ignorados = cls._ignored_tokens
+        simples = cls._tokens_simples
+        Token = sly.lex.Token
+        self.text = text
+        try:
+            while True:
+                reinicio = None
+                for m in cls._re_rapida.finditer(text, index):
+                    tipo = m.lastgroup
+                    index = m.end()
+                    if tipo is None:
+                        continue  # espaços no fim do texto
+                    valor = m.group(tipo)
+                    if tipo == 'newline':
+                        lineno += len(valor)
+                        continue
+
+                    tok = Token()
+                    tok.lineno = lineno
+                    tok.index = m.start(tipo)
+                    tok.end = index
+                    if tipo == 'ID':
+                        tok.type = palavras_chave.get(valor, 'ID')
+                        tok.value = valor
+                        yield tok
+                        continue
+                    if tipo in simples:
+                        tok.type = tipo
+                        tok.value = valor
+                        yield tok
+                        continue
+                    if tipo == 'NUMERO':
+                        tok.type = tipo
+                        tok.value = _converter_numero(valor)
+                        yield tok
+                        continue
+                    if tipo == '_literal':
+                        tok.type = tok.value = valor
+                        yield tok
+                        continue
+                    if tipo == '_ilegal':
+                        self.index = tok.index
+                        self.lineno = lineno
+                        tok.type = 'ERROR'
+                        tok.value = valor
+                        tok = self.error(tok)
+                        if tok is not None:
+                            tok.end = self.index
+                            yield tok
+                    else:
+                        tok.type = tipo
+                        tok.value = valor
+                        if tipo in remapeamentos:
+                            tok.type = remapeamentos[tipo].get(valor, tipo)
+                        if tok.type in funcoes:
+                            self.index = index
+                            self.lineno = lineno
+                            tok = funcoes[tok.type](self, tok)
+                            if tok and tok.type not in ignorados:
+                                yield tok
+                        elif tok.type not in ignorados:
+                            yield tok
+                            continue
+                        else:
+                            continue
+                    # Uma função de regra pode ter mudado a posição ou a linha.
+                    lineno = self.lineno
+                    if self.index != index:
+                        reinicio = index = self.index
+                        break
+                if reinicio is None:
+                    return
+        finally:
+            self.text = text
+            self.index = index
+            self.lineno = lineno
+
+    def tokenizar_arquivo(self, caminho, tamanho_bloco=None):
+        # Lê o fonte em blocos e entrega os tokens sob demanda, sem nunca
+        # manter o arquivo inteiro na memória. O que sobra depois do último
+        # ponto de corte seguro é levado para o bloco seguinte. (O padrão é
+        # resolvido aqui dentro: no corpo da classe o SLY transformaria o
+        # nome TAMANHO_BLOCO num token.)
+        tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO
+        self.reiniciar()
+        linha = 1
+        deslocamento = 0
+        resto = ''
+        with open(caminho, "r", encoding="utf-8") as f:
+            while True:
+                bloco = f.read(tamanho_bloco)
+                texto = resto + bloco
+                if not bloco:
+                    corte = len(texto)
+                else:
+                    corte = _ponto_de_corte(texto)
+                ja_registrados = len(self.diagnosticos)
+                for tok in self.tokenize(texto[:corte], lineno=linha):
+                    tok.index += deslocamento
+                    tok.end += deslocamento
+                    yield tok
+                for diagnostico in self.diagnosticos[ja_registrados:]:
+                    diagnostico.indice += deslocamento
+                linha = self.lineno
+                deslocamento += corte
+                resto = texto[corte:]
+                if not bloco:
+                    return
+
+# Regras mais frequentes que não disputam o primeiro caractere com nenhuma
+# outra; colocá-las na frente da alternância não muda o que é reconhecido,
+# mas poupa o re de testar todos os operadores antes delas.
+_REGRAS_FREQUENTES = ('ID', 'NUMERO', 'newline')
+
+def _montar_regex_rapida(cls):
+    partes = []
+    for nome, valor in cls._rules:
+        if nome.startswith('ignore_'):
+            nome = nome[7:]
+        padrao = valor if isinstance(valor, str) else valor.pattern
+        partes.append((nome not in _REGRAS_FREQUENTES, f'(?P<{nome}>{padrao})'))
+    partes.sort(key=lambda parte: parte[0])
+    literais = ''.join(re.escape(c) for c in sorted(cls.literals))
+    return re.compile(f'[{re.escape(cls.ignore)}]*(?:'
+                      + '|'.join(p for _, p in partes)
+                      + f'|(?P<_literal>[{literais}])|(?P<_ilegal>[\\s\\S]))?')
+
+AnalisadorLexico._re_rapida = _montar_regex_rapida(AnalisadorLexico)
+# Tokens definidos só por uma string, sem função, remapeamento ou ignore.
+AnalisadorLexico._tokens_simples = frozenset(
+    nome for nome, valor in AnalisadorLexico._rules
+    if isinstance(valor, str) and nome in AnalisadorLexico.tokens
+    and nome not in AnalisadorLexico._remapping
+    and nome not in AnalisadorLexico._token_funcs)
+
+# O SLY compila a expressão regular mestre ao criar a classe. Isso leva poucos
+# milissegundos e um re.Pattern não pode ser serializado (o pickle apenas o
+# recompila), então só registramos o tempo para o --timings.
+AnalisadorLexico.tempo_construcao = time.perf_counter() - _inicio_construcao_lexico
+
+def _diretorio_cache():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.environ.get('FORMIGA_CACHE_DIR') or os.path.join(base, 'c_lasse_trabalhadora')
+
+def _chave_gramatica(cls):
+    # Qualquer mudança nas produções, nos tokens, nas precedências ou na
+    # versão do SLY muda a chave e invalida as tabelas guardadas.
+    h = hashlib.sha256()
+    h.update(sly.__version__.encode())
+    h.update(repr(sorted(cls.tokens)).encode())
+    h.update(repr(getattr(cls, 'precedence', ())).encode())
+    for producao in cls._grammar.Productions:
+        h.update(str(producao).encode() + b'\n')
+    return h.hexdigest()
+
+class _TabelasLALR:
+    # Apenas o que Parser.parse() consulta de um LRTable.
+    __slots__ = ('lr_action', 'lr_goto', 'defaulted_states')
+
+    def __init__(self, lr_action, lr_goto, defaulted_states):
+        self.lr_action = lr_action
+        self.lr_goto = lr_goto
+        self.defaulted_states = defaulted_states
+
+def _carregar_tabelas(caminho):
+    try:
+        with open(caminho, 'rb') as f:
+            return _TabelasLALR(*pickle.load(f))
+    except (OSError, pickle.UnpicklingError, EOFError, TypeError, ValueError):
+        return None
+
+# Lida uma vez só: os.umask() só consegue ler trocando o valor.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _permissoes(destino):
+    # mkstemp cria o temporário com 0600 e os.replace mantém isso; quem o
+    # substitui pelo destino usa antes as permissões do destino anterior ou,
+    # se não houver um, as de um arquivo novo.
+    try:
+        return os.stat(destino).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+def _salvar_tabelas(caminho, tabelas):
+    # Escrita atômica: vários compiladores podem iniciar ao mesmo tempo.
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((tabelas.lr_action, tabelas.lr_goto, tabelas.defaulted_states), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(temporario, _permissoes(caminho))
+        os.replace(temporario, caminho)
+    except OSError:
+        pass
+
+# =====================================================================
+#  ÁRVORE SINTÁTICA (AST)
+# =====================================================================
+# O parser constrói estes nós em vez de texto C; o EmissorC percorre a
+# árvore depois. Os nós usam __slots__ para ocupar pouco espaço: um
+# programa gerado pode ter milhões deles.
+class No:
+    __slots__ = ()
+
+    def __init__(self, *valores):
+        # Campos não informados (como o tipo das expressões, preenchido
+        # pela análise semântica) começam como None.
+        for campo, valor in zip(self.__slots__, valores):
+            setattr(self, campo, valor)
+        for campo in self.__slots__[len(valores):]:
+            setattr(self, campo, None)
+
+    def __repr__(self):
+        campos = ', '.join(f'{c}={getattr(self, c)!r}' for c in self.__slots__)
+        return f'{type(self).__name__}({campos})'
+
+class Programa(No):
+    # funcoes: Funcao e Prototipo, na ordem do fonte.
+    __slots__ = ('nome', 'funcoes')
+
+class Funcao(No):
+    __slots__ = ('tipo', 'nome', 'parametros', 'corpo', 'linha')
+
+class Prototipo(No):
+    # Declaração sem corpo, para chamar uma função antes de defini-la.
+    __slots__ = ('tipo', 'nome', 'parametros', 'linha')
+
+class Parametro(No):
+    # constante: como em DeclaracaoVariavel, para parâmetros nunca atribuídos.
+    __slots__ = ('tipo', 'nome', 'linha', 'constante')
+
+class DeclaracaoVariavel(No):
+    # constante: a análise semântica marca as variáveis inicializadas que
+    # nunca recebem outra atribuição, que o emissor declara como const.
+    # tamanho: None para escalares; para vetores, a expressão entre colchetes.
+    __slots__ = ('tipo', 'nome', 'valor', 'linha', 'constante', 'tamanho')
+
+class Atribuicao(No):
+    # indice: None, ou a posição do vetor 'nome' que recebe o valor.
+    __slots__ = ('nome', 'valor', 'linha', 'indice')
+
+class Preencher(No):
+    # tipo: dos elementos do vetor, anotado pela análise semântica.
+    __slots__ = ('vetor', 'valor', 'linha', 'tipo')
+
+class Copiar(No):
+    # menor: o vetor de menor tamanho, quando os dois têm tamanho constante.
+    __slots__ = ('destino', 'origem', 'linha', 'menor')
+
+class Imprimir(No):
+    # argumentos: Texto e expressões, impressos em sequência numa só linha.
+    __slots__ = ('argumentos', 'linha')
+
+class Retorno(No):
+    # valor: None em 'entregar;'.
+    __slots__ = ('valor', 'linha')
+
+class Interromper(No):
+    __slots__ = ('linha',)
+
+class Continuar(No):
+    __slots__ = ('linha',)
+
+class Bloco(No):
+    __slots__ = ('corpo', 'linha')
+
+class Se(No):
+    # senao: None, lista de instruções (senaoCavar) ou outro Se.
+    __slots__ = ('condicao', 'corpo', 'senao', 'linha')
+
+class Enquanto(No):
+    __slots__ = ('condicao', 'corpo', 'linha')
+
+class Para(No):
+    # reducoes: pares (operador, variável) de um laço paralelo, preenchidos
+    # pela análise semântica.
+    __slots__ = ('inicializacao', 'condicao', 'passo', 'corpo', 'linha', 'paralelo', 'reducoes')
+
+class FacaEnquanto(No):
+    __slots__ = ('corpo', 'condicao', 'linha')
+
+class Escolha(No):
+    __slots__ = ('expressao', 'casos', 'linha')
+
+class Caso(No):
+    # valor None: o 'default' de um switch criado pelo otimizador.
+    # sem_rotulo: caminho que nunca é escolhido (valor repetido ou fora do
+    # alcance do tipo); o rótulo não é emitido, mas o corpo continua lá
+    # para quem cair nele vindo do caminho anterior.
+    __slots__ = ('valor', 'corpo', 'linha', 'sem_rotulo')
+
+# Expressões têm um campo 'tipo' com o tipo C do resultado ('int',
+# 'double', 'bool', ...), anotado pela análise semântica.
+class Literal(No):
+    # valor: int, float ou bool.
+    __slots__ = ('valor', 'tipo')
+
+class Variavel(No):
+    __slots__ = ('nome', 'linha', 'tipo')
+
+class Texto(No):
+    # Cadeia entre aspas, já com as aspas.
+    __slots__ = ('valor', 'tipo')
+
+class Binaria(No):
+    __slots__ = ('op', 'esquerda', 'direita', 'tipo')
+
+class Indice(No):
+    __slots__ = ('nome', 'indice', 'linha', 'tipo')
+
+class Soma(No):
+    # somar(v): a soma de todos os elementos do vetor v; elemento é o tipo
+    # deles, tipo o da soma.
+    __slots__ = ('vetor', 'linha', 'tipo', 'elemento')
+
+class Chamada(No):
+    # Também usada como instrução, quando o valor devolvido é descartado.
+    __slots__ = ('nome', 'argumentos', 'linha', 'tipo')
+
+class Unaria(No):
+    __slots__ = ('op', 'operando', 'tipo')
+
+def _percorrer(passo):
+    """Conclui um percurso da AST sem recursão no Python.
+
+    passo é o que um método de percurso devolve: o resultado, quando o nó
+    não tem filhos a visitar, ou um gerador. O gerador faz yield do passo
+    de cada filho e recebe de volta o resultado dele; os geradores ainda
+    abertos ficam numa pilha explícita, e a profundidade da árvore
+    (blocos aninhados, '1 + 1 + ... + 1') não esbarra no limite de
+    recursão. Uma exceção num filho é lançada no pai, no yield que o
+    esperava, como aconteceria numa chamada recursiva.
+    """
+    if type(passo) is not GeneratorType:
+        return passo
+    pilha = []
+    resultado = None
+    erro = None
+    while True:
+        try:
+            if erro is None:
+                filho = passo.send(resultado)
+            else:
+                lancado, erro = erro, None
+                filho = passo.throw(lancado)
+        except StopIteration as fim:
+            if not pilha:
+                return fim.value
+            passo = pilha.pop()
+            resultado = fim.value
+            continue
+        except Exception as excecao:
+            if not pilha:
+                raise
+            passo = pilha.pop()
+            erro = excecao
+            continue
+        if type(filho) is GeneratorType:
+            pilha.append(passo)
+            passo = filho
+            resultado = None
+        else:
+            resultado = filho
+
+def _contar_reducao(acao, numero):
+    # Envolve a ação de uma produção: cada redução soma um no contador da
+    # regra, na instância do parser que está analisando.
+    def reduzir(parser, p):
+        parser.reducoes[numero] += 1
+        return acao(parser, p)
+    return reduzir
+
+_trava_gramatica = threading.Lock()
 
 class GeradorCodigo(Parser):
     tokens = AnalisadorLexico.tokens
+    # O SLY guarda a linha de cada valor reduzido num dicionário que só
+    # cresce; não usamos essas posições, então desligamos o rastreamento.
+    track_positions = False
+    # Desligado nos trechos do -j, que não precisam conter a natureza().
+    exigir_natureza = True
+
+    # Precedência e associatividade de C, da mais fraca para a mais forte,
+    # para que a AST tenha a mesma estrutura que o gcc verá.
+    precedence = (
+        ('left', OU_LOGICO),
+        ('left', E_LOGICO),
+        ('left', IGUAL_COMP, DIFERENTE),
+        ('left', MENOR_Q, MAIOR_Q, MENOR_IGUAL, MAIOR_IGUAL),
+        ('left', MAIS, MENOS),
+        ('left', VEZES, DIVIDE, MODULO),
+        ('right', NAO_LOGICO, UMENOS),
+    )
+
+    # Preenchidos por _montar(), na primeira instância.
+    versao_gramatica = None
+    tempo_construcao = None
+    tabelas_do_cache = False
+
+    @classmethod
+    def _build(cls, definitions):
+        # O SLY chama isto ao criar a classe. Só guardamos as definições: a
+        # gramática e as tabelas são montadas na primeira instância, e quem
+        # usa apenas o AnalisadorDescendente (--parser=fast) nunca paga por elas.
+        cls._definicoes = definitions
+
+    @classmethod
+    def _montar(cls):
+        with _trava_gramatica:
+            if cls.versao_gramatica is None:
+                cls._montar_gramatica(cls._definicoes)
+
+    # Métodos privados do sly.Parser que _montar_gramatica() chama; existem
+    # no sly 0.5, a versão fixada em requirements.txt.
+    INTERNOS_SLY = ('_Parser__collect_rules', '_Parser__validate_specification',
+                    '_Parser__build_grammar', '_Parser__build_lrtables')
+
+    @classmethod
+    def _montar_gramatica(cls, definitions):
+        # Faz o que Parser._build faria: a gramática é montada normalmente,
+        # mas as tabelas LALR (a parte cara) vêm do cache em disco quando existem.
+        faltando = [nome for nome in cls.INTERNOS_SLY if not hasattr(cls, nome)]
+        if faltando:
+            raise ImportError(
+                f"Erro: o sly {sly.__version__} instalado não tem "
+                f"{', '.join(faltando)}, usados para montar o parser. Instale a versão "
+                f"de requirements.txt (pip install -r requirements.txt) ou use --parser fast.")
+        inicio = time.perf_counter()
+        regras = cls._Parser__collect_rules(definitions)
+        if not cls._Parser__validate_specification():
+            raise sly.yacc.YaccError('Invalid parser specification')
+        cls._Parser__build_grammar(regras)
+        for producao in cls._grammar.Productions:
+            if producao.func is not None:
+                producao.func = _contar_reducao(producao.func, producao.number)
+
+        chave = _chave_gramatica(cls)
+        caminho = os.path.join(_diretorio_cache(), f'tabelas-{chave[:16]}.pickle')
+        tabelas = _carregar_tabelas(caminho)
+        cls.tabelas_do_cache = tabelas is not None
+        if tabelas is None:
+            cls._Parser__build_lrtables()
+            tabelas = cls._lrtable
+            _salvar_tabelas(caminho, tabelas)
+        cls._lrtable = tabelas
+        cls.versao_gramatica = chave
+        cls.tempo_construcao = time.perf_counter() - inicio
 
     def __init__(self):
-        self.funcao_natureza_encontrada = False
-        self.nome_programa = 'main'
+        self._montar()
+        self.reiniciar()
         self.mapeamento = {
             'formigaInteira': 'int',
             'formigaFlutuante': 'float', 
@@ -114,6 +701,7 @@ class GeradorCodigo(Parser):
             'senaoSeOutroObstaculo': 'else if',
             'enquantoHouverComida': 'while', 
             'marchar': 'for', 
+            'marcharJuntas': 'for',
             'cavarAteEnquanto': 'do',
             'inspecionarTunel': 'switch', 
             'caminho': 'case', 
@@ -121,56 +709,116 @@ class GeradorCodigo(Parser):
             'ignorarFolha': 'continue',
         }
 
-    @_('cabecalho_programa declaracoes')
-    def programa(self, p):
-        if not self.funcao_natureza_encontrada:
-            raise ValueError("ERRO: Função 'natureza()' não encontrada!")
-        return p.declaracoes
+    def reiniciar(self):
+        # Estado de uma compilação; zerado a cada parse() para que a mesma
+        # instância possa compilar vários arquivos.
+        self.funcao_natureza_encontrada = False
+        self.nome_programa = 'main'
+        self.diagnosticos = []
+        self.erro_sem_progresso = None
+        # Contadores sempre ligados, lidos por _estatisticas().
+        self.tokens_lidos = 0
+        self.reducoes = [0] * len(self._grammar.Productions)
 
-    @_('PROGRAMA ID ";" declaracoes')
-    def programa(self, p):
-        self.nome_programa = p.ID
-        if not self.funcao_natureza_encontrada:
-            raise ValueError("ERRO: Função 'natureza()' não encontrada!")
-        return p.declaracoes
+    def parse(self, tokens, ao_concluir_declaracao=None):
+        # Com ao_concluir_declaracao, cada função (ou protótipo) é entregue a
+        # esse callback assim que é reduzida e não fica guardada no Programa
+        # devolvido.
+        self.reiniciar()
+        self.ao_concluir_declaracao = ao_concluir_declaracao
+        # Conta os tokens sem um gerador em Python no caminho: o zip puxa um
+        # número do contador para cada token entregue ao parser.
+        contagem = itertools.count()
+        tokens = map(operator.itemgetter(0), zip(tokens, contagem))
+        try:
+            return super().parse(tokens)
+        finally:
+            self.ao_concluir_declaracao = None
+            self.tokens_lidos = next(contagem)
 
-    @_('declaracoes')
+    def contagem_reducoes(self):
+        # {regra: reduções} das produções usadas na última análise.
+        return {str(producao): n for producao, n in zip(self._grammar.Productions, self.reducoes)
+                if n}
+
+    @_('cabecalho_programa declaracoes')
     def programa(self, p):
-        if not self.funcao_natureza_encontrada:
-            raise ValueError("ERRO: Função 'natureza()' não encontrada!")
-        return p.declaracoes
+        # Com erros de sintaxe, a natureza() pode ter se perdido na recuperação.
+        if self.exigir_natureza and not self.funcao_natureza_encontrada and not self.diagnosticos:
+            self.diagnosticos.append(
+                Diagnostico('Erro Semântico', "Função 'natureza()' não encontrada!", None))
+        return Programa(self.nome_programa, p.declaracoes)
 
     @_('PROGRAMA ID ";"')
     def cabecalho_programa(self, p):
         self.nome_programa = p.ID
-        return ''
+        return None
 
     @_('')
     def cabecalho_programa(self, p):
-        return ''
+        return None
 
-    @_('declaracao declaracoes')
+    @_('declaracoes declaracao')
     def declaracoes(self, p):
-        return p.declaracao + p.declaracoes
+        if p.declaracao is not None:
+            p.declaracoes.append(p.declaracao)
+        return p.declaracoes
 
     @_('')
     def declaracoes(self, p):
-        return ''
+        return []
 
-    @_('declaracao_funcao')
+    @_('declaracao_funcao', 'prototipo')
     def declaracao(self, p):
-        return p.declaracao_funcao
+        return p[0]
+
+    # Recuperação de erros em modo pânico: os tokens são descartados até o
+    # próximo ';' (ou até antes do '}' que fecha o bloco), até o ')' de uma
+    # condição, ou, fora de funções, até um '}'. O SLY só chama error() de
+    # novo depois de três tokens aceitos, o que evita erros em cascata.
+    @_('error "}"')
+    def declaracao(self, p):
+        return None
 
-    # Declaração de função: tipo nome() { corpo }
-    @_('tipo ID "(" ")" "{" corpo "}"')
+    # Declaração de função: tipo nome(parâmetros) { corpo }
+    @_('tipo ID "(" parametros ")" "{" corpo "}"')
     def declaracao_funcao(self, p):
-        nome_funcao = p.ID
-        nome_traduzido = nome_funcao
-        # Função natureza → main()
-        if nome_funcao == 'natureza':
+        if p.ID == 'natureza':
             self.funcao_natureza_encontrada = True
-            nome_traduzido = 'main'
-        return f'{p.tipo} {nome_traduzido}() {{\n{p.corpo}}}\n'
+        return self.concluir_declaracao(Funcao(p.tipo, p.ID, p.parametros, p.corpo, p.lineno))
+
+    @_('tipo ID "(" parametros ")" ";"')
+    def prototipo(self, p):
+        return self.concluir_declaracao(Prototipo(p.tipo, p.ID, p.parametros, p.lineno))
+
+    def concluir_declaracao(self, declaracao):
+        if self.diagnosticos:
+            return None  # nada será gerado; só seguimos procurando erros
+        if self.ao_concluir_declaracao is not None:
+            self.ao_concluir_declaracao(declaracao)
+            return None
+        return declaracao
+
+    @_('lista_parametros')
+    def parametros(self, p):
+        return p.lista_parametros
+
+    @_('')
+    def parametros(self, p):
+        return []
+
+    @_('lista_parametros "," parametro')
+    def lista_parametros(self, p):
+        p.lista_parametros.append(p.parametro)
+        return p.lista_parametros
+
+    @_('parametro')
+    def lista_parametros(self, p):
+        return [p.parametro]
+
+    @_('tipo ID')
+    def parametro(self, p):
+        return Parametro(p.tipo, p.ID, p.lineno)
 
     @_('INICIO instrucoes FIM')
     def corpo(self, p):
@@ -180,120 +828,203 @@ class GeradorCodigo(Parser):
     def corpo(self, p):
         return p.instrucoes
 
-    @_('instrucao instrucoes')
+    @_('instrucoes instrucao')
     def instrucoes(self, p):
-        return p.instrucao + p.instrucoes
+        if p.instrucao is not None:
+            p.instrucoes.append(p.instrucao)
+        return p.instrucoes
 
     @_('')
     def instrucoes(self, p):
-        return ''
+        return []
 
     # Cada instrução pode ser uma variável, controle, print etc.
     @_('declaracao_variavel', 'atribuicao', 'estrutura_controle', 'break_stmt', 
-       'continue_stmt', 'print_stmt', 'bloco_aninhado')
+       'continue_stmt', 'print_stmt', 'return_stmt', 'chamada_stmt', 'fill_stmt',
+       'copy_stmt', 'bloco_aninhado')
     def instrucao(self, p):
         return p[0]
 
+    @_('error ";"', 'error')
+    def instrucao(self, p):
+        # 'instrucao: error' não consome nada. Se o token que causou o erro
+        # também não serve depois da redução (um 'descansar' ou 'caminho'
+        # solto entre chaves, um '}' solto em construir ... descansar), o
+        # SLY criaria outro 'error' diante dele para sempre. Na segunda vez
+        # seguida, sem progresso, o próprio token vira 'error': é aceito no
+        # lugar do símbolo de erro, e a recuperação segue depois dele.
+        if len(p) == 1:
+            token = p[0]
+            if token is self.erro_sem_progresso:
+                token.type = 'error'
+            self.erro_sem_progresso = token
+        return None
+
+    @_('RETURN expressao ";"', 'RETURN ";"')
+    def return_stmt(self, p):
+        return Retorno(p.expressao if len(p) == 3 else None, p.lineno)
+
+    @_('chamada ";"')
+    def chamada_stmt(self, p):
+        return p.chamada
+
     @_('INICIO instrucoes FIM')
     def bloco_aninhado(self, p):
-        return f'\t{{\n{p.instrucoes}\t}}\n'
+        return Bloco(p.instrucoes, p.lineno)
 
     @_('tipo ID IGUAL expressao ";"', 'tipo ID ";"')
     def declaracao_variavel(self, p):
         if len(p) == 5:
-            return f'\t{p.tipo} {p.ID} = {p.expressao};\n'
+            return DeclaracaoVariavel(p.tipo, p.ID, p.expressao, p.lineno)
         else:
-            return f'\t{p.tipo} {p.ID};\n'
+            return DeclaracaoVariavel(p.tipo, p.ID, None, p.lineno)
+
+    # Vetor: tamanho constante ou calculado na hora, como os VLAs de C99.
+    @_('tipo ID "[" expressao "]" ";"')
+    def declaracao_variavel(self, p):
+        return DeclaracaoVariavel(p.tipo, p.ID, None, p.lineno, None, p.expressao)
 
     @_('ID IGUAL expressao ";"')
     def atribuicao(self, p):
-        return f'\t{p.ID} = {p.expressao};\n'
+        return Atribuicao(p.ID, p.expressao, p.lineno)
+
+    @_('ID "[" expressao "]" IGUAL expressao ";"')
+    def atribuicao(self, p):
+        return Atribuicao(p.ID, p.expressao1, p.lineno, p.expressao0)
 
-    @_('PRINT "(" print_arg ")" ";"')
+    @_('FILL "(" ID "," expressao ")" ";"')
+    def fill_stmt(self, p):
+        return Preencher(p.ID, p.expressao, p.lineno)
+
+    @_('COPY "(" ID "," ID ")" ";"')
+    def copy_stmt(self, p):
+        return Copiar(p.ID0, p.ID1, p.lineno)
+
+    @_('PRINT "(" print_args ")" ";"')
     def print_stmt(self, p):
-        argumento = p.print_arg
-        if argumento.startswith('"'):
-            texto_formatado = argumento[:-1] + '\\n"'
-            return f'\tprintf({texto_formatado});\n'
-        else:
-            return f'\tprintf("%d\\n", {argumento});\n'
+        return Imprimir(p.print_args, p.lineno)
+
+    @_('print_args "," print_arg')
+    def print_args(self, p):
+        p.print_args.append(p.print_arg)
+        return p.print_args
 
-    @_('STRING', 'ID', 'expressao')
+    @_('print_arg')
+    def print_args(self, p):
+        return [p.print_arg]
+
+    @_('STRING')
     def print_arg(self, p):
-        return p[0]
+        return Texto(p.STRING)
+
+    @_('expressao')
+    def print_arg(self, p):
+        return p.expressao
 
     @_('BREAK ";"')
     def break_stmt(self, p):
-        return '\tbreak;\n'
+        return Interromper(p.lineno)
 
     @_('CONTINUE ";"')
     def continue_stmt(self, p):
-        return '\tcontinue;\n'
+        return Continuar(p.lineno)
 
     @_('if_stmt', 'while_stmt', 'for_stmt', 'do_while_stmt', 'switch_stmt')
     def estrutura_controle(self, p):
         return p[0]
-        
+
     @_('IF "(" expressao ")" "{" corpo "}" else_parte')
     def if_stmt(self, p):
-        return f'\tif ({p.expressao}) {{\n{p.corpo}\t}}{p.else_parte}\n'
+        return Se(p.expressao, p.corpo, p.else_parte, p.lineno)
+
+    @_('IF "(" error ")" "{" corpo "}" else_parte')
+    def if_stmt(self, p):
+        return None
 
+    # else_parte é uma lista de instruções (senaoCavar), outro Se
+    # (senaoSeOutroObstaculo) ou None.
     @_('ELSE "{" corpo "}"')
     def else_parte(self, p):
-        return f' else {{\n{p.corpo}\t}}'
+        return p.corpo
 
     @_('ELSEIF "(" expressao ")" "{" corpo "}" else_parte')
     def else_parte(self, p):
-        return f' else if ({p.expressao}) {{\n{p.corpo}\t}}{p.else_parte}'
+        return Se(p.expressao, p.corpo, p.else_parte, p.lineno)
+
+    @_('ELSEIF "(" error ")" "{" corpo "}" else_parte')
+    def else_parte(self, p):
+        return None
 
     @_('')
     def else_parte(self, p):
-        return ''
+        return None
 
     @_('WHILE "(" expressao ")" "{" corpo "}"')
     def while_stmt(self, p):
-        return f'\twhile ({p.expressao}) {{\n{p.corpo}\t}}\n'
-        
+        return Enquanto(p.expressao, p.corpo, p.lineno)
+
+    @_('WHILE "(" error ")" "{" corpo "}"')
+    def while_stmt(self, p):
+        return None
+
     @_('FOR "(" for_inicializacao ";" expressao ";" atribuicao_sem_ponto_virgula ")" "{" corpo "}"')
     def for_stmt(self, p):
-        return f'\tfor ({p.for_inicializacao}; {p.expressao}; {p.atribuicao_sem_ponto_virgula}) {{\n{p.corpo}\t}}\n'
+        return Para(p.for_inicializacao, p.expressao, p.atribuicao_sem_ponto_virgula, p.corpo, p.lineno)
+
+    @_('PARALLEL_FOR "(" for_inicializacao ";" expressao ";" atribuicao_sem_ponto_virgula ")" "{" corpo "}"')
+    def for_stmt(self, p):
+        return Para(p.for_inicializacao, p.expressao, p.atribuicao_sem_ponto_virgula, p.corpo,
+                    p.lineno, True)
 
     @_('tipo ID IGUAL expressao', 'atribuicao_sem_ponto_virgula', '";"')
     def for_inicializacao(self, p):
         if len(p) == 4:
-            return f'{p.tipo} {p.ID} = {p.expressao}'
+            return DeclaracaoVariavel(p.tipo, p.ID, p.expressao, p.lineno)
         elif len(p) == 1 and p[0] == ';':
-            return ''
+            return None
         else:
             return p[0]
 
     @_('DO "{" corpo "}" WHILE "(" expressao ")" ";"')
     def do_while_stmt(self, p):
-        return f'\tdo {{\n{p.corpo}\t}} while ({p.expressao});\n'
+        return FacaEnquanto(p.corpo, p.expressao, p.lineno)
 
     @_('SWITCH "(" expressao ")" "{" case_bloco "}"')
     def switch_stmt(self, p):
-        return f'\tswitch ({p.expressao}) {{\n{p.case_bloco}\t}}\n'
+        return Escolha(p.expressao, p.case_bloco, p.lineno)
 
-    @_('case_declaracao case_bloco')
+    @_('case_bloco case_declaracao')
     def case_bloco(self, p):
-        return p.case_declaracao + p.case_bloco
+        p.case_bloco.append(p.case_declaracao)
+        return p.case_bloco
 
     @_('')
     def case_bloco(self, p):
-        return ''
+        return []
 
     @_('CASE expressao ":" instrucoes')
     def case_declaracao(self, p):
-        return f'\t\tcase {p.expressao}:\n{p.instrucoes}'
+        return Caso(p.expressao, p.instrucoes, p.lineno)
 
     @_('ID IGUAL expressao')
     def atribuicao_sem_ponto_virgula(self, p):
-        return f'{p.ID} = {p.expressao}'
+        return Atribuicao(p.ID, p.expressao, p.lineno)
 
-    @_('NUMERO', 'ID', 'BOOL_TRUE', 'BOOL_FALSE')
+    @_('ID "[" expressao "]" IGUAL expressao')
+    def atribuicao_sem_ponto_virgula(self, p):
+        return Atribuicao(p.ID, p.expressao1, p.lineno, p.expressao0)
+
+    @_('NUMERO')
+    def expressao(self, p):
+        return Literal(p.NUMERO)
+
+    @_('BOOL_TRUE', 'BOOL_FALSE')
     def expressao(self, p):
-        return self.mapeamento.get(p[0], str(p[0]))
+        return Literal(p[0] == 'vigia')
+
+    @_('ID')
+    def expressao(self, p):
+        return Variavel(p.ID, p.lineno)
 
     @_('expressao MAIS expressao',
        'expressao MENOS expressao',
@@ -309,15 +1040,48 @@ class GeradorCodigo(Parser):
        'expressao E_LOGICO expressao',
        'expressao OU_LOGICO expressao')
     def expressao(self, p):
-        return f'{p.expressao0} {p[1]} {p.expressao1}'
+        return Binaria(p[1], p.expressao0, p.expressao1)
 
-    @_('NAO_LOGICO expressao', 'MENOS expressao')
+    @_('NAO_LOGICO expressao', 'MENOS expressao %prec UMENOS')
     def expressao(self, p):
-        return f'{p[0]}{p.expressao}'
+        return Unaria(p[0], p.expressao)
 
     @_('"(" expressao ")"')
     def expressao(self, p):
-        return f'({p.expressao})'
+        return p.expressao
+
+    @_('chamada')
+    def expressao(self, p):
+        return p.chamada
+
+    @_('ID "[" expressao "]"')
+    def expressao(self, p):
+        return Indice(p.ID, p.expressao, p.lineno)
+
+    @_('SUM "(" ID ")"')
+    def expressao(self, p):
+        return Soma(p.ID, p.lineno)
+
+    @_('ID "(" argumentos ")"')
+    def chamada(self, p):
+        return Chamada(p.ID, p.argumentos, p.lineno)
+
+    @_('lista_argumentos')
+    def argumentos(self, p):
+        return p.lista_argumentos
+
+    @_('')
+    def argumentos(self, p):
+        return []
+
+    @_('lista_argumentos "," expressao')
+    def lista_argumentos(self, p):
+        p.lista_argumentos.append(p.expressao)
+        return p.lista_argumentos
+
+    @_('expressao')
+    def lista_argumentos(self, p):
+        return [p.expressao]
 
     @_('TIPO_INT', 'TIPO_FLOAT', 'TIPO_DOUBLE', 'TIPO_CHAR', 'TIPO_BOOL',
        'TIPO_LONG', 'TIPO_SHORT', 'TIPO_UNSIGNED', 'TIPO_VOID')
@@ -326,42 +1090,3978 @@ class GeradorCodigo(Parser):
 
     def error(self, p):
         if p:
-            print(f"Erro de Sintaxe: Token inesperado '{p.value}' na linha {p.lineno}")
+            self.diagnosticos.append(
+                Diagnostico('Erro de Sintaxe', f"Token inesperado '{p.value}'", p.index))
         else:
-            print("Erro de Sintaxe: Fim inesperado do arquivo.")
+            self.diagnosticos.append(
+                Diagnostico('Erro de Sintaxe', "Fim inesperado do arquivo.", None))
 
-def main():
-    if len(sys.argv) < 2:
-        print("Uso: python c_lasse_trabalhadora_v2.py <arquivo.formiga>")
-        sys.exit(1)
+# =====================================================================
+#  ANALISADOR DESCENDENTE (--parser=fast)
+# =====================================================================
+# Alternativa escrita à mão ao GeradorCodigo: descida recursiva para as
+# declarações e instruções, Pratt para as expressões. Não há tabelas a
+# montar ao iniciar, e cada token custa poucas chamadas em vez de um passo
+# do autômato LALR mais uma ação por redução. A AST (com as linhas), o
+# callback por declaração e os diagnósticos são os mesmos do SLY.
+#
+# A recuperação de erros imita a do SLY estado por estado. Uma exceção
+# _ErroSintatico sobe até a construção que, no autômato, tem uma ação
+# para o token 'error': a lista de instruções mais interna (descarta até
+# um ';' ou até um token que possa vir depois de uma instrução), o trecho
+# entre o '(' e o '{' de um seObstaculo/senaoSeOutroObstaculo/
+# enquantoHouverComida (descarta até o ')') ou o nível de cima (descarta
+# até um '}'). Como no SLY, só é relatado o erro encontrado depois de três
+# tokens aceitos. Um 'descansar' ou 'caminho' solto numa lista entre
+# chaves, ou um '}' solto dentro de construir ... descansar, é aceito no
+# lugar do 'error', como em GeradorCodigo.instrucao().
 
-    arquivo_entrada = sys.argv[1]
-    if not os.path.exists(arquivo_entrada):
-        print(f"Erro: Arquivo não encontrado: {arquivo_entrada}")
-        sys.exit(1)
+class _ErroSintatico(Exception):
+    # instrucao: a instrução já completa que sobrevive ao erro (um
+    # seObstaculo cuja cadeia de senão foi interrompida); senao: o pedaço
+    # dessa cadeia que foi concluído antes do erro.
+    instrucao = None
+    senao = None
 
-    with open(arquivo_entrada, "r", encoding="utf-8") as f:
-        codigo_formiga = f.read()
+class _FimDaAnalise(Exception):
+    # O arquivo acabou durante uma recuperação: o SLY desiste do parse.
+    pass
+
+_FIM_TOKENS = sly.lex.Token()
+_FIM_TOKENS.type = '$end'
+_FIM_TOKENS.value = _FIM_TOKENS.lineno = _FIM_TOKENS.index = None
+
+TIPOS_TOKEN = {
+    'TIPO_INT': 'int', 'TIPO_FLOAT': 'float', 'TIPO_DOUBLE': 'double', 'TIPO_CHAR': 'char',
+    'TIPO_BOOL': 'bool', 'TIPO_LONG': 'long', 'TIPO_SHORT': 'short',
+    'TIPO_UNSIGNED': 'unsigned', 'TIPO_VOID': 'void',
+}
+# Nível de cada operador binário, tirado da tabela precedence do GeradorCodigo
+# (a última linha é a dos unários).
+PRECEDENCIA_TOKEN = {tipo: nivel for nivel, (_, *tipos) in
+                     enumerate(GeradorCodigo.precedence[:-1], 1) for tipo in tipos}
+INICIO_EXPRESSAO = frozenset({'ID', 'NUMERO', '(', 'BOOL_TRUE', 'BOOL_FALSE', 'SUM'})
+INICIO_INSTRUCAO = frozenset(TIPOS_TOKEN) | {
+    'ID', 'IF', 'WHILE', 'FOR', 'PARALLEL_FOR', 'DO', 'SWITCH', 'BREAK', 'CONTINUE',
+    'PRINT', 'RETURN', 'FILL', 'COPY', 'INICIO',
+}
+# Tokens que podem vir depois de uma instrução em alguma lista; fora do
+# lugar, o SLY os aceita como 'error' (veja GeradorCodigo.instrucao()).
+FIM_DE_LISTA = frozenset({'}', 'FIM', 'CASE'})
+
+class AnalisadorDescendente:
+    exigir_natureza = True
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.funcao_natureza_encontrada = False
+        self.nome_programa = 'main'
+        self.diagnosticos = []
+        self.tokens_lidos = 0
+        self.tokens = None
+        self.tok = _FIM_TOKENS
+        # O contador de erros do SLY: enquanto não for zero, um erro novo é
+        # recuperado sem ser relatado. Cai um a cada token aceito.
+        self.silencio = 0
+
+    def parse(self, tokens, ao_concluir_declaracao=None):
+        self.reiniciar()
+        self.ao_concluir_declaracao = ao_concluir_declaracao
+        contagem = itertools.count()
+        self.tokens = map(operator.itemgetter(0), zip(tokens, contagem))
+        self.tok = next(self.tokens, _FIM_TOKENS)
+        try:
+            return self.programa()
+        except _FimDaAnalise:
+            return None
+        finally:
+            self.ao_concluir_declaracao = None
+            self.tokens = None
+            self.tokens_lidos = next(contagem)
+
+    def contagem_reducoes(self):
+        # Não há produções a contar.
+        return {}
+
+    # --- tokens e erros ----------------------------------------------
+
+    def avancar(self):
+        if self.silencio:
+            self.silencio -= 1
+        self.tok = next(self.tokens, _FIM_TOKENS)
+
+    def esperar(self, tipo):
+        tok = self.tok
+        if tok.type != tipo:
+            self.erro()
+        self.avancar()
+        return tok
+
+    def erro(self):
+        self.relatar()
+        if self.tok is _FIM_TOKENS:
+            raise _FimDaAnalise
+        raise _ErroSintatico
+
+    def relatar(self):
+        tok = self.tok
+        if not self.silencio:
+            if tok is _FIM_TOKENS:
+                self.diagnosticos.append(
+                    Diagnostico('Erro de Sintaxe', "Fim inesperado do arquivo.", None))
+            else:
+                self.diagnosticos.append(
+                    Diagnostico('Erro de Sintaxe', f"Token inesperado '{tok.value}'", tok.index))
+        self.silencio = 3
+
+    def descartar(self):
+        if self.tok is _FIM_TOKENS:
+            raise _FimDaAnalise
+        self.silencio = 3
+        self.tok = next(self.tokens, _FIM_TOKENS)
+
+    def sincronizar(self, tipo):
+        # 'error' aceito; descarta até o token indicado e o consome.
+        if self.silencio:
+            self.silencio -= 1
+        while self.tok.type != tipo:
+            self.descartar()
+        self.avancar()
+
+    def sincronizar_instrucao(self, terminadores):
+        # instrucao: error ";" | error. Um token que pode começar outra
+        # instrução ou fechar a lista encerra a recuperação sem ser consumido.
+        if self.silencio:
+            self.silencio -= 1
+        while True:
+            tipo = self.tok.type
+            if tipo == ';':
+                self.avancar()
+                return
+            if tipo in INICIO_INSTRUCAO or tipo in terminadores:
+                return
+            if tipo in FIM_DE_LISTA:
+                # O SLY reduz 'error', erra de novo no mesmo token (3),
+                # aceita outro 'error' (2) e então o próprio token (1).
+                self.silencio = 2
+                self.avancar()
+                continue
+            self.descartar()
+
+    # --- declarações -------------------------------------------------
+
+    def programa(self):
+        # Antes do cabeçalho o SLY descarta os tokens um a um, relatando só o
+        # primeiro de cada sequência.
+        while (self.tok.type != 'PROGRAMA' and self.tok.type not in TIPOS_TOKEN
+               and self.tok is not _FIM_TOKENS):
+            self.relatar()
+            self.descartar()
+
+        declaracoes = []
+        try:
+            if self.tok.type == 'PROGRAMA':
+                self.avancar()
+                nome = self.esperar('ID').value
+                self.esperar(';')
+                self.nome_programa = nome
+        except _ErroSintatico:
+            self.sincronizar('}')
+        while self.tok is not _FIM_TOKENS:
+            try:
+                if self.tok.type not in TIPOS_TOKEN:
+                    self.erro()
+                declaracao = self.declaracao()
+            except _ErroSintatico:
+                self.sincronizar('}')
+                continue
+            if declaracao is not None:
+                declaracoes.append(declaracao)
+
+        if self.exigir_natureza and not self.funcao_natureza_encontrada and not self.diagnosticos:
+            self.diagnosticos.append(
+                Diagnostico('Erro Semântico', "Função 'natureza()' não encontrada!", None))
+        return Programa(self.nome_programa, declaracoes)
+
+    def tipo(self):
+        tipo = TIPOS_TOKEN.get(self.tok.type)
+        if tipo is None:
+            self.erro()
+        self.avancar()
+        return tipo
+
+    def declaracao(self):
+        tipo = self.tipo()
+        nome = self.esperar('ID')
+        self.esperar('(')
+        parametros = []
+        if self.tok.type != ')':
+            while True:
+                tipo_parametro = self.tipo()
+                parametro = self.esperar('ID')
+                parametros.append(Parametro(tipo_parametro, parametro.value, parametro.lineno))
+                if self.tok.type != ',':
+                    break
+                self.avancar()
+        self.esperar(')')
+        if self.tok.type == ';':
+            self.avancar()
+            self.olhar_adiante()
+            return self.concluir_declaracao(Prototipo(tipo, nome.value, parametros, nome.lineno))
+        self.esperar('{')
+        corpo = _percorrer(self.corpo())
+        self.avancar()
+        self.olhar_adiante()
+        if nome.value == 'natureza':
+            self.funcao_natureza_encontrada = True
+        return self.concluir_declaracao(Funcao(tipo, nome.value, parametros, corpo, nome.lineno))
+
+    def olhar_adiante(self):
+        # O SLY só reduz a declaração depois de ler o token seguinte; se ele
+        # for um erro, o diagnóstico já existe quando concluir_declaracao()
+        # decide se a função segue adiante. (O erro em si é tratado no laço
+        # de programa().)
+        if self.tok.type not in TIPOS_TOKEN and self.tok is not _FIM_TOKENS:
+            self.relatar()
+
+    def concluir_declaracao(self, declaracao):
+        if self.diagnosticos:
+            return None
+        if self.ao_concluir_declaracao is not None:
+            self.ao_concluir_declaracao(declaracao)
+            return None
+        return declaracao
+
+    # --- instruções --------------------------------------------------
+
+    def corpo(self):
+        # Depois do '{'; devolve com o '}' como token atual. Gerador, como
+        # instrucoes() e as instruções que têm corpo: os blocos aninhados
+        # ficam na pilha de _percorrer(), não na do Python.
+        if self.tok.type != 'INICIO':
+            return (yield self.instrucoes(('}',)))
+        self.avancar()
+        instrucoes = yield self.instrucoes(('FIM',))
+        self.avancar()
+        if self.tok.type == '}':
+            return instrucoes
+        # O SLY já reduziu construir ... descansar a corpo: o erro volta para
+        # o '{', e o que veio antes se perde.
+        self.relatar()
+        self.sincronizar_instrucao(('}',))
+        return (yield self.instrucoes(('}',)))
+
+    def instrucoes(self, terminadores):
+        # Devolve com um dos terminadores como token atual, sem consumi-lo.
+        lista = []
+        while True:
+            tipo = self.tok.type
+            if tipo in terminadores:
+                return lista
+            try:
+                metodo = self.INSTRUCOES.get(tipo)
+                if metodo is None:
+                    self.erro()
+                instrucao = metodo(self)
+                if type(instrucao) is GeneratorType:
+                    instrucao = yield instrucao
+            except _ErroSintatico as erro:
+                if erro.instrucao is not None:
+                    lista.append(erro.instrucao)
+                self.sincronizar_instrucao(terminadores)
+                continue
+            if instrucao is not None:
+                lista.append(instrucao)
+
+    def instrucao_tipo(self):
+        tipo = self.tipo()
+        nome = self.esperar('ID')
+        proximo = self.tok.type
+        if proximo == 'IGUAL':
+            self.avancar()
+            valor = self.expressao()
+            self.esperar(';')
+            return DeclaracaoVariavel(tipo, nome.value, valor, nome.lineno)
+        if proximo == ';':
+            self.avancar()
+            return DeclaracaoVariavel(tipo, nome.value, None, nome.lineno)
+        if proximo == '[':
+            self.avancar()
+            tamanho = self.expressao()
+            self.esperar(']')
+            self.esperar(';')
+            return DeclaracaoVariavel(tipo, nome.value, None, nome.lineno, None, tamanho)
+        self.erro()
+
+    def instrucao_id(self):
+        nome = self.tok
+        self.avancar()
+        if self.tok.type == '(':
+            chamada = self.chamada(nome)
+            self.esperar(';')
+            return chamada
+        atribuicao = self.atribuicao(nome)
+        self.esperar(';')
+        return atribuicao
+
+    def atribuicao(self, nome):
+        # ID = e, ou ID[e] = e; o ID já foi consumido.
+        indice = None
+        if self.tok.type == '[':
+            self.avancar()
+            indice = self.expressao()
+            self.esperar(']')
+        self.esperar('IGUAL')
+        return Atribuicao(nome.value, self.expressao(), nome.lineno, indice)
+
+    def atribuicao_sem_ponto_virgula(self):
+        nome = self.esperar('ID')
+        return self.atribuicao(nome)
+
+    def instrucao_se(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        condicao, corpo = yield self.condicao_e_corpo()
+        try:
+            senao = yield self.senao()
+        except _ErroSintatico as erro:
+            if condicao is not None:
+                erro.instrucao = Se(condicao, corpo, erro.senao, linha)
+            raise
+        return None if condicao is None else Se(condicao, corpo, senao, linha)
+
+    def condicao_e_corpo(self):
+        # Do token depois do '(' até o '}'. Um erro antes do '{' é
+        # recuperado aqui, e a condição volta como None.
+        try:
+            condicao = self.expressao()
+            self.esperar(')')
+            self.esperar('{')
+        except _ErroSintatico:
+            condicao = None
+            while True:
+                self.sincronizar(')')
+                try:
+                    self.esperar('{')
+                    break
+                except _ErroSintatico:
+                    pass
+        corpo = yield self.corpo()
+        self.avancar()
+        return condicao, corpo
+
+    def senao(self):
+        tipo = self.tok.type
+        if tipo == 'ELSE':
+            self.avancar()
+            self.esperar('{')
+            corpo = yield self.corpo()
+            self.avancar()
+            return corpo
+        if tipo == 'ELSEIF':
+            linha = self.tok.lineno
+            self.avancar()
+            self.esperar('(')
+            condicao, corpo = yield self.condicao_e_corpo()
+            try:
+                senao = yield self.senao()
+            except _ErroSintatico as erro:
+                erro.senao = None if condicao is None else Se(condicao, corpo, erro.senao, linha)
+                raise
+            return None if condicao is None else Se(condicao, corpo, senao, linha)
+        return None
+
+    def instrucao_enquanto(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        condicao, corpo = yield self.condicao_e_corpo()
+        return None if condicao is None else Enquanto(condicao, corpo, linha)
+
+    def instrucao_para(self):
+        paralelo = self.tok.type == 'PARALLEL_FOR'
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        tipo = self.tok.type
+        if tipo in TIPOS_TOKEN:
+            tipo = self.tipo()
+            nome = self.esperar('ID')
+            self.esperar('IGUAL')
+            inicializacao = DeclaracaoVariavel(tipo, nome.value, self.expressao(), nome.lineno)
+        elif tipo == 'ID':
+            inicializacao = self.atribuicao_sem_ponto_virgula()
+        else:
+            self.esperar(';')
+            inicializacao = None
+        self.esperar(';')
+        condicao = self.expressao()
+        self.esperar(';')
+        passo = self.atribuicao_sem_ponto_virgula()
+        self.esperar(')')
+        self.esperar('{')
+        corpo = yield self.corpo()
+        self.avancar()
+        if paralelo:
+            return Para(inicializacao, condicao, passo, corpo, linha, True)
+        return Para(inicializacao, condicao, passo, corpo, linha)
 
-    analisador_lexico = AnalisadorLexico()
-    gerador_codigo = GeradorCodigo()
+    def instrucao_faca(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('{')
+        corpo = yield self.corpo()
+        while True:
+            self.avancar()
+            try:
+                self.esperar('WHILE')
+                self.esperar('(')
+                condicao = self.expressao()
+                self.esperar(')')
+                self.esperar(';')
+                return FacaEnquanto(corpo, condicao, linha)
+            except _ErroSintatico:
+                # O '{' continua na pilha do SLY, e é ele quem recupera o
+                # erro: o corpo recomeça vazio depois da sincronização.
+                self.sincronizar_instrucao(('}',))
+                corpo = yield self.instrucoes(('}',))
 
+    def instrucao_escolha(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        valor = self.expressao()
+        self.esperar(')')
+        self.esperar('{')
+        casos = []
+        while self.tok.type == 'CASE':
+            linha_caso = self.tok.lineno
+            self.avancar()
+            rotulo = self.expressao()
+            self.esperar(':')
+            corpo = yield self.instrucoes(('CASE', '}'))
+            casos.append(Caso(rotulo, corpo, linha_caso))
+        self.esperar('}')
+        return Escolha(valor, casos, linha)
+
+    def instrucao_interromper(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar(';')
+        return Interromper(linha)
+
+    def instrucao_continuar(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar(';')
+        return Continuar(linha)
+
+    def instrucao_imprimir(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        argumentos = []
+        while True:
+            if self.tok.type == 'STRING':
+                argumentos.append(Texto(self.tok.value))
+                self.avancar()
+            else:
+                argumentos.append(self.expressao())
+            if self.tok.type != ',':
+                break
+            self.avancar()
+        self.esperar(')')
+        self.esperar(';')
+        return Imprimir(argumentos, linha)
+
+    def instrucao_retorno(self):
+        linha = self.tok.lineno
+        self.avancar()
+        if self.tok.type == ';':
+            self.avancar()
+            return Retorno(None, linha)
+        valor = self.expressao()
+        self.esperar(';')
+        return Retorno(valor, linha)
+
+    def instrucao_preencher(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        vetor = self.esperar('ID').value
+        self.esperar(',')
+        valor = self.expressao()
+        self.esperar(')')
+        self.esperar(';')
+        return Preencher(vetor, valor, linha)
+
+    def instrucao_copiar(self):
+        linha = self.tok.lineno
+        self.avancar()
+        self.esperar('(')
+        destino = self.esperar('ID').value
+        self.esperar(',')
+        origem = self.esperar('ID').value
+        self.esperar(')')
+        self.esperar(';')
+        return Copiar(destino, origem, linha)
+
+    def instrucao_bloco(self):
+        linha = self.tok.lineno
+        self.avancar()
+        instrucoes = yield self.instrucoes(('FIM',))
+        self.avancar()
+        return Bloco(instrucoes, linha)
+
+    INSTRUCOES = {
+        'ID': instrucao_id, 'IF': instrucao_se, 'WHILE': instrucao_enquanto,
+        'FOR': instrucao_para, 'PARALLEL_FOR': instrucao_para, 'DO': instrucao_faca,
+        'SWITCH': instrucao_escolha, 'BREAK': instrucao_interromper,
+        'CONTINUE': instrucao_continuar, 'PRINT': instrucao_imprimir,
+        'RETURN': instrucao_retorno, 'FILL': instrucao_preencher, 'COPY': instrucao_copiar,
+        'INICIO': instrucao_bloco,
+        **dict.fromkeys(TIPOS_TOKEN, instrucao_tipo),
+    }
+
+    # --- expressões --------------------------------------------------
+
+    def expressao(self):
+        # Pratt, com pilha explícita: junta operadores binários enquanto o
+        # nível for pelo menos 'minima'; o lado direito exige um nível acima,
+        # o que dá a associatividade à esquerda de todos eles. O que está
+        # aberto (unários, parênteses, índices, argumentos, lados direitos)
+        # fica em 'pilha', e o aninhamento não gasta a pilha do Python.
+        pilha = []
+        minima = 1
+        while True:
+            tok = self.tok
+            tipo = tok.type
+            if tipo == 'NAO_LOGICO' or tipo == 'MENOS':
+                self.avancar()
+                pilha.append(('unaria', tok.value))
+                continue
+            if tipo not in INICIO_EXPRESSAO:
+                self.erro()
+            self.avancar()
+            if tipo == 'ID':
+                proximo = self.tok.type
+                if proximo == '(':
+                    self.avancar()
+                    if self.tok.type != ')':
+                        pilha.append(('chamada', tok, [], minima))
+                        minima = 1
+                        continue
+                    self.avancar()
+                    valor = Chamada(tok.value, [], tok.lineno)
+                elif proximo == '[':
+                    self.avancar()
+                    pilha.append(('indice', tok, minima))
+                    minima = 1
+                    continue
+                else:
+                    valor = Variavel(tok.value, tok.lineno)
+            elif tipo == 'NUMERO':
+                valor = Literal(tok.value)
+            elif tipo == '(':
+                pilha.append(('parenteses', minima))
+                minima = 1
+                continue
+            elif tipo == 'BOOL_TRUE' or tipo == 'BOOL_FALSE':
+                valor = Literal(tok.value == 'vigia')
+            else:
+                self.esperar('(')
+                vetor = self.esperar('ID').value
+                self.esperar(')')
+                valor = Soma(vetor, tok.lineno)
+
+            # Fecha o que este operando completou, até achar um operador
+            # binário do nível atual (e voltar a ler um operando) ou acabar.
+            while True:
+                if pilha and pilha[-1][0] == 'unaria':
+                    valor = Unaria(pilha.pop()[1], valor)
+                    continue
+                nivel = PRECEDENCIA_TOKEN.get(self.tok.type)
+                if nivel is not None and nivel >= minima:
+                    pilha.append(('binaria', self.tok.value, valor, minima))
+                    self.avancar()
+                    minima = nivel + 1
+                    break
+                if not pilha:
+                    return valor
+                quadro = pilha.pop()
+                aberto = quadro[0]
+                if aberto == 'binaria':
+                    _, op, esquerda, minima = quadro
+                    valor = Binaria(op, esquerda, valor)
+                elif aberto == 'parenteses':
+                    self.esperar(')')
+                    minima = quadro[1]
+                elif aberto == 'indice':
+                    _, nome, minima = quadro
+                    self.esperar(']')
+                    valor = Indice(nome.value, valor, nome.lineno)
+                else:
+                    _, nome, argumentos, externa = quadro
+                    argumentos.append(valor)
+                    if self.tok.type == ',':
+                        self.avancar()
+                        pilha.append(quadro)
+                        minima = 1
+                        break
+                    self.esperar(')')
+                    minima = externa
+                    valor = Chamada(nome.value, argumentos, nome.lineno)
+
+    def chamada(self, nome):
+        # ID ( argumentos ); o ID já foi consumido e o token atual é o '('.
+        self.avancar()
+        argumentos = []
+        if self.tok.type != ')':
+            argumentos.append(self.expressao())
+            while self.tok.type == ',':
+                self.avancar()
+                argumentos.append(self.expressao())
+        self.esperar(')')
+        return Chamada(nome.value, argumentos, nome.lineno)
+
+# Motores de análise sintática, escolhidos por --parser. Os dois têm a mesma
+# interface: parse(tokens, ao_concluir_declaracao), diagnosticos,
+# nome_programa, tokens_lidos e contagem_reducoes().
+ANALISADORES_SINTATICOS = {'sly': GeradorCodigo, 'fast': AnalisadorDescendente}
+
+def _novo_parser(nome='sly'):
     try:
-        tokens = analisador_lexico.tokenize(codigo_formiga)
-        codigo_c = gerador_codigo.parse(tokens)
+        return ANALISADORES_SINTATICOS[nome]()
+    except KeyError:
+        raise ValueError(f"Erro: parser desconhecido: {nome!r}.") from None
 
-        arquivo_saida = arquivo_entrada.replace(".formiga", ".c")
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            f.write(f"// Programa: {gerador_codigo.nome_programa}\n")
-            f.write("#include <stdio.h>\n")
-            f.write("#include <stdbool.h>\n\n")
-            f.write(codigo_c)
+# =====================================================================
+#  ANÁLISE SEMÂNTICA
+# =====================================================================
+# Roda sobre cada função antes de ela ser otimizada ou emitida: confere
+# declarações e usos de variáveis e os tipos das expressões, anotando o
+# tipo de cada uma no campo 'tipo'. Assim esses erros aparecem aqui, com
+# a linha do .formiga, e não só depois no gcc.
+NOMES_TIPOS = {
+    'int': 'formigaInteira', 'float': 'formigaFlutuante', 'double': 'formigaFlutuante^2',
+    'char': 'formigaLetra', 'bool': 'formigaSentinela', 'long': 'formigaAncia',
+    'short': 'formigaLarva', 'unsigned': 'operario', 'void': 'tunelVazio',
+}
+# Ordem das conversões aritméticas usuais de C (simplificada para o LP64);
+# abaixo de 'int' tudo é promovido a 'int'.
+POSTO_ARITMETICO = {
+    'bool': 0, 'char': 1, 'short': 2, 'int': 3, 'unsigned': 4, 'long': 5,
+    'float': 6, 'double': 7,
+}
+TIPOS_INTEIROS = {'bool', 'char', 'short', 'int', 'unsigned', 'long'}
+OPERADORES_BOOLEANOS = {'==', '!=', '<', '>', '<=', '>=', '&&', '||'}
 
-        print(f"Compilação concluída! Arquivo C gerado: {arquivo_saida}")
+def _tipo_aritmetico(a, b):
+    tipo = a if POSTO_ARITMETICO[a] >= POSTO_ARITMETICO[b] else b
+    return tipo if POSTO_ARITMETICO[tipo] > POSTO_ARITMETICO['int'] else 'int'
 
-    except (ValueError, TypeError) as e:
-        print(e)
-        sys.exit(1)
+class Simbolo:
+    __slots__ = ('nome', 'tipo', 'nivel', 'declaracao')
+
+    def __init__(self, nome, tipo, nivel, declaracao):
+        self.nome = nome
+        self.tipo = tipo
+        self.nivel = nivel
+        self.declaracao = declaracao
+
+class TabelaSimbolos:
+    """Escopos aninhados com busca em tempo constante.
+
+    Em vez de uma pilha de dicionários (em que a busca percorre os escopos
+    de dentro para fora), cada nome aponta para a pilha das suas
+    declarações visíveis, com a mais interna no topo. Cada escopo lembra os
+    nomes que declarou, para desfazê-los ao fechar.
+    """
+    __slots__ = ('simbolos', 'escopos')
+
+    def __init__(self):
+        self.simbolos = {}
+        self.escopos = []
+
+    def abrir(self):
+        self.escopos.append([])
+
+    def fechar(self):
+        for nome in self.escopos.pop():
+            pilha = self.simbolos[nome]
+            pilha.pop()
+            if not pilha:
+                del self.simbolos[nome]
+
+    def buscar(self, nome):
+        pilha = self.simbolos.get(nome)
+        return pilha[-1] if pilha else None
+
+    def declarar(self, nome, tipo, declaracao):
+        """Declara nome no escopo atual; devolve a declaração anterior do
+        mesmo escopo, se houver, e nesse caso não declara nada."""
+        nivel = len(self.escopos)
+        anterior = self.buscar(nome)
+        if anterior is not None and anterior.nivel == nivel:
+            return anterior
+        self.simbolos.setdefault(nome, []).append(Simbolo(nome, tipo, nivel, declaracao))
+        self.escopos[-1].append(nome)
+        return None
+
+class _LacoParalelo:
+    # O que a análise observa dentro do corpo de um marcharJuntas. As
+    # variáveis declaradas fora dele (nível menor que 'nivel') são
+    # compartilhadas pelas threads.
+    __slots__ = ('nivel', 'profundidade', 'contador', 'alterados', 'escritas', 'lidas',
+                 'operandos')
+
+    def __init__(self, nivel, profundidade, contador):
+        self.nivel = nivel
+        self.profundidade = profundidade  # (laços, escolhas) no corpo do laço
+        self.contador = contador
+        self.alterados = set()    # nomes de fora alterados no corpo, inclusive vetores
+        self.escritas = {}        # Simbolo escalar -> [operador da redução ou None, linha]
+        self.lidas = set()        # Simbolos lidos fora de uma atualização de redução
+        self.operandos = set()    # id() das leituras que fazem parte de uma redução
+
+# Operador de redução de 'x = x op e' (ou 'x = e op x', se op comuta). Uma
+# subtração acumula com '+', como no OpenMP.
+REDUCOES_OPENMP = {'+': '+', '-': '+', '*': '*'}
+
+def _variavel(no, nome):
+    return isinstance(no, Variavel) and no.nome == nome
+
+def _operando_reducao(atribuicao):
+    # Devolve a leitura de 'x' em 'x = x op e', ou None se não é uma redução.
+    # 'x = x + a - b' é '(x + a) - b': desce pela esquerda enquanto os
+    # operadores forem da mesma redução, procurando x em cada nível.
+    valor = atribuicao.valor
+    if not isinstance(valor, Binaria) or valor.op not in REDUCOES_OPENMP:
+        return None
+    reducao = REDUCOES_OPENMP[valor.op]
+    while True:
+        if _variavel(valor.esquerda, atribuicao.nome):
+            return valor.esquerda
+        if valor.op != '-' and _variavel(valor.direita, atribuicao.nome):
+            return valor.direita
+        valor = valor.esquerda
+        if not isinstance(valor, Binaria) or REDUCOES_OPENMP.get(valor.op) != reducao:
+            return None
+
+def _invariante(no, alterados):
+    # Verdadeiro se no não chama funções nem lê nada em 'alterados'.
+    pendentes = [no]
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, Chamada):
+            return False
+        if isinstance(no, (Variavel, Soma)):
+            if (no.nome if isinstance(no, Variavel) else no.vetor) in alterados:
+                return False
+        elif isinstance(no, Indice):
+            if no.nome in alterados:
+                return False
+            pendentes.append(no.indice)
+        elif isinstance(no, Binaria):
+            pendentes += (no.esquerda, no.direita)
+        elif isinstance(no, Unaria):
+            pendentes.append(no.operando)
+    return True
+
+def _assinatura(declaracao):
+    # O que as chamadas e as redeclarações precisam de uma Funcao ou de um
+    # Prototipo: guardar o nó inteiro manteria o corpo vivo até o fim da
+    # compilação.
+    return (declaracao.tipo, tuple(p.tipo for p in declaracao.parametros), declaracao.linha)
+
+class AnalisadorSemantico:
+    def __init__(self):
+        self.diagnosticos = []
+        self.avisos = []    # não interrompem a compilação
+        self.funcoes = {}   # nome -> _assinatura() da primeira declaração com esse nome
+        self.definidas = {}  # nome -> linha da definição
+        self.tabela = TabelaSimbolos()
+        self.retorno = None  # tipo de retorno da função sendo analisada
+        self.lacos = 0
+        self.escolhas = 0
+        self.paralelo = None  # _LacoParalelo do marcharJuntas sendo analisado
+        self.linha = None
+
+    def erro(self, mensagem, linha=None):
+        self.diagnosticos.append(
+            Diagnostico('Erro Semântico', mensagem, None, linha or self.linha))
+
+    def aviso(self, mensagem, linha=None):
+        self.avisos.append(Diagnostico('Aviso', mensagem, None, linha or self.linha))
+
+    def declaracao(self, declaracao):
+        # As funções só podem ser chamadas depois de declaradas, como em C,
+        # para que cada uma seja analisada e emitida assim que é lida.
+        self.linha = declaracao.linha
+        self.assinatura(declaracao)
+        if isinstance(declaracao, Funcao):
+            _percorrer(self.funcao(declaracao))
+
+    def assinatura(self, declaracao):
+        assinatura = _assinatura(declaracao)
+        anterior = self.funcoes.get(declaracao.nome)
+        if anterior is None:
+            self.funcoes[declaracao.nome] = assinatura
+        elif anterior[:2] != assinatura[:2]:
+            self.erro(f"Declaração de '{declaracao.nome}' não confere com a da linha "
+                      f"{anterior[2]}.")
+        if declaracao.nome == 'natureza' and declaracao.parametros:
+            self.erro("natureza() não recebe parâmetros.")
+        for parametro in declaracao.parametros:
+            if parametro.tipo == 'void':
+                self.erro(f"Parâmetro '{parametro.nome}' declarado como tunelVazio.")
+
+    def funcao(self, funcao):
+        if funcao.nome in self.definidas:
+            self.erro(f"Função '{funcao.nome}' já foi definida na linha "
+                      f"{self.definidas[funcao.nome]}.")
+        else:
+            self.definidas[funcao.nome] = funcao.linha
+        # natureza() vira int main(), que aceita 'entregar;' (return 0) e
+        # 'entregar status;' qualquer que seja o tipo declarado.
+        self.retorno = None if funcao.nome == 'natureza' else funcao.tipo
+        # Os parâmetros ficam no mesmo escopo do corpo, como em C.
+        self.tabela.abrir()
+        for parametro in funcao.parametros:
+            parametro.constante = True
+            if self.tabela.declarar(parametro.nome, parametro.tipo, parametro) is not None:
+                self.erro(f"Parâmetro '{parametro.nome}' repetido.")
+        yield self.instrucoes(funcao.corpo)
+        self.tabela.fechar()
+
+    def bloco(self, instrucoes):
+        self.tabela.abrir()
+        yield self.instrucoes(instrucoes)
+        self.tabela.fechar()
+
+    def instrucoes(self, instrucoes):
+        for instrucao in instrucoes:
+            self.linha = instrucao.linha
+            passo = getattr(self, 'analisar_' + type(instrucao).__name__)(instrucao)
+            if passo is not None:
+                yield passo
+
+    # --- Instruções ------------------------------------------------------
+    # As que têm instruções dentro são geradores, percorridos por
+    # _percorrer(): um bloco aninhado não custa um nível da pilha do Python.
+    def analisar_DeclaracaoVariavel(self, no):
+        if no.tipo == 'void':
+            self.erro(f"Variável '{no.nome}' declarada como tunelVazio.")
+        anterior = self.tabela.declarar(no.nome, no.tipo, no)
+        if anterior is not None:
+            self.erro(f"Variável '{no.nome}' já foi declarada neste escopo "
+                      f"(linha {anterior.declaracao.linha}).")
+        if no.valor is not None:
+            no.constante = True
+            self.valor(no.valor)
+        if no.tamanho is not None:
+            tipo = self.valor(no.tamanho)
+            if tipo is not None and tipo not in TIPOS_INTEIROS:
+                self.erro(f"O tamanho do vetor '{no.nome}' deve ser inteiro.")
+            elif _literal_nao_positivo(no.tamanho):
+                self.erro(f"O tamanho do vetor '{no.nome}' deve ser positivo.")
+
+    def analisar_Atribuicao(self, no):
+        simbolo = self.tabela.buscar(no.nome)
+        if simbolo is None:
+            self.erro(f"Variável '{no.nome}' não foi declarada.")
+        elif no.indice is not None:
+            if not _vetor(simbolo):
+                self.erro(f"'{no.nome}' não é um vetor.")
+            self.indice(no.indice)
+        elif _vetor(simbolo):
+            self.erro(f"Não é possível atribuir ao vetor '{no.nome}' inteiro; use copiar().")
+        else:
+            simbolo.declaracao.constante = False
+        if self.paralelo is not None and simbolo is not None:
+            self.escrita_paralela(simbolo, no)
+        self.valor(no.valor)
+
+    def analisar_Preencher(self, no):
+        no.tipo = self.vetor(no.vetor)
+        if self.paralelo is not None:
+            self.paralelo.alterados.add(no.vetor)
+        self.valor(no.valor)
+
+    def analisar_Copiar(self, no):
+        if self.paralelo is not None:
+            self.paralelo.alterados.add(no.destino)
+        destino = self.vetor(no.destino)
+        origem = self.vetor(no.origem)
+        if destino is None or origem is None:
+            return
+        if destino != origem:
+            self.erro(f"copiar() exige vetores do mesmo tipo, não {NOMES_TIPOS[destino]} "
+                      f"e {NOMES_TIPOS[origem]}.")
+        tamanhos = [self.tabela.buscar(nome).declaracao.tamanho for nome in (no.destino, no.origem)]
+        if all(isinstance(t, Literal) for t in tamanhos):
+            no.menor = no.destino if tamanhos[0].valor <= tamanhos[1].valor else no.origem
+
+    def analisar_Imprimir(self, no):
+        for argumento in no.argumentos:
+            if not isinstance(argumento, Texto):
+                self.valor(argumento)
+
+    def analisar_Retorno(self, no):
+        if self.paralelo is not None:
+            self.erro("entregar não pode sair de um marcharJuntas.")
+        if no.valor is None:
+            if self.retorno not in ('void', None):
+                self.erro("entregar sem valor numa função que não é tunelVazio.")
+        elif self.valor(no.valor) is not None and self.retorno == 'void':
+            self.erro("Uma função tunelVazio não entrega valor.")
+
+    def analisar_Chamada(self, no):
+        self.expressao(no)
+
+    def analisar_Interromper(self, no):
+        if not self.lacos and not self.escolhas:
+            self.erro("retornarAoNinho fora de um laço ou inspecionarTunel.")
+        elif self.paralelo is not None and (self.lacos, self.escolhas) == self.paralelo.profundidade:
+            self.erro("retornarAoNinho não pode sair de um marcharJuntas: as iterações "
+                      "rodam em paralelo.")
+
+    def analisar_Continuar(self, no):
+        if not self.lacos:
+            self.erro("ignorarFolha fora de um laço.")
+
+    def analisar_Bloco(self, no):
+        yield self.bloco(no.corpo)
+
+    def analisar_Se(self, no):
+        yield self.se(no)
+        # Nada entre dois testes da cadeia muda uma variável (expressões não
+        # atribuem, e funções não enxergam as variáveis locais), então o
+        # mesmo 'x == c' repetido nunca é verdadeiro.
+        testados = {}
+        while isinstance(no, Se):
+            comparacao = _comparacao(no.condicao)
+            if comparacao is not None:
+                variavel, _, valor = comparacao
+                chave = (variavel.nome, _rotulo(valor, variavel.tipo))
+                if chave in testados:
+                    self.aviso(f"'{variavel.nome} == {valor}' já foi testado na linha "
+                               f"{testados[chave]}; este ramo nunca é executado.", no.linha)
+                else:
+                    testados[chave] = no.linha
+            no = no.senao
+
+    def se(self, no):
+        while True:
+            self.condicao(no.condicao)
+            yield self.bloco(no.corpo)
+            if not isinstance(no.senao, Se):
+                break
+            no = no.senao
+            self.linha = no.linha
+        if no.senao is not None:
+            yield self.bloco(no.senao)
+
+    def analisar_Enquanto(self, no):
+        self.condicao(no.condicao)
+        yield self.laco(no.corpo)
+
+    def analisar_Para(self, no):
+        # Uma declaração na inicialização vale só para o laço, como em C99.
+        self.tabela.abrir()
+        if no.inicializacao is not None:
+            yield self.instrucoes([no.inicializacao])
+        self.condicao(no.condicao)
+        self.analisar_Atribuicao(no.passo)
+        if no.paralelo:
+            yield self.laco_paralelo(no)
+        else:
+            yield self.laco(no.corpo)
+        self.tabela.fechar()
+
+    def analisar_FacaEnquanto(self, no):
+        yield self.laco(no.corpo)
+        self.condicao(no.condicao)
+
+    def analisar_Escolha(self, no):
+        tipo = self.expressao(no.expressao)
+        if tipo is not None and tipo not in TIPOS_INTEIROS:
+            self.erro(f"inspecionarTunel exige uma expressão inteira, não {NOMES_TIPOS[tipo]}.")
+        # Todos os caminhos dividem o mesmo escopo, como num switch de C.
+        self.escolhas += 1
+        self.tabela.abrir()
+        rotulos = {}
+        for caso in no.casos:
+            self.linha = caso.linha
+            tipo_caso = self.expressao(caso.valor)
+            if not _constante(caso.valor) or (tipo_caso is not None
+                                              and tipo_caso not in TIPOS_INTEIROS):
+                self.erro("O valor de um caminho deve ser uma constante inteira.")
+            elif tipo in TIPOS_INTEIROS:
+                self.rotulo(caso, tipo, rotulos)
+            yield self.instrucoes(caso.corpo)
+        self.tabela.fechar()
+        self.escolhas -= 1
+
+    def rotulo(self, caso, tipo, rotulos):
+        valor = _valor_constante(caso.valor)
+        if type(valor) is not int and type(valor) is not bool:
+            return  # estouro ou divisão por zero: fica para o compilador C
+        valor = int(valor)
+        convertido = _rotulo(valor, tipo)
+        if convertido is None:
+            caso.sem_rotulo = True
+            self.aviso(f"caminho {valor} nunca é escolhido: uma expressão "
+                       f"{NOMES_TIPOS[tipo]} não chega a esse valor.")
+        elif convertido in rotulos:
+            # Em C, um case repetido nem compila; vale o primeiro.
+            caso.sem_rotulo = True
+            self.aviso(f"caminho {valor} repetido; vale o da linha {rotulos[convertido]} "
+                       f"e este nunca é escolhido.")
+        else:
+            rotulos[convertido] = caso.linha
+
+    def laco(self, corpo):
+        self.lacos += 1
+        yield self.bloco(corpo)
+        self.lacos -= 1
+
+    # --- marcharJuntas ---------------------------------------------------
+    # O laço vira um '#pragma omp parallel for'. Para que o resultado seja o
+    # mesmo do laço serial, ele precisa estar na forma que o OpenMP divide
+    # entre as threads, não pode ser interrompido, e cada variável escalar
+    # de fora alterada no corpo tem de ser uma redução.
+    def laco_paralelo(self, no):
+        if self.paralelo is not None:
+            self.erro("marcharJuntas dentro de outro marcharJuntas.")
+            yield self.laco(no.corpo)
+            return
+        limite, passo = self.forma_paralela(no)
+        contador = no.inicializacao.nome if limite is not None else None
+        paralelo = self.paralelo = _LacoParalelo(len(self.tabela.escopos),
+                                                 (self.lacos + 1, self.escolhas), contador)
+        yield self.laco(no.corpo)
+        self.paralelo = None
+
+        no.reducoes = []
+        for simbolo, (operador, linha) in paralelo.escritas.items():
+            if operador is None or simbolo in paralelo.lidas:
+                self.erro(f"'{simbolo.nome}' é compartilhada pelas iterações de marcharJuntas: "
+                          f"só pode ser acumulada, como '{simbolo.nome} = {simbolo.nome} + ...', "
+                          f"e não pode ser lida no corpo.", linha)
+            else:
+                no.reducoes.append((operador, simbolo.nome))
+        alterados = paralelo.alterados | {contador}
+        if limite is not None and not (_invariante(limite, alterados)
+                                       and _invariante(passo, alterados)):
+            self.erro("O limite e o passo de marcharJuntas não podem mudar dentro do laço "
+                      "nem chamar funções.", no.linha)
+
+    def forma_paralela(self, no):
+        # Devolve o limite e o passo de 'tipo i = a; i < limite; i = i + passo'.
+        inicio = no.inicializacao
+        if (not isinstance(inicio, DeclaracaoVariavel) or inicio.tamanho is not None
+                or inicio.tipo not in TIPOS_INTEIROS or inicio.tipo == 'bool'):
+            self.erro("marcharJuntas precisa declarar um contador inteiro: "
+                      "marcharJuntas (formigaInteira i = ...; ...).", no.linha)
+            return None, None
+        nome = inicio.nome
+        condicao = no.condicao
+        if (not isinstance(condicao, Binaria) or condicao.op not in ('<', '<=', '>', '>=')
+                or _variavel(condicao.esquerda, nome) == _variavel(condicao.direita, nome)):
+            self.erro(f"A condição de marcharJuntas deve comparar '{nome}' com <, <=, > ou >=.",
+                      no.linha)
+            return None, None
+        limite = condicao.direita if _variavel(condicao.esquerda, nome) else condicao.esquerda
+        valor = no.passo.valor
+        operando = _operando_reducao(no.passo) if no.passo.indice is None else None
+        if (no.passo.nome != nome or operando is None or valor.op == '*'
+                or (operando is not valor.esquerda and operando is not valor.direita)):
+            self.erro(f"O passo de marcharJuntas deve ser '{nome} = {nome} + passo' ou "
+                      f"'{nome} = {nome} - passo'.", no.linha)
+            return None, None
+        passo = valor.direita if operando is valor.esquerda else valor.esquerda
+        return limite, passo
+
+    def escrita_paralela(self, simbolo, no):
+        paralelo = self.paralelo
+        if simbolo.nivel >= paralelo.nivel:
+            if no.nome == paralelo.contador and simbolo.nivel == paralelo.nivel:
+                self.erro(f"O contador '{no.nome}' de marcharJuntas não pode ser alterado "
+                          f"no corpo.")
+            return
+        paralelo.alterados.add(no.nome)
+        # Cada iteração escreve nos seus próprios elementos de um vetor;
+        # garantir isso fica por conta do programa.
+        if no.indice is not None or _vetor(simbolo):
+            return
+        operando = _operando_reducao(no)
+        operador = None if operando is None else REDUCOES_OPENMP[no.valor.op]
+        if operando is not None:
+            paralelo.operandos.add(id(operando))
+        anterior = paralelo.escritas.setdefault(simbolo, [operador, self.linha])
+        if anterior[0] != operador:
+            anterior[0] = None
+
+    # --- Expressões ------------------------------------------------------
+    def valor(self, no):
+        return self.com_valor(self.expressao(no))
+
+    def com_valor(self, tipo):
+        if tipo == 'void':
+            self.erro("Expressão do tipo tunelVazio não tem valor.")
+            return None
+        return tipo
+
+    def condicao(self, no):
+        return self.valor(no)
+
+    def expressao(self, no):
+        """Anota e devolve o tipo de no; None se já houve erro dentro dela."""
+        return _percorrer(self.tipo(no))
+
+    def tipo(self, no):
+        # Passo do percurso de expressao(): as folhas são anotadas aqui; os
+        # nós com operandos, por tipo_composto().
+        if isinstance(no, Literal):
+            tipo = ('bool' if isinstance(no.valor, bool)
+                    else 'int' if isinstance(no.valor, int) else 'double')
+        elif isinstance(no, Variavel):
+            simbolo = self.tabela.buscar(no.nome)
+            if simbolo is None:
+                self.erro(f"Variável '{no.nome}' não foi declarada.", no.linha)
+                tipo = None
+            elif _vetor(simbolo):
+                self.erro(f"O vetor '{no.nome}' precisa de um índice.", no.linha)
+                tipo = None
+            else:
+                tipo = simbolo.tipo
+                if (self.paralelo is not None and simbolo.nivel < self.paralelo.nivel
+                        and id(no) not in self.paralelo.operandos):
+                    self.paralelo.lidas.add(simbolo)
+        elif isinstance(no, Soma):
+            no.elemento = self.vetor(no.vetor, no.linha)
+            tipo = None if no.elemento is None else _tipo_aritmetico(no.elemento, 'int')
+        elif isinstance(no, Texto):
+            tipo = 'texto'
+        else:
+            return self.tipo_composto(no)
+        no.tipo = tipo
+        return tipo
+
+    def tipo_composto(self, no):
+        if isinstance(no, Indice):
+            simbolo = self.tabela.buscar(no.nome)
+            self.tipo_indice(self.com_valor((yield self.tipo(no.indice))))
+            if simbolo is None:
+                self.erro(f"Variável '{no.nome}' não foi declarada.", no.linha)
+                tipo = None
+            elif not _vetor(simbolo):
+                self.erro(f"'{no.nome}' não é um vetor.", no.linha)
+                tipo = None
+            else:
+                tipo = simbolo.tipo
+        elif isinstance(no, Unaria):
+            operando = self.com_valor((yield self.tipo(no.operando)))
+            if operando is None:
+                tipo = None
+            elif no.op == '!':
+                tipo = 'bool'
+            else:
+                tipo = _tipo_aritmetico(operando, 'int')
+        elif isinstance(no, Chamada):
+            for argumento in no.argumentos:
+                self.com_valor((yield self.tipo(argumento)))
+            tipo = self.chamada(no)
+        else:
+            esquerda = self.com_valor((yield self.tipo(no.esquerda)))
+            direita = self.com_valor((yield self.tipo(no.direita)))
+            if esquerda is None or direita is None:
+                tipo = None
+            elif no.op in OPERADORES_BOOLEANOS:
+                tipo = 'bool'
+            elif no.op == '%' and not (esquerda in TIPOS_INTEIROS and direita in TIPOS_INTEIROS):
+                self.erro(f"O operador '%' exige operandos inteiros, não "
+                          f"{NOMES_TIPOS[esquerda]} e {NOMES_TIPOS[direita]}.")
+                tipo = None
+            else:
+                tipo = _tipo_aritmetico(esquerda, direita)
+        no.tipo = tipo
+        return tipo
+
+    def indice(self, no):
+        self.tipo_indice(self.valor(no))
+
+    def tipo_indice(self, tipo):
+        if tipo is not None and tipo not in TIPOS_INTEIROS:
+            self.erro(f"O índice de um vetor deve ser inteiro, não {NOMES_TIPOS[tipo]}.")
+
+    def vetor(self, nome, linha=None):
+        # Devolve o tipo dos elementos do vetor 'nome', ou None se houve erro.
+        simbolo = self.tabela.buscar(nome)
+        if simbolo is None:
+            self.erro(f"Variável '{nome}' não foi declarada.", linha)
+            return None
+        if not _vetor(simbolo):
+            self.erro(f"'{nome}' não é um vetor.", linha)
+            return None
+        return simbolo.tipo
+
+    def chamada(self, no):
+        # Os argumentos já foram anotados por tipo_composto().
+        if self.tabela.buscar(no.nome) is not None:
+            self.erro(f"'{no.nome}' é uma variável, não uma função.", no.linha)
+            return None
+        assinatura = self.funcoes.get(no.nome)
+        if assinatura is None:
+            self.erro(f"Função '{no.nome}' não foi declarada.", no.linha)
+            return None
+        tipo, parametros, _ = assinatura
+        if len(no.argumentos) != len(parametros):
+            self.erro(f"Função '{no.nome}' espera {len(parametros)} "
+                      f"argumento(s), mas recebeu {len(no.argumentos)}.", no.linha)
+        return tipo
+
+def _vetor(simbolo):
+    return isinstance(simbolo.declaracao, DeclaracaoVariavel) and simbolo.declaracao.tamanho is not None
+
+def _literal_nao_positivo(no):
+    if isinstance(no, Unaria) and no.op == '-' and isinstance(no.operando, Literal):
+        return no.operando.valor >= 0
+    return isinstance(no, Literal) and no.valor <= 0
+
+def _constante(no):
+    pendentes = [no]
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, Unaria):
+            pendentes.append(no.operando)
+        elif isinstance(no, Binaria):
+            pendentes += (no.esquerda, no.direita)
+        elif not isinstance(no, Literal):
+            return False
+    return True
+
+def _valor_constante(no):
+    # Valor de uma expressão constante, sem alterar a árvore; None se não
+    # der para calcular.
+    return _percorrer(_calcular(no))
+
+def _calcular(no):
+    # Passo do percurso de _valor_constante().
+    if isinstance(no, Literal):
+        return no.valor
+    if isinstance(no, (Unaria, Binaria)):
+        return _calcular_operacao(no)
+    return None
+
+def _calcular_operacao(no):
+    if isinstance(no, Unaria):
+        valor = yield _calcular(no.operando)
+        if valor is None:
+            return None
+        return (not valor) if no.op == '!' else -valor
+    esquerda = yield _calcular(no.esquerda)
+    direita = yield _calcular(no.direita)
+    if esquerda is None or direita is None:
+        return None
+    return _dobrar_binaria(no.op, esquerda, direita)
+
+def _rotulo(valor, tipo):
+    # O valor como um switch sobre uma expressão do tipo o enxerga (depois
+    # da promoção para int); None se a expressão nunca chega a ele.
+    convertido = CONVERSOES_C[TIPOS_VM.index(_tipo_aritmetico(tipo, 'int'))](valor)
+    minimo, maximo = LIMITES_VM[TIPOS_VM.index(tipo)]
+    return convertido if minimo <= convertido <= maximo else None
+
+def _comparacao(condicao):
+    # (variável, constante, valor) de 'x == c' ou 'c == x', com x inteira.
+    if not isinstance(condicao, Binaria) or condicao.op != '==':
+        return None
+    for variavel, constante in ((condicao.esquerda, condicao.direita),
+                                (condicao.direita, condicao.esquerda)):
+        if isinstance(variavel, Variavel) and variavel.tipo in TIPOS_INTEIROS:
+            valor = _valor_constante(constante)
+            if type(valor) is int:
+                return variavel, constante, valor
+    return None
+
+def _sai_do_laco(instrucoes):
+    # Há um retornarAoNinho que sairia do laço em volta? Dentro de um switch
+    # ele passaria a sair só do switch.
+    pendentes = [instrucoes]
+    while pendentes:
+        for instrucao in pendentes.pop():
+            if isinstance(instrucao, Interromper):
+                return True
+            if isinstance(instrucao, Bloco):
+                pendentes.append(instrucao.corpo)
+            while isinstance(instrucao, Se):
+                pendentes.append(instrucao.corpo)
+                instrucao = instrucao.senao
+            if isinstance(instrucao, list):
+                pendentes.append(instrucao)
+    return False
+
+def _corpo_caso(corpo, linha):
+    # Um bloco próprio mantém o escopo das declarações do ramo (e C não
+    # aceita uma declaração logo depois do rótulo); o break evita cair no
+    # caminho seguinte.
+    if any(isinstance(instrucao, DeclaracaoVariavel) for instrucao in corpo):
+        instrucoes = [Bloco(corpo, linha)]
+    else:
+        instrucoes = list(corpo)
+    if not (corpo and isinstance(corpo[-1], (Retorno, Continuar))):
+        instrucoes.append(Interromper(linha))
+    return instrucoes
+
+# Comparações distintas a partir das quais uma cadeia vira switch. A partir
+# do -O1 o gcc já converte cadeias simples sozinho; no -O0 um switch curto
+# vira uma tabela de saltos que perde para a cadeia quando o valor varia ao
+# acaso (veja 'python benchmark.py despacho').
+MINIMO_ESCADA = 32
+
+# =====================================================================
+#  OTIMIZADOR (-O1)
+# =====================================================================
+# Dobra expressões constantes formadas por NUMERO, vigia e descansa
+# seguindo a semântica de C e remove ramos que nunca executam.
+INT_MIN, INT_MAX = -2**31, 2**31 - 1
+
+def _divisao_c(a, b):
+    # Divisão inteira de C: trunca em direção a zero.
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+def _dobrar_binaria(op, a, b):
+    """Calcula 'a op b' como C faria; None se não for seguro dobrar."""
+    if op == '&&':
+        return bool(a) and bool(b)
+    if op == '||':
+        return bool(a) or bool(b)
+    if op == '==':
+        return a == b
+    if op == '!=':
+        return a != b
+    if op == '<':
+        return a < b
+    if op == '>':
+        return a > b
+    if op == '<=':
+        return a <= b
+    if op == '>=':
+        return a >= b
+
+    flutuante = isinstance(a, float) or isinstance(b, float)
+    if op in '/%' and b == 0:
+        return None
+    if op == '+':
+        r = a + b
+    elif op == '-':
+        r = a - b
+    elif op == '*':
+        r = a * b
+    elif op == '/':
+        r = a / b if flutuante else _divisao_c(a, b)
+    elif flutuante:
+        return None  # '%' não existe para ponto flutuante em C
+    else:
+        r = a - _divisao_c(a, b) * b
+    if flutuante:
+        return float(r) if math.isfinite(r) else None
+    # Estouro de int é comportamento indefinido em C: deixamos para o gcc.
+    return int(r) if INT_MIN <= r <= INT_MAX else None
+
+class Otimizador:
+    def otimizar(self, programa):
+        for funcao in programa.funcoes:
+            if isinstance(funcao, Funcao):
+                self.funcao(funcao)
+        return programa
+
+    def funcao(self, funcao):
+        funcao.corpo = _percorrer(self.bloco(funcao.corpo))
+        return funcao
+
+    def bloco(self, instrucoes):
+        resultado = []
+        for instrucao in instrucoes:
+            nova = yield getattr(self, 'otimizar_' + type(instrucao).__name__)(instrucao)
+            if nova is not None:
+                resultado.append(nova)
+        return resultado
+
+    # --- Instruções ------------------------------------------------------
+    # Como na análise semântica, as instruções com outras dentro são
+    # geradores percorridos por _percorrer().
+    def otimizar_DeclaracaoVariavel(self, no):
+        if no.valor is not None:
+            no.valor = self.expressao(no.valor)
+        if no.tamanho is not None:
+            no.tamanho = self.expressao(no.tamanho)
+        return no
+
+    def otimizar_Atribuicao(self, no):
+        if no.indice is not None:
+            no.indice = self.expressao(no.indice)
+        no.valor = self.expressao(no.valor)
+        return no
+
+    def otimizar_Preencher(self, no):
+        no.valor = self.expressao(no.valor)
+        return no
+
+    def otimizar_Copiar(self, no):
+        return no
+
+    def otimizar_Retorno(self, no):
+        if no.valor is not None:
+            no.valor = self.expressao(no.valor)
+        return no
+
+    def otimizar_Chamada(self, no):
+        return self.expressao(no)
+
+    def otimizar_Imprimir(self, no):
+        no.argumentos = [a if isinstance(a, Texto) else self.expressao(a)
+                         for a in no.argumentos]
+        return no
+
+    def otimizar_Interromper(self, no):
+        return no
+
+    def otimizar_Continuar(self, no):
+        return no
+
+    def otimizar_Bloco(self, no):
+        no.corpo = yield self.bloco(no.corpo)
+        return no
+
+    def otimizar_Se(self, no):
+        # Percorre a cadeia seObstaculo/senaoSeOutroObstaculo descartando
+        # os ramos com condição falsa; um ramo com condição verdadeira
+        # vira o senaoCavar e encerra a cadeia.
+        ramos = []
+        senao = None
+        atual = no
+        while isinstance(atual, Se):
+            condicao = self.expressao(atual.condicao)
+            if isinstance(condicao, Literal):
+                if condicao.valor:
+                    senao = atual.corpo
+                    break
+            else:
+                ramos.append((condicao, atual.corpo, atual.linha))
+            atual = atual.senao
+        else:
+            senao = atual
+        if senao is not None:
+            senao = yield self.bloco(senao)
+
+        if not ramos:
+            # Blocos preservam o escopo das variáveis declaradas no ramo.
+            return Bloco(senao, no.linha) if senao else None
+        for condicao, corpo, linha in reversed(ramos):
+            senao = Se(condicao, (yield self.bloco(corpo)), senao, linha)
+        return self.escada(senao)
+
+    def escada(self, no):
+        # seObstaculo (x == 1) ... senaoSeOutroObstaculo (x == 2) ... sobre a
+        # mesma variável inteira vira um switch, que o gcc pode transformar
+        # numa tabela de saltos. O que sobra da cadeia vira o default.
+        casos = []
+        vistos = set()
+        variavel = None
+        atual = no
+        while isinstance(atual, Se):
+            comparacao = _comparacao(atual.condicao)
+            if comparacao is None or (variavel is not None and comparacao[0].nome != variavel.nome):
+                break
+            variavel, constante, valor = comparacao
+            convertido = _rotulo(valor, variavel.tipo)
+            if convertido is None or _sai_do_laco(atual.corpo):
+                return no
+            if convertido not in vistos:  # um teste repetido nunca é verdadeiro
+                vistos.add(convertido)
+                casos.append(Caso(constante, _corpo_caso(atual.corpo, atual.linha), atual.linha))
+            atual = atual.senao
+        if len(casos) < MINIMO_ESCADA:
+            return no
+        if atual is not None:
+            padrao = [atual] if isinstance(atual, Se) else atual
+            if _sai_do_laco(padrao):
+                return no
+            casos.append(Caso(None, _corpo_caso(padrao, no.linha), no.linha))
+        return Escolha(variavel, casos, no.linha)
+
+    def otimizar_Enquanto(self, no):
+        no.condicao = self.expressao(no.condicao)
+        if isinstance(no.condicao, Literal) and not no.condicao.valor:
+            return None
+        no.corpo = yield self.bloco(no.corpo)
+        return no
+
+    def otimizar_Para(self, no):
+        if no.inicializacao is not None:
+            no.inicializacao = getattr(self, 'otimizar_' + type(no.inicializacao).__name__)(no.inicializacao)
+        no.condicao = self.expressao(no.condicao)
+        no.passo = self.otimizar_Atribuicao(no.passo)
+        no.corpo = yield self.bloco(no.corpo)
+        return no
+
+    def otimizar_FacaEnquanto(self, no):
+        no.corpo = yield self.bloco(no.corpo)
+        no.condicao = self.expressao(no.condicao)
+        return no
+
+    def otimizar_Escolha(self, no):
+        no.expressao = self.expressao(no.expressao)
+        for caso in no.casos:
+            if caso.valor is not None:
+                caso.valor = self.expressao(caso.valor)
+            caso.corpo = yield self.bloco(caso.corpo)
+        return no
+
+    # --- Expressões ------------------------------------------------------
+    def expressao(self, no):
+        return _percorrer(self.dobrar(no))
+
+    def dobrar(self, no):
+        # Passo do percurso de expressao(): folhas voltam como estão.
+        if isinstance(no, (Binaria, Unaria, Chamada, Indice)):
+            return self.dobrar_composta(no)
+        return no
+
+    def dobrar_composta(self, no):
+        if isinstance(no, Binaria):
+            no.esquerda = yield self.dobrar(no.esquerda)
+            no.direita = yield self.dobrar(no.direita)
+            esquerda, direita = no.esquerda, no.direita
+            if isinstance(esquerda, Literal):
+                # Curto-circuito: o lado direito nem seria avaliado.
+                if no.op == '&&' and not esquerda.valor:
+                    return Literal(False, no.tipo)
+                if no.op == '||' and esquerda.valor:
+                    return Literal(True, no.tipo)
+                if isinstance(direita, Literal):
+                    valor = _dobrar_binaria(no.op, esquerda.valor, direita.valor)
+                    if valor is not None:
+                        return Literal(valor, no.tipo)
+            return no
+        if isinstance(no, Unaria):
+            no.operando = yield self.dobrar(no.operando)
+            if isinstance(no.operando, Literal):
+                if no.op == '!':
+                    return Literal(not no.operando.valor, no.tipo)
+                valor = -no.operando.valor
+                if isinstance(valor, float) or INT_MIN <= valor <= INT_MAX:
+                    return Literal(valor, no.tipo)
+            return no
+        if isinstance(no, Chamada):
+            argumentos = []
+            for argumento in no.argumentos:
+                argumentos.append((yield self.dobrar(argumento)))
+            no.argumentos = argumentos
+        else:
+            no.indice = yield self.dobrar(no.indice)
+        return no
+
+# =====================================================================
+#  OTIMIZADOR DE LAÇOS (-O2)
+# =====================================================================
+# Roda depois do Otimizador, sobre cada enquantoHouverComida, marchar,
+# marcharJuntas e cavarAteEnquanto. As subexpressões que não mudam de uma
+# volta para outra são calculadas uma vez, em constantes declaradas antes
+# do laço, e cada 'i * c' sobre o contador de um marchar vira uma
+# variável que cresce a cada volta.
+def _divisor_seguro(no):
+    # Só saem do laço divisões que não podem falhar nem estourar: por um
+    # literal que não seja 0 nem -1 (INT_MIN / -1).
+    return isinstance(no, Literal) and no.valor not in (0, -1)
+
+def _pode_estourar(no):
+    # Conta com sinal que estoura para algum valor dos operandos. Em C isso
+    # é indefinido, e fora do laço ela rodaria mesmo quando o laço não roda
+    # ou o ramo que a continha não é tomado. char, short e bool já viram int.
+    if no.tipo not in ('int', 'long'):
+        return False
+    if isinstance(no, Unaria):
+        return no.op == '-' and not isinstance(no.operando, Literal)
+    if isinstance(no, Soma):
+        return True
+    return no.op in ('+', '-', '*')
+
+def _vale_mover(no):
+    # Variáveis e literais soltos não ganham nada numa temporária, e as
+    # expressões constantes ficam para o gcc.
+    while isinstance(no, Unaria):
+        no = no.operando
+    return isinstance(no, (Binaria, Soma)) and not _constante(no)
+
+def _forma(no):
+    # Chave estrutural de uma expressão que pode sair do laço: expressões
+    # iguais usam a mesma temporária. Os nós vão em pré-ordem numa tupla
+    # só (cada tipo tem um número fixo de filhos, então a ordem basta),
+    # que o Python compara sem descer por tuplas aninhadas.
+    forma = []
+    pendentes = [no]
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, Literal):
+            forma += ('Literal', type(no.valor), repr(no.valor), no.tipo)
+        elif isinstance(no, Variavel):
+            forma += ('Variavel', no.nome)
+        elif isinstance(no, Soma):
+            forma += ('Soma', no.vetor)
+        elif isinstance(no, Unaria):
+            forma += ('Unaria', no.op, no.tipo)
+            pendentes.append(no.operando)
+        else:
+            forma += ('Binaria', no.op, no.tipo)
+            pendentes += (no.direita, no.esquerda)
+    return tuple(forma)
+
+def _nomes(no, nomes):
+    # Todos os nomes que aparecem em no, para que as temporárias não
+    # colidam com uma variável ou função do programa.
+    pendentes = [no]
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, list):
+            pendentes += no
+        elif isinstance(no, No):
+            for campo in no.__slots__:
+                valor = getattr(no, campo)
+                if isinstance(valor, str):
+                    nomes.add(valor)
+                elif isinstance(valor, (list, No)):
+                    pendentes.append(valor)
+    return nomes
+
+def _alterados(instrucoes, nomes):
+    # Nomes declarados ou atribuídos (inclusive posições e vetores inteiros)
+    # em qualquer ponto das instruções, laços internos incluídos.
+    pendentes = [instrucoes]
+    while pendentes:
+        for instrucao in pendentes.pop():
+            if isinstance(instrucao, (DeclaracaoVariavel, Atribuicao)):
+                nomes.add(instrucao.nome)
+            elif isinstance(instrucao, Preencher):
+                nomes.add(instrucao.vetor)
+            elif isinstance(instrucao, Copiar):
+                nomes.add(instrucao.destino)
+            elif isinstance(instrucao, Para):
+                pendentes.append([i for i in (instrucao.inicializacao, instrucao.passo)
+                                  if i is not None])
+                pendentes.append(instrucao.corpo)
+            elif isinstance(instrucao, (Bloco, Enquanto, FacaEnquanto)):
+                pendentes.append(instrucao.corpo)
+            elif isinstance(instrucao, Escolha):
+                pendentes += [caso.corpo for caso in instrucao.casos]
+            while isinstance(instrucao, Se):
+                pendentes.append(instrucao.corpo)
+                instrucao = instrucao.senao
+            if isinstance(instrucao, list):
+                pendentes.append(instrucao)
+    return nomes
+
+def _continua(instrucoes):
+    # Há um ignorarFolha que volta para o laço em volta? Ele pularia a
+    # atualização que a redução de força coloca no fim do corpo.
+    pendentes = [instrucoes]
+    while pendentes:
+        for instrucao in pendentes.pop():
+            if isinstance(instrucao, Continuar):
+                return True
+            if isinstance(instrucao, Bloco):
+                pendentes.append(instrucao.corpo)
+            elif isinstance(instrucao, Escolha):
+                pendentes += [caso.corpo for caso in instrucao.casos]
+            while isinstance(instrucao, Se):
+                pendentes.append(instrucao.corpo)
+                instrucao = instrucao.senao
+            if isinstance(instrucao, list):
+                pendentes.append(instrucao)
+    return False
+
+def _passo_contador(passo):
+    # (contador, sinal, s) de um passo 'i = i + s' ou 'i = i - s', com s
+    # literal inteiro; None para qualquer outro.
+    valor = passo.valor
+    if passo.indice is not None or not isinstance(valor, Binaria) or valor.op not in ('+', '-'):
+        return None
+    if _variavel(valor.esquerda, passo.nome):
+        contador, incremento = valor.esquerda, valor.direita
+    elif valor.op == '+' and _variavel(valor.direita, passo.nome):
+        contador, incremento = valor.direita, valor.esquerda
+    else:
+        return None
+    if not (isinstance(incremento, Literal) and type(incremento.valor) is int):
+        return None
+    return contador, valor.op, incremento.valor
+
+# Tipos em que 'i * c' pode virar uma soma acumulada. operario dá a volta do
+# mesmo jeito nas duas contas. Em int, a soma de depois da última volta
+# estouraria mesmo sem o programa original estourar, então o acumulador é um
+# long (com contador, s e c cabendo em int, ele não estoura) e o corpo lê uma
+# cópia int dele. long não tem um tipo maior para isso, e em float e double
+# o arredondamento seria outro.
+TIPOS_REDUCAO = {'int', 'unsigned'}
+
+class OtimizadorLacos:
+    def funcao(self, funcao):
+        self.usados = _nomes(funcao, set())
+        self.contador = 0
+        funcao.corpo = _percorrer(self.bloco(funcao.corpo))
+        return funcao
+
+    def bloco(self, instrucoes):
+        resultado = []
+        for instrucao in instrucoes:
+            resultado.append((yield self.instrucao(instrucao)))
+        return resultado
+
+    def instrucao(self, no):
+        # Procura os laços; cada um é otimizado antes dos que tem dentro,
+        # para que uma expressão saia do laço mais externo possível.
+        if isinstance(no, (Enquanto, Para, FacaEnquanto)):
+            return self.laco(no)
+        if isinstance(no, (Bloco, Escolha, Se)):
+            return self.corpos(no)
+        return no
+
+    def corpos(self, no):
+        # Passo de instrucao() para as instruções com outras dentro; é um
+        # gerador, como os da análise semântica.
+        if isinstance(no, Bloco):
+            no.corpo = yield self.bloco(no.corpo)
+        elif isinstance(no, Escolha):
+            for caso in no.casos:
+                caso.corpo = yield self.bloco(caso.corpo)
+        else:
+            atual = no
+            while True:
+                atual.corpo = yield self.bloco(atual.corpo)
+                if not isinstance(atual.senao, Se):
+                    break
+                atual = atual.senao
+            if atual.senao is not None:
+                atual.senao = yield self.bloco(atual.senao)
+        return no
+
+    def nome(self, prefixo):
+        while True:
+            nome = f'{prefixo}{self.contador}'
+            self.contador += 1
+            if nome not in self.usados:
+                return nome
+
+    def laco(self, no):
+        self.linha = no.linha
+        self.alterados = _alterados([no], set())
+        self.moveis = {}
+        self.temporarias = {}
+        self.antes = []
+        no.condicao = self.mover(no.condicao)
+        if isinstance(no, Para):
+            _percorrer(self.expressoes([no.passo], self.mover))
+        _percorrer(self.expressoes(no.corpo, self.mover))
+        inicio = self.reduzir(no) if isinstance(no, Para) else []
+        antes = self.antes
+        no.corpo = yield self.bloco(no.corpo)
+        if not (antes or inicio):
+            return no
+        # O bloco limita o escopo das temporárias ao laço.
+        return Bloco(antes + inicio + [no], no.linha)
+
+    # --- Movimento de invariantes ----------------------------------------
+    # Cada percurso de expressão (movel, mover, multiplicacao) tem um passo
+    # que resolve as folhas e um gerador para os nós com operandos, como na
+    # análise semântica.
+    def movel(self, no):
+        # Pode ser calculada antes do laço: não lê nada alterado nele, não
+        # chama funções e não pode falhar nem estourar (índices, divisões por
+        # variáveis e contas com sinal ficam onde estão).
+        return _percorrer(self.passo_movel(no))
+
+    def passo_movel(self, no):
+        movel = self.moveis.get(id(no))
+        if movel is None:
+            if isinstance(no, Literal):
+                movel = True
+            elif isinstance(no, Variavel):
+                movel = no.nome not in self.alterados
+            elif isinstance(no, Soma):
+                movel = no.vetor not in self.alterados and not _pode_estourar(no)
+            elif isinstance(no, (Unaria, Binaria)):
+                return self.operacao_movel(no)
+            else:
+                movel = False
+            self.moveis[id(no)] = movel
+        return movel
+
+    def operacao_movel(self, no):
+        if _pode_estourar(no):
+            movel = False
+        elif isinstance(no, Unaria):
+            movel = yield self.passo_movel(no.operando)
+        else:
+            movel = ((no.op not in '/%' or _divisor_seguro(no.direita))
+                     and (yield self.passo_movel(no.esquerda))
+                     and (yield self.passo_movel(no.direita)))
+        self.moveis[id(no)] = movel
+        return movel
+
+    def mover(self, no):
+        return _percorrer(self.passo_mover(no))
+
+    def passo_mover(self, no):
+        if self.movel(no):
+            return self.temporaria(no) if _vale_mover(no) else no
+        if isinstance(no, (Binaria, Unaria, Chamada, Indice)):
+            return self.operandos_mover(no)
+        return no
+
+    def operandos_mover(self, no):
+        if isinstance(no, Binaria):
+            no.esquerda = yield self.passo_mover(no.esquerda)
+            no.direita = yield self.passo_mover(no.direita)
+        elif isinstance(no, Unaria):
+            no.operando = yield self.passo_mover(no.operando)
+        elif isinstance(no, Chamada):
+            argumentos = []
+            for argumento in no.argumentos:
+                argumentos.append((yield self.passo_mover(argumento)))
+            no.argumentos = argumentos
+        else:
+            no.indice = yield self.passo_mover(no.indice)
+        return no
+
+    def temporaria(self, no, constante=True):
+        # Uma constante declarada antes do laço com o valor de no. Ela é
+        # calculada mesmo que o laço não rode, então no não pode falhar nem
+        # estourar (veja movel()).
+        forma = _forma(no)
+        nome = self.temporarias.get(forma)
+        if nome is None:
+            nome = self.temporarias[forma] = self.nome('formiga_inv')
+            self.antes.append(DeclaracaoVariavel(no.tipo, nome, no, self.linha, constante))
+        return Variavel(nome, self.linha, no.tipo)
+
+    def expressoes(self, instrucoes, trocar):
+        # Troca cada expressão das instruções por trocar(expressão), laços
+        # internos incluídos. Gerador, para _percorrer().
+        for no in instrucoes:
+            if isinstance(no, DeclaracaoVariavel):
+                if no.valor is not None:
+                    no.valor = trocar(no.valor)
+                if no.tamanho is not None:
+                    no.tamanho = trocar(no.tamanho)
+            elif isinstance(no, Atribuicao):
+                if no.indice is not None:
+                    no.indice = trocar(no.indice)
+                no.valor = trocar(no.valor)
+            elif isinstance(no, Preencher):
+                no.valor = trocar(no.valor)
+            elif isinstance(no, Retorno):
+                if no.valor is not None:
+                    no.valor = trocar(no.valor)
+            elif isinstance(no, Imprimir):
+                no.argumentos = [a if isinstance(a, Texto) else trocar(a) for a in no.argumentos]
+            elif isinstance(no, Chamada):
+                no.argumentos = [trocar(a) for a in no.argumentos]
+            elif isinstance(no, Bloco):
+                yield self.expressoes(no.corpo, trocar)
+            elif isinstance(no, Escolha):
+                no.expressao = trocar(no.expressao)
+                for caso in no.casos:
+                    yield self.expressoes(caso.corpo, trocar)
+            elif isinstance(no, (Enquanto, FacaEnquanto)):
+                no.condicao = trocar(no.condicao)
+                yield self.expressoes(no.corpo, trocar)
+            elif isinstance(no, Para):
+                if no.inicializacao is not None:
+                    yield self.expressoes([no.inicializacao], trocar)
+                no.condicao = trocar(no.condicao)
+                yield self.expressoes([no.passo], trocar)
+                yield self.expressoes(no.corpo, trocar)
+            while isinstance(no, Se):
+                no.condicao = trocar(no.condicao)
+                yield self.expressoes(no.corpo, trocar)
+                no = no.senao
+            if isinstance(no, list):
+                yield self.expressoes(no, trocar)
+
+    # --- Redução de força ------------------------------------------------
+    def reduzir(self, no):
+        # Em marchar (i = a; ...; i = i + s), com i alterada só pelo passo,
+        # cada 'i * c' (c invariante) vira uma variável que começa em a * c
+        # e soma s * c no fim de cada volta. A inicialização sai do for para
+        # que a variável possa começar depois dela. Devolve as instruções
+        # que vão antes do laço; as cópias int vão no começo do corpo.
+        if no.paralelo or _continua(no.corpo):
+            return []  # nem as threads nem um ignorarFolha passam pelo fim do corpo
+        passo = _passo_contador(no.passo)
+        if passo is None or no.passo.nome in _alterados(no.corpo, set()):
+            return []
+        contador, sinal, self.incremento = passo
+        if (contador.tipo not in TIPOS_REDUCAO
+                or CONVERSOES_C[TIPOS_VM.index('int')](self.incremento) != self.incremento):
+            return []
+        self.contador_laco = contador
+        self.acumuladores = {}
+        self.declaracoes = []
+        self.copias = []
+        # A cópia int de um acumulador só existe dentro do corpo.
+        self.na_condicao = True
+        no.condicao = self.multiplicacao(no.condicao)
+        self.na_condicao = False
+        _percorrer(self.expressoes(no.corpo, self.multiplicacao))
+        if not self.acumuladores:
+            return []
+        for nome, tipo, crescimento, _ in self.acumuladores.values():
+            no.corpo.append(Atribuicao(nome, Binaria(sinal, Variavel(nome, no.linha, tipo),
+                                                      crescimento, tipo), no.linha))
+        no.corpo[:0] = self.copias
+        inicio = [] if no.inicializacao is None else [no.inicializacao]
+        no.inicializacao = None
+        return inicio + self.declaracoes
+
+    def multiplicacao(self, no):
+        return _percorrer(self.passo_multiplicacao(no))
+
+    def passo_multiplicacao(self, no):
+        if isinstance(no, (Binaria, Unaria, Chamada, Indice)):
+            return self.operandos_multiplicacao(no)
+        return no
+
+    def operandos_multiplicacao(self, no):
+        if isinstance(no, Binaria):
+            if no.op == '*' and no.tipo in TIPOS_REDUCAO and not (
+                    self.contador_laco.tipo == 'unsigned' and no.tipo != 'unsigned'):
+                for contador, fator in ((no.esquerda, no.direita), (no.direita, no.esquerda)):
+                    if _variavel(contador, self.contador_laco.nome) and self.fator(fator):
+                        acumulador = self.acumulador(no, fator)
+                        if acumulador is not None:
+                            return acumulador
+            no.esquerda = yield self.passo_multiplicacao(no.esquerda)
+            no.direita = yield self.passo_multiplicacao(no.direita)
+        elif isinstance(no, Unaria):
+            no.operando = yield self.passo_multiplicacao(no.operando)
+        elif isinstance(no, Chamada):
+            argumentos = []
+            for argumento in no.argumentos:
+                argumentos.append((yield self.passo_multiplicacao(argumento)))
+            no.argumentos = argumentos
+        else:
+            no.indice = yield self.passo_multiplicacao(no.indice)
+        return no
+
+    def fator(self, no):
+        # Depois do movimento de invariantes, um fator invariante é um
+        # literal ou uma variável (talvez uma das temporárias).
+        if isinstance(no, Literal):
+            return type(no.valor) is int
+        return (isinstance(no, Variavel) and no.tipo in TIPOS_INTEIROS
+                and no.nome not in self.alterados)
+
+    def acumulador(self, no, fator):
+        chave = (_forma(fator), no.tipo)
+        if chave not in self.acumuladores:
+            if no.tipo == 'int' and self.na_condicao:
+                return None
+            tipo = 'long' if no.tipo == 'int' else no.tipo
+            if isinstance(fator, Variavel) and _tipo_aritmetico('int', fator.tipo) != no.tipo:
+                # Em C, s * c é feito no tipo de c promovido; se ele for menor
+                # que o da multiplicação, o produto sairia diferente.
+                return None
+            if tipo != no.tipo and isinstance(fator, Variavel):
+                # c já em long, para que nem s * c nem i * c estourem.
+                largo = self.nome('formiga_inv')
+                self.antes.append(DeclaracaoVariavel(tipo, largo, fator, self.linha, True))
+                fator = Variavel(largo, self.linha, tipo)
+            crescimento = self.crescimento(fator, tipo)
+            if crescimento is None:
+                return None
+            nome = uso = self.nome('formiga_ind')
+            if tipo == no.tipo:
+                # Começa com o valor da própria multiplicação, já depois da
+                # inicialização do contador.
+                self.declaracoes.append(DeclaracaoVariavel(tipo, nome, no, self.linha))
+            else:
+                contador = Variavel(self.contador_laco.nome, self.linha, self.contador_laco.tipo)
+                self.declaracoes += [
+                    DeclaracaoVariavel(tipo, nome, contador, self.linha),
+                    Atribuicao(nome, Binaria('*', Variavel(nome, self.linha, tipo), fator, tipo),
+                               self.linha)]
+                uso = self.nome('formiga_val')
+                self.copias.append(DeclaracaoVariavel(no.tipo, uso, Variavel(nome, self.linha, tipo),
+                                                      self.linha, True))
+            self.acumuladores[chave] = (nome, tipo, crescimento, uso)
+        return Variavel(self.acumuladores[chave][3], self.linha, no.tipo)
+
+    def crescimento(self, fator, tipo):
+        # s * c calculado no tipo do acumulador; None se o valor não der
+        # para garantir.
+        if isinstance(fator, Literal):
+            exato = self.incremento * fator.valor
+            valor = CONVERSOES_C[TIPOS_VM.index(tipo)](exato)
+            if tipo != 'unsigned' and valor != exato:
+                return None
+            return Literal(valor, tipo)
+        fator = Variavel(fator.nome, self.linha, fator.tipo)
+        if self.incremento == 1:
+            return fator
+        return self.temporaria(Binaria('*', Literal(self.incremento, 'int'), fator, tipo))
+
+# =====================================================================
+#  EMISSOR DE CÓDIGO C
+# =====================================================================
+# Percorre a AST e produz o texto C com a indentação correta. Os pedaços
+# vão para uma lista plana, unida uma única vez no final.
+PRECEDENCIA_C = {
+    '||': 1, '&&': 2, '==': 3, '!=': 3,
+    '<': 4, '>': 4, '<=': 4, '>=': 4,
+    '+': 5, '-': 5, '*': 6, '/': 6, '%': 6,
+}
+PRECEDENCIA_UNARIA = 7
+
+# Especificador do printf para cada tipo anotado pela análise semântica;
+# float vai como double nos argumentos variádicos. Sem tipo, fica o %d.
+FORMATOS_PRINTF = {
+    'int': '%d', 'short': '%d', 'bool': '%d', 'char': '%c',
+    'long': '%ld', 'unsigned': '%u', 'float': '%f', 'double': '%f',
+}
+
+# Auxiliares de preencher() e somar(), uma por tipo de elemento. Cada uma é
+# escrita uma vez, antes da primeira função que a usa; são laços simples que
+# o gcc vetoriza a partir de -O2.
+AUXILIARES_C = {
+    'preencher': ('static void formiga_preencher_{elemento}({elemento} *v, size_t n, {elemento} x) {{\n'
+                  '\tfor (size_t i = 0; i < n; i++) {{\n\t\tv[i] = x;\n\t}}\n}}\n'),
+    'somar': ('static {tipo} formiga_somar_{elemento}(const {elemento} *v, size_t n) {{\n'
+              '\t{tipo} soma = 0;\n'
+              '\tfor (size_t i = 0; i < n; i++) {{\n\t\tsoma += v[i];\n\t}}\n'
+              '\treturn soma;\n}}\n'),
+}
+
+def _elementos(vetor):
+    # Vale também para vetores de tamanho variável: o sizeof deles é
+    # calculado na declaração.
+    return f'sizeof {vetor} / sizeof {vetor}[0]'
+
+class EmissorC:
+    def __init__(self):
+        self.partes = []
+        self.auxiliares = {}  # nome -> código, na ordem do primeiro uso
+        self.auxiliares_escritas = set()
+        self.em_main = False
+
+    def emitir(self, programa):
+        self.partes = []
+        for funcao in programa.funcoes:
+            self.funcao(funcao)
+        return self.concluir()
+
+    def emitir_funcao(self, funcao):
+        self.partes = []
+        self.funcao(funcao)
+        return self.concluir()
+
+    def emitir_funcao_isolada(self, funcao):
+        # Para o -j: devolve as auxiliares que a função usa, mesmo as já
+        # escritas antes, separadas do código dela. Quem junta os trechos
+        # deixa uma cópia só de cada uma.
+        self.auxiliares_escritas = set()
+        self.partes = []
+        self.funcao(funcao)
+        auxiliares, codigo = self.auxiliares, ''.join(self.partes)
+        self.partes = []
+        self.auxiliares = {}
+        return auxiliares, codigo
+
+    def concluir(self):
+        codigo = ''.join([*self.auxiliares.values(), *self.partes])
+        self.partes = []
+        self.auxiliares = {}
+        return codigo
+
+    def auxiliar(self, operacao, elemento, tipo=None):
+        nome = f'formiga_{operacao}_{elemento}'
+        if nome not in self.auxiliares_escritas:
+            self.auxiliares_escritas.add(nome)
+            self.auxiliares[nome] = AUXILIARES_C[operacao].format(elemento=elemento, tipo=tipo)
+        return nome
+
+    def funcao(self, funcao):
+        if isinstance(funcao, Prototipo):
+            self.partes.append(f'{funcao.tipo} {funcao.nome}'
+                               f'({self.parametros(funcao.parametros, False)});\n')
+            return
+        # natureza() vira um main padrão (int, return 0) qualquer que seja
+        # o tipo declarado, para compilar sem avisos e devolver status 0.
+        if funcao.nome == 'natureza':
+            self.em_main = True
+            self.partes.append('int main(void) {\n')
+            _percorrer(self.bloco(funcao.corpo, 1))
+            if not (funcao.corpo and isinstance(funcao.corpo[-1], Retorno)):
+                self.partes.append('\treturn 0;\n')
+            self.partes.append('}\n')
+            self.em_main = False
+            return
+        self.partes.append(f'{funcao.tipo} {funcao.nome}'
+                           f'({self.parametros(funcao.parametros, True)}) {{\n')
+        _percorrer(self.bloco(funcao.corpo, 1))
+        self.partes.append('}\n')
+
+    def parametros(self, parametros, definicao):
+        # const só na definição: num protótipo ele não faz diferença.
+        if not parametros:
+            return 'void'
+        return ', '.join(f"{'const ' if definicao and p.constante else ''}{p.tipo} {p.nome}"
+                         for p in parametros)
+
+    def bloco(self, instrucoes, nivel):
+        # Gerador, para _percorrer(), como os emitir_* das instruções com
+        # outras dentro: o aninhamento não gasta a pilha do Python.
+        for instrucao in instrucoes:
+            passo = getattr(self, 'emitir_' + type(instrucao).__name__)(instrucao, nivel)
+            if passo is not None:
+                yield passo
+
+    def linha(self, nivel, texto):
+        self.partes.append('\t' * nivel + texto + '\n')
+
+    # --- Instruções ------------------------------------------------------
+    def emitir_DeclaracaoVariavel(self, no, nivel):
+        self.linha(nivel, self.declaracao(no) + ';')
+
+    def emitir_Atribuicao(self, no, nivel):
+        self.linha(nivel, self.atribuicao(no) + ';')
+
+    def emitir_Imprimir(self, no, nivel):
+        # Um único printf por sinalizar: os textos vão direto para o
+        # formato e cada expressão ganha o especificador do seu tipo.
+        formato = []
+        valores = []
+        for argumento in no.argumentos:
+            if isinstance(argumento, Texto):
+                formato.append(argumento.valor[1:-1].replace('%', '%%'))
+            else:
+                formato.append(FORMATOS_PRINTF.get(argumento.tipo, '%d'))
+                valores.append(self.expressao(argumento))
+        argumentos = ''.join(', ' + valor for valor in valores)
+        self.linha(nivel, f'printf("{"".join(formato)}\\n"{argumentos});')
+
+    def emitir_Retorno(self, no, nivel):
+        if no.valor is not None:
+            self.linha(nivel, f'return {self.expressao(no.valor)};')
+        else:
+            self.linha(nivel, 'return 0;' if self.em_main else 'return;')
+
+    def emitir_Chamada(self, no, nivel):
+        self.linha(nivel, self.expressao(no) + ';')
+
+    def emitir_Preencher(self, no, nivel):
+        valor = no.valor
+        if isinstance(valor, Literal) and valor.valor == 0:
+            self.linha(nivel, f'memset({no.vetor}, 0, sizeof {no.vetor});')
+        else:
+            self.linha(nivel, f'{self.auxiliar("preencher", no.tipo)}({no.vetor}, '
+                              f'{_elementos(no.vetor)}, {self.expressao(valor)});')
+
+    def emitir_Copiar(self, no, nivel):
+        if no.destino == no.origem:
+            return
+        destino, origem = no.destino, no.origem
+        if no.menor is not None:
+            tamanho = f'sizeof {no.menor}'
+        else:
+            tamanho = f'sizeof {destino} < sizeof {origem} ? sizeof {destino} : sizeof {origem}'
+        self.linha(nivel, f'memcpy({destino}, {origem}, {tamanho});')
+
+    def emitir_Interromper(self, no, nivel):
+        self.linha(nivel, 'break;')
+
+    def emitir_Continuar(self, no, nivel):
+        self.linha(nivel, 'continue;')
+
+    def emitir_Bloco(self, no, nivel):
+        self.linha(nivel, '{')
+        yield self.bloco(no.corpo, nivel + 1)
+        self.linha(nivel, '}')
+
+    def emitir_Se(self, no, nivel):
+        self.linha(nivel, f'if ({self.expressao(no.condicao)}) {{')
+        yield self.bloco(no.corpo, nivel + 1)
+        senao = no.senao
+        while isinstance(senao, Se):
+            self.linha(nivel, f'}} else if ({self.expressao(senao.condicao)}) {{')
+            yield self.bloco(senao.corpo, nivel + 1)
+            senao = senao.senao
+        if senao is not None:
+            self.linha(nivel, '} else {')
+            yield self.bloco(senao, nivel + 1)
+        self.linha(nivel, '}')
+
+    def emitir_Enquanto(self, no, nivel):
+        self.linha(nivel, f'while ({self.expressao(no.condicao)}) {{')
+        yield self.bloco(no.corpo, nivel + 1)
+        self.linha(nivel, '}')
+
+    def emitir_Para(self, no, nivel):
+        if no.inicializacao is None:
+            inicializacao = ''
+        elif isinstance(no.inicializacao, DeclaracaoVariavel):
+            inicializacao = self.declaracao(no.inicializacao)
+        else:
+            inicializacao = self.atribuicao(no.inicializacao)
+        if no.paralelo:
+            clausulas = ''.join(f' reduction({op}:{nome})' for op, nome in no.reducoes)
+            self.linha(nivel, f'#pragma omp parallel for{clausulas}')
+        self.linha(nivel, f'for ({inicializacao}; {self.expressao(no.condicao)}; '
+                          f'{self.atribuicao(no.passo)}) {{')
+        yield self.bloco(no.corpo, nivel + 1)
+        self.linha(nivel, '}')
+
+    def emitir_FacaEnquanto(self, no, nivel):
+        self.linha(nivel, 'do {')
+        yield self.bloco(no.corpo, nivel + 1)
+        self.linha(nivel, f'}} while ({self.expressao(no.condicao)});')
+
+    def emitir_Escolha(self, no, nivel):
+        self.linha(nivel, f'switch ({self.expressao(no.expressao)}) {{')
+        for caso in no.casos:
+            if caso.valor is None:
+                self.linha(nivel + 1, 'default:')
+            elif not caso.sem_rotulo:
+                self.linha(nivel + 1, f'case {self.expressao(caso.valor)}:')
+            yield self.bloco(caso.corpo, nivel + 2)
+        self.linha(nivel, '}')
+
+    def declaracao(self, no):
+        if no.tamanho is not None:
+            return f'{no.tipo} {no.nome}[{self.expressao(no.tamanho)}]'
+        if no.valor is None:
+            return f'{no.tipo} {no.nome}'
+        const = 'const ' if no.constante else ''
+        return f'{const}{no.tipo} {no.nome} = {self.expressao(no.valor)}'
+
+    def atribuicao(self, no):
+        if no.indice is not None:
+            return f'{no.nome}[{self.expressao(no.indice)}] = {self.expressao(no.valor)}'
+        return f'{no.nome} = {self.expressao(no.valor)}'
+
+    # --- Expressões ------------------------------------------------------
+    def expressao(self, no, minima=0):
+        # Só coloca parênteses onde a precedência de C exige.
+        return _percorrer(self.texto(no, minima))
+
+    def texto(self, no, minima):
+        # Passo do percurso de expressao(): as folhas são escritas aqui; os
+        # nós com operandos, por texto_composto().
+        if isinstance(no, (Binaria, Unaria, Chamada, Indice)):
+            return self.texto_composto(no, minima)
+        if isinstance(no, Variavel):
+            return no.nome
+        if isinstance(no, Soma):
+            return f'{self.auxiliar("somar", no.elemento, no.tipo)}({no.vetor}, {_elementos(no.vetor)})'
+        if isinstance(no.valor, bool):
+            return 'true' if no.valor else 'false'
+        texto = str(no.valor)
+        return f'({texto})' if minima and no.valor < 0 else texto
+
+    def texto_composto(self, no, minima):
+        if isinstance(no, Binaria):
+            precedencia = PRECEDENCIA_C[no.op]
+            esquerda = yield self.texto(no.esquerda, precedencia)
+            direita = yield self.texto(no.direita, precedencia + 1)
+            texto = f'{esquerda} {no.op} {direita}'
+            return f'({texto})' if precedencia < minima else texto
+        if isinstance(no, Unaria):
+            operando = yield self.texto(no.operando, PRECEDENCIA_UNARIA)
+            if operando[:1] in '-!':
+                operando = f'({operando})'
+            texto = f'{no.op}{operando}'
+            return f'({texto})' if PRECEDENCIA_UNARIA < minima else texto
+        if isinstance(no, Chamada):
+            argumentos = []
+            for argumento in no.argumentos:
+                argumentos.append((yield self.texto(argumento, 0)))
+            return f"{no.nome}({', '.join(argumentos)})"
+        return f'{no.nome}[{(yield self.texto(no.indice, 0))}]'
+
+# =====================================================================
+#  MÁQUINA VIRTUAL
+# =====================================================================
+# Alternativa ao gcc para rodar um programa sem sair do processo (--vm,
+# executar_codigo). Cada função vira uma sequência de instruções de pilha
+# num array de inteiros, [operação, argumento] por instrução, e
+# ProgramaBytecode.executar() as interpreta seguindo a semântica de C:
+# inteiros de largura fixa, divisão truncada e float de 32 bits. Assim a
+# saída e o código de saída são os mesmos do executável gerado pelo gcc.
+(OP_CONST, OP_CARREGAR, OP_GUARDAR, OP_DESCARTAR, OP_CONVERTER,
+ OP_SOMAR, OP_SUBTRAIR, OP_MULTIPLICAR, OP_DIVIDIR, OP_DIVIDIR_INT, OP_RESTO,
+ OP_IGUAL, OP_DIFERENTE, OP_MENOR, OP_MAIOR, OP_MENOR_IGUAL, OP_MAIOR_IGUAL,
+ OP_NAO, OP_NEGAR, OP_SALTAR, OP_SALTAR_SE_FALSO, OP_SALTAR_SE_VERDADEIRO,
+ OP_ESCOLHER, OP_CHAMAR, OP_RETORNAR, OP_IMPRIMIR,
+ OP_CRIAR_VETOR, OP_LER_VETOR, OP_ESCREVER_VETOR, OP_PREENCHER, OP_COPIAR,
+ OP_SOMAR_VETOR, OP_AJUSTAR) = range(33)
+
+OPERACOES_BYTECODE = {
+    '+': OP_SOMAR, '-': OP_SUBTRAIR, '*': OP_MULTIPLICAR, '%': OP_RESTO,
+    '==': OP_IGUAL, '!=': OP_DIFERENTE, '<': OP_MENOR, '>': OP_MAIOR,
+    '<=': OP_MENOR_IGUAL, '>=': OP_MAIOR_IGUAL,
+}
+
+def _inteiro_c(bits, com_sinal):
+    mascara = (1 << bits) - 1
+    if not com_sinal:
+        return lambda x: int(x) & mascara
+    metade = 1 << (bits - 1)
+    return lambda x: ((int(x) + metade) & mascara) - metade
+
+_FLOAT_C = struct.Struct('f')
+
+# Conversões para cada tipo de C, indexadas pelo argumento de OP_CONVERTER.
+# char tem sinal, como no gcc para x86.
+TIPOS_VM = ('bool', 'char', 'short', 'int', 'unsigned', 'long', 'float', 'double')
+CONVERSOES_C = (
+    lambda x: x != 0,
+    _inteiro_c(8, True),
+    _inteiro_c(16, True),
+    _inteiro_c(32, True),
+    _inteiro_c(32, False),
+    _inteiro_c(64, True),
+    lambda x: _FLOAT_C.unpack(_FLOAT_C.pack(x))[0],
+    float,
+)
+# Faixa de cada tipo inteiro. OP_AJUSTAR, usado depois de cada operação
+# inteira, só chama a conversão quando o resultado sai dela.
+LIMITES_VM = (
+    (0, 1), (-2**7, 2**7 - 1), (-2**15, 2**15 - 1), (-2**31, 2**31 - 1),
+    (0, 2**32 - 1), (-2**63, 2**63 - 1), None, None,
+)
+
+# Conversões que nunca mudam o valor e podem ser omitidas.
+_AMPLIACOES = {
+    ('bool', 'char'), ('bool', 'short'), ('bool', 'int'), ('bool', 'long'),
+    ('char', 'short'), ('char', 'int'), ('char', 'long'), ('short', 'int'),
+    ('short', 'long'), ('int', 'long'), ('unsigned', 'long'),
+}
+
+def _divisao_real(a, b):
+    # Divisão de ponto flutuante por zero dá infinito ou NaN, não exceção.
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+_ESCAPES_C = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', 'a': '\a', 'b': '\b',
+              'f': '\f', 'v': '\v', '\\': '\\', '"': '"', "'": "'", '?': '?'}
+
+def _texto_c(valor):
+    # Bytes de uma cadeia entre aspas, com os escapes de C resolvidos.
+    texto = re.sub(r'\\(.)', lambda m: _ESCAPES_C.get(m.group(1), m.group(1)),
+                   valor[1:-1], flags=re.S)
+    return texto.encode('utf-8')
+
+def _formatar_real(v):
+    # A glibc mostra o sinal de um NaN negativo; o Python não.
+    if v != v:
+        return b'-nan' if math.copysign(1.0, v) < 0 else b'nan'
+    return b'%f' % v
+
+# Formatação de cada especificador de FORMATOS_PRINTF.
+FORMATADORES_VM = {
+    '%d': lambda v: b'%d' % v, '%ld': lambda v: b'%d' % v, '%u': lambda v: b'%d' % v,
+    '%f': _formatar_real, '%c': lambda v: bytes((v & 0xFF,)),
+}
+
+class ErroExecucao(RuntimeError):
+    def __init__(self, diagnostico):
+        super().__init__(str(diagnostico))
+        self.diagnostico = diagnostico
+
+class ProgramaBytecode:
+    __slots__ = ('codigo', 'linhas', 'constantes', 'funcoes', 'principal')
+
+    def __init__(self, codigo, linhas, constantes, funcoes, principal):
+        self.codigo = codigo          # array de inteiros: operação, argumento, ...
+        self.linhas = linhas          # linha do .formiga de cada instrução
+        self.constantes = constantes
+        self.funcoes = funcoes        # (início, parâmetros, variáveis locais)
+        self.principal = principal    # índice de natureza() em funcoes
+
+    def executar(self, saida):
+        """Roda o programa, escrevendo em saida (um arquivo binário), e
+        devolve o código de saída, como o do processo em C."""
+        # Ler de uma lista é mais rápido que do array, que cria um int novo
+        # a cada acesso.
+        codigo = self.codigo.tolist()
+        constantes = self.constantes
+        funcoes = self.funcoes
+        converter = CONVERSOES_C
+        limites = LIMITES_VM
+        pilha = []
+        empilhar = pilha.append
+        desempilhar = pilha.pop
+        quadros = []
+        inicio, _, quantidade = funcoes[self.principal]
+        locais = [0] * quantidade
+        pc = inicio
+        try:
+            while True:
+                op = codigo[pc]
+                arg = codigo[pc + 1]
+                pc += 2
+                if op == OP_CARREGAR:
+                    empilhar(locais[arg])
+                elif op == OP_CONST:
+                    empilhar(constantes[arg])
+                elif op == OP_GUARDAR:
+                    locais[arg] = desempilhar()
+                elif op == OP_AJUSTAR:
+                    minimo, maximo = limites[arg]
+                    valor = pilha[-1]
+                    if valor < minimo or valor > maximo:
+                        pilha[-1] = converter[arg](valor)
+                elif op == OP_SOMAR:
+                    b = desempilhar()
+                    pilha[-1] += b
+                elif op == OP_SALTAR_SE_FALSO:
+                    if not desempilhar():
+                        pc = arg
+                elif op == OP_SALTAR:
+                    pc = arg
+                elif op == OP_CONVERTER:
+                    pilha[-1] = converter[arg](pilha[-1])
+                elif op == OP_SUBTRAIR:
+                    b = desempilhar()
+                    pilha[-1] -= b
+                elif op == OP_MULTIPLICAR:
+                    b = desempilhar()
+                    pilha[-1] *= b
+                elif op == OP_MENOR:
+                    b = desempilhar()
+                    pilha[-1] = pilha[-1] < b
+                elif op == OP_MAIOR:
+                    b = desempilhar()
+                    pilha[-1] = pilha[-1] > b
+                elif op == OP_MENOR_IGUAL:
+                    b = desempilhar()
+                    pilha[-1] = pilha[-1] <= b
+                elif op == OP_MAIOR_IGUAL:
+                    b = desempilhar()
+                    pilha[-1] = pilha[-1] >= b
+                elif op == OP_IGUAL:
+                    b = desempilhar()
+                    pilha[-1] = pilha[-1] == b
+                elif op == OP_DIFERENTE:
+                    b = desempilhar()
+                    pilha[-1] = pilha[-1] != b
+                elif op == OP_LER_VETOR:
+                    i = desempilhar()
+                    if i < 0:
+                        raise IndexError
+                    pilha[-1] = pilha[-1][i]
+                elif op == OP_ESCREVER_VETOR:
+                    valor = desempilhar()
+                    i = desempilhar()
+                    if i < 0:
+                        raise IndexError
+                    desempilhar()[i] = valor
+                elif op == OP_DIVIDIR_INT:
+                    b = desempilhar()
+                    pilha[-1] = _divisao_c(pilha[-1], b)
+                elif op == OP_RESTO:
+                    b = desempilhar()
+                    a = pilha[-1]
+                    pilha[-1] = a - _divisao_c(a, b) * b
+                elif op == OP_DIVIDIR:
+                    b = desempilhar()
+                    pilha[-1] = _divisao_real(pilha[-1], b)
+                elif op == OP_NAO:
+                    pilha[-1] = not pilha[-1]
+                elif op == OP_NEGAR:
+                    pilha[-1] = -pilha[-1]
+                elif op == OP_SALTAR_SE_VERDADEIRO:
+                    if desempilhar():
+                        pc = arg
+                elif op == OP_CHAMAR:
+                    inicio, parametros, quantidade = funcoes[arg]
+                    novos = pilha[len(pilha) - parametros:]
+                    del pilha[len(pilha) - parametros:]
+                    novos.extend([0] * (quantidade - parametros))
+                    quadros.append((pc, locais))
+                    locais = novos
+                    pc = inicio
+                elif op == OP_RETORNAR:
+                    # O valor devolvido fica no topo da pilha para quem chamou.
+                    if not quadros:
+                        return desempilhar() & 0xFF
+                    pc, locais = quadros.pop()
+                elif op == OP_DESCARTAR:
+                    desempilhar()
+                elif op == OP_IMPRIMIR:
+                    partes, quantos = constantes[arg]
+                    valores = pilha[len(pilha) - quantos:]
+                    del pilha[len(pilha) - quantos:]
+                    valores.reverse()
+                    saida.write(b''.join(parte if parte.__class__ is bytes else parte(valores.pop())
+                                         for parte in partes))
+                elif op == OP_ESCOLHER:
+                    destinos, fim = constantes[arg]
+                    pc = destinos.get(desempilhar(), fim)
+                elif op == OP_CRIAR_VETOR:
+                    locais[arg] = [0] * desempilhar()
+                elif op == OP_PREENCHER:
+                    valor = desempilhar()
+                    vetor = desempilhar()
+                    vetor[:] = [valor] * len(vetor)
+                elif op == OP_COPIAR:
+                    origem = desempilhar()
+                    destino = desempilhar()
+                    n = min(len(destino), len(origem))
+                    destino[:n] = origem[:n]
+                elif op == OP_SOMAR_VETOR:
+                    vetor = pilha[-1]
+                    if TIPOS_VM[arg] in TIPOS_INTEIROS:
+                        pilha[-1] = converter[arg](sum(vetor))
+                    else:
+                        # Passo a passo, com o arredondamento de cada soma.
+                        soma = 0.0
+                        for valor in vetor:
+                            soma = converter[arg](soma + valor)
+                        pilha[-1] = soma
+                else:
+                    raise AssertionError(f'operação desconhecida: {op}')
+        except ZeroDivisionError:
+            raise ErroExecucao(self._erro(pc, "Divisão inteira por zero.")) from None
+        except IndexError:
+            raise ErroExecucao(self._erro(pc, "Índice fora dos limites do vetor.")) from None
+        except MemoryError:
+            raise ErroExecucao(self._erro(pc, "Memória esgotada.")) from None
+
+    def _erro(self, pc, mensagem):
+        return Diagnostico('Erro de Execução', mensagem, None, self.linhas[pc // 2 - 1])
+
+class CompiladorBytecode:
+    """Traduz as funções, já analisadas (e otimizadas), para bytecode. Como
+    o EmissorC, recebe uma função de cada vez, na ordem do fonte."""
+
+    def __init__(self):
+        self.codigo = array.array('q')
+        self.linhas = array.array('l')
+        self.constantes = []
+        self.indices_constantes = {}
+        self.funcoes = []           # (início, parâmetros, locais); None até ser definida
+        self.indices_funcoes = {}   # nome -> índice em funcoes
+        self.assinaturas = {}       # nome -> _assinatura() da primeira declaração
+        self.chamadas = {}          # nome -> linha da primeira chamada
+        self.diagnosticos = []
+        self.linha = 0
+
+    def concluir(self):
+        """Devolve (ProgramaBytecode, diagnósticos)."""
+        diagnosticos = self.diagnosticos + [
+            Diagnostico('Erro Semântico', f"Função '{nome}' foi declarada mas não definida.",
+                        None, linha)
+            for nome, linha in self.chamadas.items()
+            if self.funcoes[self.indices_funcoes[nome]] is None]
+        programa = ProgramaBytecode(self.codigo, self.linhas, self.constantes, self.funcoes,
+                                    self.indices_funcoes.get('natureza'))
+        return programa, diagnosticos
+
+    def declaracao(self, declaracao):
+        if declaracao.nome not in self.assinaturas:
+            self.assinaturas[declaracao.nome] = _assinatura(declaracao)
+        if isinstance(declaracao, Funcao):
+            self.funcao(declaracao)
+
+    # --- Auxiliares ------------------------------------------------------
+    def instrucao(self, op, arg=0):
+        self.codigo.append(op)
+        self.codigo.append(arg)
+        self.linhas.append(self.linha)
+        return len(self.codigo) - 1  # posição do argumento, para corrigir saltos
+
+    def corrigir(self, posicoes, destino=None):
+        destino = len(self.codigo) if destino is None else destino
+        for posicao in posicoes:
+            self.codigo[posicao] = destino
+
+    def constante(self, valor):
+        # Constantes que não podem ser chaves (dicionários do switch) não são
+        # compartilhadas. O tipo entra na chave para não confundir 1 e 1.0,
+        # e floats entram pelo repr para separar 0.0 de -0.0.
+        try:
+            chave = (type(valor), repr(valor) if type(valor) is float else valor)
+            indice = self.indices_constantes.get(chave)
+        except TypeError:
+            chave = indice = None
+        if indice is None:
+            indice = len(self.constantes)
+            self.constantes.append(valor)
+            if chave is not None:
+                self.indices_constantes[chave] = indice
+        return indice
+
+    def indice_funcao(self, nome):
+        indice = self.indices_funcoes.get(nome)
+        if indice is None:
+            indice = self.indices_funcoes[nome] = len(self.funcoes)
+            self.funcoes.append(None)
+        return indice
+
+    def declarar(self, nome, tipo):
+        self.escopos[-1][nome] = (self.quantidade_locais, tipo)
+        self.quantidade_locais += 1
+        return self.quantidade_locais - 1
+
+    def buscar(self, nome):
+        for escopo in reversed(self.escopos):
+            if nome in escopo:
+                return escopo[nome]
+        raise KeyError(nome)
+
+    # --- Funções e blocos ------------------------------------------------
+    def funcao(self, funcao):
+        self.linha = funcao.linha
+        indice = self.indice_funcao(funcao.nome)
+        inicio = len(self.codigo)
+        self.em_main = funcao.nome == 'natureza'
+        self.retorno = 'int' if self.em_main else funcao.tipo
+        self.escopos = [{}]
+        self.quantidade_locais = 0
+        self.interrupcoes = []   # saltos de retornarAoNinho a corrigir, por laço/escolha
+        self.continuacoes = []   # saltos de ignorarFolha a corrigir, por laço
+        for parametro in funcao.parametros:
+            self.declarar(parametro.nome, parametro.tipo)
+        self.instrucoes(funcao.corpo)
+        # Sem entregar no fim: natureza() devolve 0; as demais, como em C,
+        # não têm valor definido.
+        self.instrucao(OP_CONST, self.constante(0 if self.retorno != 'void' else None))
+        self.instrucao(OP_RETORNAR)
+        self.funcoes[indice] = (inicio, len(funcao.parametros), self.quantidade_locais)
+
+    def bloco(self, instrucoes):
+        self.escopos.append({})
+        self.instrucoes(instrucoes)
+        self.escopos.pop()
+
+    def instrucoes(self, instrucoes):
+        for instrucao in instrucoes:
+            self.linha = instrucao.linha
+            getattr(self, 'compilar_' + type(instrucao).__name__)(instrucao)
+
+    # --- Instruções ------------------------------------------------------
+    def compilar_DeclaracaoVariavel(self, no):
+        local = self.declarar(no.nome, no.tipo)
+        if no.tamanho is not None:
+            self.expressao(no.tamanho)
+            self.instrucao(OP_CRIAR_VETOR, local)
+        elif no.valor is not None:
+            self.valor(no.valor, no.tipo)
+            self.instrucao(OP_GUARDAR, local)
+
+    def compilar_Atribuicao(self, no):
+        local, tipo = self.buscar(no.nome)
+        if no.indice is not None:
+            self.instrucao(OP_CARREGAR, local)
+            self.expressao(no.indice)
+            self.valor(no.valor, tipo)
+            self.instrucao(OP_ESCREVER_VETOR)
+        else:
+            self.valor(no.valor, tipo)
+            self.instrucao(OP_GUARDAR, local)
+
+    def compilar_Imprimir(self, no):
+        partes = []
+        quantos = 0
+        for argumento in no.argumentos:
+            if isinstance(argumento, Texto):
+                parte = _texto_c(argumento.valor)
+            else:
+                self.expressao(argumento)
+                quantos += 1
+                parte = FORMATADORES_VM[FORMATOS_PRINTF.get(argumento.tipo, '%d')]
+            if isinstance(parte, bytes) and partes and isinstance(partes[-1], bytes):
+                partes[-1] += parte
+            else:
+                partes.append(parte)
+        if partes and isinstance(partes[-1], bytes):
+            partes[-1] += b'\n'
+        else:
+            partes.append(b'\n')
+        self.instrucao(OP_IMPRIMIR, self.constante((tuple(partes), quantos)))
+
+    def compilar_Retorno(self, no):
+        if no.valor is not None:
+            self.valor(no.valor, self.retorno)
+        else:
+            self.instrucao(OP_CONST, self.constante(0 if self.em_main else None))
+        self.instrucao(OP_RETORNAR)
+
+    def compilar_Chamada(self, no):
+        self.expressao(no)
+        self.instrucao(OP_DESCARTAR)
+
+    def compilar_Preencher(self, no):
+        local, tipo = self.buscar(no.vetor)
+        self.instrucao(OP_CARREGAR, local)
+        self.valor(no.valor, tipo)
+        self.instrucao(OP_PREENCHER)
+
+    def compilar_Copiar(self, no):
+        self.instrucao(OP_CARREGAR, self.buscar(no.destino)[0])
+        self.instrucao(OP_CARREGAR, self.buscar(no.origem)[0])
+        self.instrucao(OP_COPIAR)
+
+    def compilar_Interromper(self, no):
+        self.interrupcoes[-1].append(self.instrucao(OP_SALTAR))
+
+    def compilar_Continuar(self, no):
+        self.continuacoes[-1].append(self.instrucao(OP_SALTAR))
+
+    def compilar_Bloco(self, no):
+        self.bloco(no.corpo)
+
+    def compilar_Se(self, no):
+        fins = []
+        while True:
+            self.linha = no.linha
+            self.expressao(no.condicao)
+            proximo = self.instrucao(OP_SALTAR_SE_FALSO)
+            self.bloco(no.corpo)
+            if no.senao is None:
+                self.corrigir([proximo])
+                break
+            fins.append(self.instrucao(OP_SALTAR))
+            self.corrigir([proximo])
+            if not isinstance(no.senao, Se):
+                self.bloco(no.senao)
+                break
+            no = no.senao
+        self.corrigir(fins)
+
+    def compilar_Enquanto(self, no):
+        inicio = len(self.codigo)
+        self.expressao(no.condicao)
+        fim = self.instrucao(OP_SALTAR_SE_FALSO)
+        self.laco(no.corpo)
+        self.corrigir(self.continuacoes.pop(), inicio)
+        self.instrucao(OP_SALTAR, inicio)
+        self.corrigir([fim] + self.interrupcoes.pop())
+
+    def compilar_Para(self, no):
+        self.escopos.append({})
+        if no.inicializacao is not None:
+            self.instrucoes([no.inicializacao])
+        inicio = len(self.codigo)
+        self.linha = no.linha
+        self.expressao(no.condicao)
+        fim = self.instrucao(OP_SALTAR_SE_FALSO)
+        self.laco(no.corpo)
+        self.corrigir(self.continuacoes.pop())
+        self.linha = no.linha
+        self.compilar_Atribuicao(no.passo)
+        self.instrucao(OP_SALTAR, inicio)
+        self.corrigir([fim] + self.interrupcoes.pop())
+        self.escopos.pop()
+
+    def compilar_FacaEnquanto(self, no):
+        inicio = len(self.codigo)
+        self.laco(no.corpo)
+        self.corrigir(self.continuacoes.pop())
+        self.linha = no.linha
+        self.expressao(no.condicao)
+        self.instrucao(OP_SALTAR_SE_VERDADEIRO, inicio)
+        self.corrigir(self.interrupcoes.pop())
+
+    def compilar_Escolha(self, no):
+        # Um salto indireto por tabela: valor do caminho -> início do corpo.
+        # Os corpos ficam em sequência, então sem retornarAoNinho um caminho
+        # continua no seguinte, como em C.
+        tipo = _tipo_aritmetico(no.expressao.tipo, 'int')
+        self.valor(no.expressao, tipo)
+        destinos = {}
+        tabela = self.constante((destinos, 0))
+        self.instrucao(OP_ESCOLHER, tabela)
+        self.interrupcoes.append([])
+        self.escopos.append({})
+        padrao = None
+        for caso in no.casos:
+            self.linha = caso.linha
+            if caso.valor is None:
+                padrao = len(self.codigo)
+            if caso.valor is None or caso.sem_rotulo:
+                self.instrucoes(caso.corpo)
+                continue
+            valor = Otimizador().expressao(caso.valor)
+            if not isinstance(valor, Literal):
+                self.diagnosticos.append(Diagnostico(
+                    'Erro Semântico', "O valor deste caminho não é uma constante válida.",
+                    None, caso.linha))
+                continue
+            destinos.setdefault(CONVERSOES_C[TIPOS_VM.index(tipo)](valor.valor), len(self.codigo))
+            self.instrucoes(caso.corpo)
+        self.escopos.pop()
+        self.constantes[tabela] = (destinos, len(self.codigo) if padrao is None else padrao)
+        self.corrigir(self.interrupcoes.pop())
+
+    def laco(self, corpo):
+        self.interrupcoes.append([])
+        self.continuacoes.append([])
+        self.bloco(corpo)
+
+    # --- Expressões ------------------------------------------------------
+    def valor(self, no, tipo):
+        """Compila no e converte o resultado para tipo, como numa atribuição."""
+        if isinstance(no, Literal):
+            self.instrucao(OP_CONST, self.constante(CONVERSOES_C[TIPOS_VM.index(tipo)](no.valor)))
+            return
+        self.expressao(no)
+        if no.tipo != tipo and (no.tipo, tipo) not in _AMPLIACOES:
+            self.instrucao(OP_CONVERTER, TIPOS_VM.index(tipo))
+
+    def expressao(self, no):
+        if isinstance(no, Variavel):
+            self.instrucao(OP_CARREGAR, self.buscar(no.nome)[0])
+        elif isinstance(no, Literal):
+            self.instrucao(OP_CONST, self.constante(no.valor))
+        elif isinstance(no, Binaria):
+            if no.op in ('&&', '||'):
+                self.logica(no)
+                return
+            if no.op in OPERADORES_BOOLEANOS:
+                tipo = _tipo_aritmetico(no.esquerda.tipo, no.direita.tipo)
+            else:
+                tipo = no.tipo
+            self.valor(no.esquerda, tipo)
+            self.valor(no.direita, tipo)
+            if no.op == '/':
+                self.instrucao(OP_DIVIDIR_INT if tipo in TIPOS_INTEIROS else OP_DIVIDIR)
+            else:
+                self.instrucao(OPERACOES_BYTECODE[no.op])
+            if no.op not in OPERADORES_BOOLEANOS:
+                self.ajustar(no.tipo, no.op)
+        elif isinstance(no, Unaria):
+            if no.op == '!':
+                self.expressao(no.operando)
+                self.instrucao(OP_NAO)
+            else:
+                self.valor(no.operando, no.tipo)
+                self.instrucao(OP_NEGAR)
+                self.ajustar(no.tipo, no.op)
+        elif isinstance(no, Indice):
+            self.instrucao(OP_CARREGAR, self.buscar(no.nome)[0])
+            self.expressao(no.indice)
+            self.instrucao(OP_LER_VETOR)
+        elif isinstance(no, Soma):
+            self.instrucao(OP_CARREGAR, self.buscar(no.vetor)[0])
+            self.instrucao(OP_SOMAR_VETOR, TIPOS_VM.index(no.tipo))
+        else:
+            _, parametros, _ = self.assinaturas[no.nome]
+            for argumento, tipo in zip(no.argumentos, parametros):
+                self.valor(argumento, tipo)
+            self.chamadas.setdefault(no.nome, self.linha)
+            self.instrucao(OP_CHAMAR, self.indice_funcao(no.nome))
+
+    def ajustar(self, tipo, op):
+        # Leva o resultado de uma operação aritmética de volta à faixa (ou,
+        # em float, à precisão) do seu tipo. O resto nunca sai dela.
+        if tipo in TIPOS_INTEIROS:
+            if op != '%':
+                self.instrucao(OP_AJUSTAR, TIPOS_VM.index(tipo))
+        elif tipo == 'float':
+            self.instrucao(OP_CONVERTER, TIPOS_VM.index(tipo))
+
+    def logica(self, no):
+        # && e || em curto-circuito; o resultado é sempre um bool.
+        decide = OP_SALTAR_SE_FALSO if no.op == '&&' else OP_SALTAR_SE_VERDADEIRO
+        self.expressao(no.esquerda)
+        curto = [self.instrucao(decide)]
+        self.expressao(no.direita)
+        curto.append(self.instrucao(decide))
+        self.instrucao(OP_CONST, self.constante(no.op == '&&'))
+        fim = self.instrucao(OP_SALTAR)
+        self.corrigir(curto)
+        self.instrucao(OP_CONST, self.constante(no.op != '&&'))
+        self.corrigir([fim])
+
+def _cronometrar(tokens, tempos):
+    # Acumula o tempo gasto dentro do lexer; o restante do parse() é do parser.
+    while True:
+        inicio = time.perf_counter()
+        tok = next(tokens, None)
+        tempos['lexico'] += time.perf_counter() - inicio
+        if tok is None:
+            return
+        yield tok
+
+def _arquivo_saida(arquivo_entrada):
+    return arquivo_entrada.replace(".formiga", ".c")
+
+class EscritorC:
+    """Escreve o .c de forma atômica: tudo vai para um arquivo temporário no
+    mesmo diretório, que só substitui o destino em concluir(). Se a
+    compilação falhar, o .c anterior (ou a ausência dele) fica intacto."""
+
+    def __init__(self, arquivo_saida):
+        self.arquivo_saida = arquivo_saida
+        diretorio = os.path.dirname(os.path.abspath(arquivo_saida))
+        fd, self.temporario = tempfile.mkstemp(dir=diretorio, prefix='.', suffix='.c.tmp')
+        self.arquivo = os.fdopen(fd, 'w', encoding='utf-8', buffering=1 << 16)
+
+    def escrever(self, texto):
+        self.arquivo.write(texto)
+
+    def concluir(self):
+        self.arquivo.close()
+        os.chmod(self.temporario, _permissoes(self.arquivo_saida))
+        os.replace(self.temporario, self.arquivo_saida)
+
+    def descartar(self):
+        self.arquivo.close()
+        try:
+            os.unlink(self.temporario)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento):
+        if tipo is not None:
+            self.descartar()
+        return False
+
+def _processar(tokens, gerador_codigo, tratar, tempos=None, otimizacao=0, avisos=None,
+               semantico=None):
+    # Cada função é analisada, otimizada e entregue a tratar() assim que o
+    # parser a reduz; a memória de pico depende só da maior função, não do
+    # programa todo. Devolve os diagnósticos do parser e da análise; os
+    # avisos, que não impedem a compilação, vão para a lista 'avisos'.
+    # Um trecho do -j chega com um semantico que já conhece as funções
+    # declaradas antes dele.
+    inicio = time.perf_counter()
+    if tempos is not None:
+        tempos['lexico'] = 0.0
+        tempos['escrita'] = 0.0
+        tokens = _cronometrar(tokens, tempos)
+
+    if semantico is None:
+        semantico = AnalisadorSemantico()
+
+    def concluir_declaracao(funcao):
+        inicio_escrita = time.perf_counter()
+        # Depois do primeiro erro semântico as funções seguintes ainda são
+        # analisadas, para mostrar todos os erros, mas nada mais é gerado.
+        semantico.declaracao(funcao)
+        if semantico.diagnosticos:
+            return
+        if otimizacao >= 1 and isinstance(funcao, Funcao):
+            funcao = Otimizador().funcao(funcao)
+            if otimizacao >= 2:
+                funcao = OtimizadorLacos().funcao(funcao)
+        tratar(funcao)
+        if tempos is not None:
+            tempos['escrita'] += time.perf_counter() - inicio_escrita
+
+    gerador_codigo.parse(tokens, concluir_declaracao)
+    if tempos is not None:
+        tempos['sintatico'] = time.perf_counter() - inicio - tempos['lexico'] - tempos['escrita']
+    if avisos is not None:
+        avisos.extend(sorted(semantico.avisos, key=lambda d: d.linha))
+    return gerador_codigo.diagnosticos + semantico.diagnosticos
+
+def _cabecalho_c(nome_programa):
+    return (f"// Programa: {nome_programa}\n"
+            "#include <stdio.h>\n"
+            "#include <stdbool.h>\n"
+            "#include <string.h>\n\n")
+
+def _traduzir(tokens, gerador_codigo, escrever, tempos=None, otimizacao=0, avisos=None):
+    emissor = EmissorC()
+    cabecalho_escrito = False
+
+    def escrever_funcao(funcao):
+        nonlocal cabecalho_escrito
+        if not cabecalho_escrito:
+            escrever(_cabecalho_c(gerador_codigo.nome_programa))
+            cabecalho_escrito = True
+        escrever(emissor.emitir_funcao(funcao))
+
+    return _processar(tokens, gerador_codigo, escrever_funcao, tempos, otimizacao, avisos)
+
+def _gerar_bytecode(tokens, gerador_codigo, tempos=None, otimizacao=0, avisos=None):
+    """Devolve (ProgramaBytecode ou None, diagnósticos do parser e da análise)."""
+    compilador = CompiladorBytecode()
+    diagnosticos = _processar(tokens, gerador_codigo, compilador.declaracao, tempos, otimizacao,
+                              avisos)
+    if tempos is not None:
+        tempos['bytecode'] = tempos.pop('escrita')
+    if diagnosticos:
+        return None, diagnosticos
+    programa, diagnosticos = compilador.concluir()
+    return (None if diagnosticos else programa), diagnosticos
+
+def _ordenar_diagnosticos(linhas, diagnosticos):
+    _localizar(linhas, diagnosticos)
+    diagnosticos.sort(key=lambda d: (d.linha, d.coluna or 0))
+    return diagnosticos
+
+def _compilar_bytecode(arquivo_entrada, analisador_lexico, gerador_codigo, tempos=None,
+                       otimizacao=0, avisos=None):
+    tokens = analisador_lexico.tokenizar_arquivo(arquivo_entrada)
+    programa, diagnosticos = _gerar_bytecode(tokens, gerador_codigo, tempos, otimizacao, avisos)
+    diagnosticos = analisador_lexico.diagnosticos + diagnosticos
+    if diagnosticos:
+        with open(arquivo_entrada, "r", encoding="utf-8") as f:
+            _ordenar_diagnosticos(f, diagnosticos)
+        raise ErroCompilacao(arquivo_entrada, diagnosticos)
+    return programa
+
+def _compilar(arquivo_entrada, analisador_lexico, gerador_codigo, tempos=None, otimizacao=0,
+              avisos=None, jobs=1):
+    arquivo_saida = _arquivo_saida(arquivo_entrada)
+    with EscritorC(arquivo_saida) as escritor:
+        diagnosticos = None
+        if jobs > 1:
+            diagnosticos = _traduzir_em_paralelo(arquivo_entrada, analisador_lexico,
+                                                 gerador_codigo, escritor.escrever, jobs,
+                                                 tempos, otimizacao, avisos)
+        if diagnosticos is None:
+            tokens = analisador_lexico.tokenizar_arquivo(arquivo_entrada)
+            diagnosticos = _traduzir(tokens, gerador_codigo, escritor.escrever, tempos,
+                                     otimizacao, avisos)
+            diagnosticos = analisador_lexico.diagnosticos + diagnosticos
+        if diagnosticos:
+            with open(arquivo_entrada, "r", encoding="utf-8") as f:
+                _ordenar_diagnosticos(f, diagnosticos)
+            raise ErroCompilacao(arquivo_entrada, diagnosticos)
+        escritor.concluir()
+    return arquivo_saida
+
+# ---------------------------------------------------------------------
+# Um arquivo grande em vários processos (-j N). Uma varredura rápida do
+# texto, que só olha chaves, ';', cadeias e comentários, acha onde termina
+# cada declaração de nível superior; o arquivo é cortado nesses pontos em
+# trechos de tamanho parecido, e cada processo faz análise, otimização e
+# geração do C do seu trecho. Antes disso, o "esqueleto" (o fonte com o
+# corpo de cada função trocado por '{}', mantendo as quebras de linha) é
+# analisado aqui mesmo: ele dá o nome do programa, confere a natureza() no
+# arquivo todo e diz a cada trecho que funções já foram declaradas antes
+# dele, como na compilação normal. Os trechos são lidos a partir da linha
+# em que começam, então os diagnósticos saem com as linhas do arquivo.
+#
+# Se o esqueleto ou algum trecho tem erro léxico ou sintático, o arquivo
+# é compilado de novo do jeito normal: a recuperação de erros depende do
+# que veio antes, e só assim as mensagens saem iguais.
+# ---------------------------------------------------------------------
+_RE_NIVEL_ZERO = re.compile(r'"[^"]*"|/\*.*?\*/|//[^\n]*|[{};]', re.DOTALL)
+_RE_DENTRO_DE_CHAVES = re.compile(r'"[^"]*"|/\*.*?\*/|//[^\n]*|[{}]', re.DOTALL)
+MINIMO_PARALELO = 1 << 16   # bytes; abaixo disso não compensa abrir processos
+TRECHOS_POR_PROCESSO = 4
+
+def _nivel_superior(texto):
+    # Devolve (cortes, corpos): a posição logo depois de cada ';' ou '}'
+    # que termina uma declaração de nível superior (ou o cabeçalho colonia)
+    # e os intervalos dos corpos de função, chaves incluídas. Um '}' sem
+    # par fica de fora; o esqueleto terá um erro de sintaxe.
+    cortes = []
+    corpos = []
+    nivel = 0
+    abertura = posicao = 0
+    while True:
+        m = (_RE_DENTRO_DE_CHAVES if nivel else _RE_NIVEL_ZERO).search(texto, posicao)
+        if m is None:
+            return cortes, corpos
+        posicao = m.end()
+        simbolo = m.group()
+        if simbolo == '{':
+            if nivel == 0:
+                abertura = m.start()
+            nivel += 1
+        elif simbolo == '}':
+            if nivel == 0:
+                continue
+            nivel -= 1
+            if nivel == 0:
+                corpos.append((abertura, posicao))
+                cortes.append(posicao)
+        elif simbolo == ';':
+            cortes.append(posicao)
+
+def _esqueleto(texto, corpos):
+    partes = []
+    inicio = 0
+    for abertura, fim in corpos:
+        partes.append(texto[inicio:abertura])
+        partes.append('{' + '\n' * texto.count('\n', abertura, fim) + '}')
+        inicio = fim
+    partes.append(texto[inicio:])
+    return ''.join(partes)
+
+def _dividir(texto, cortes, cabecalho, quantidade):
+    # (texto, linha inicial, declarações antes do trecho) de cada trecho. O
+    # que vem depois do último corte fica com o último trecho.
+    alvo = len(texto) // quantidade + 1
+    trechos = []
+    inicio, linha, anteriores = 0, 1, 0
+    for i, corte in enumerate(cortes, 1):
+        if i < len(cortes) and corte - inicio < alvo:
+            continue
+        fim = corte if i < len(cortes) else len(texto)
+        trechos.append((texto[inicio:fim], linha, anteriores))
+        linha += texto.count('\n', inicio, fim)
+        inicio, anteriores = fim, i - cabecalho
+    return trechos
+
+# Cada processo do -j: lexer, parser, nível de otimização e as declarações
+# do esqueleto.
+_trechos_worker = None
+
+def _iniciar_trechos(classe_parser, otimizacao, declaracoes):
+    global _trechos_worker
+    gerador_codigo = classe_parser()
+    gerador_codigo.exigir_natureza = False
+    _trechos_worker = (AnalisadorLexico(), gerador_codigo, otimizacao, declaracoes)
+
+def _analisar_trecho(trecho):
+    # Devolve None se o trecho tem erro léxico ou sintático; senão, os
+    # diagnósticos semânticos, os avisos e, para cada função, o par
+    # (auxiliares, código) de EmissorC.emitir_funcao_isolada().
+    texto, linha, anteriores = trecho
+    analisador_lexico, gerador_codigo, otimizacao, declaracoes = _trechos_worker
+    semantico = AnalisadorSemantico()
+    for declaracao in declaracoes[:anteriores]:
+        if declaracao.nome not in semantico.funcoes:
+            semantico.funcoes[declaracao.nome] = _assinatura(declaracao)
+        if isinstance(declaracao, Funcao):
+            semantico.definidas.setdefault(declaracao.nome, declaracao.linha)
+    emissor = EmissorC()
+    funcoes = []
+    avisos = []
+    analisador_lexico.reiniciar()
+    diagnosticos = _processar(analisador_lexico.tokenize(texto, lineno=linha), gerador_codigo,
+                              lambda funcao: funcoes.append(emissor.emitir_funcao_isolada(funcao)),
+                              otimizacao=otimizacao, avisos=avisos, semantico=semantico)
+    if analisador_lexico.diagnosticos or gerador_codigo.diagnosticos:
+        return None
+    return diagnosticos, avisos, funcoes
+
+def _traduzir_em_paralelo(arquivo_entrada, analisador_lexico, gerador_codigo, escrever, jobs,
+                          tempos=None, otimizacao=0, avisos=None):
+    """Como _traduzir, com os trechos do arquivo em jobs processos. Devolve
+    None, sem escrever nada, se o arquivo deve ser compilado do jeito
+    normal: pequeno demais, uma declaração só, ou com erros léxicos ou
+    sintáticos."""
+    inicio = time.perf_counter()
+    with open(arquivo_entrada, "r", encoding="utf-8") as f:
+        texto = f.read()
+    if len(texto) < MINIMO_PARALELO:
+        return None
+    cortes, corpos = _nivel_superior(texto)
+    declaracoes = []
+    analisador_lexico.reiniciar()
+    gerador_codigo.parse(analisador_lexico.tokenize(_esqueleto(texto, corpos)),
+                         declaracoes.append)
+    # O único diagnóstico do parser que não é de sintaxe: a falta da natureza().
+    diagnosticos = gerador_codigo.diagnosticos
+    if analisador_lexico.diagnosticos or any(d.categoria != 'Erro Semântico'
+                                             for d in diagnosticos):
+        return None
+    trechos = _dividir(texto, cortes, len(cortes) - len(declaracoes),
+                       jobs * TRECHOS_POR_PROCESSO)
+    del texto
+    if len(trechos) < 2:
+        return None
+    if tempos is not None:
+        tempos['divisao'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(trechos)), initializer=_iniciar_trechos,
+            initargs=(type(gerador_codigo), otimizacao, declaracoes)) as executor:
+        resultados = list(executor.map(_analisar_trecho, trechos))
+    if tempos is not None:
+        tempos['trechos'] = time.perf_counter() - inicio
+    if None in resultados:
+        return None
+
+    inicio = time.perf_counter()
+    diagnosticos = list(diagnosticos)
+    todos_avisos = []
+    for diagnosticos_trecho, avisos_trecho, _ in resultados:
+        diagnosticos.extend(diagnosticos_trecho)
+        todos_avisos.extend(avisos_trecho)
+    if avisos is not None:
+        avisos.extend(sorted(todos_avisos, key=lambda d: d.linha))
+    if diagnosticos:
+        return diagnosticos
+    escritas = set()
+    cabecalho_escrito = False
+    for _, _, funcoes in resultados:
+        for auxiliares, codigo in funcoes:
+            if not cabecalho_escrito:
+                escrever(_cabecalho_c(gerador_codigo.nome_programa))
+                cabecalho_escrito = True
+            for nome, auxiliar in auxiliares.items():
+                if nome not in escritas:
+                    escritas.add(nome)
+                    escrever(auxiliar)
+            escrever(codigo)
+    if tempos is not None:
+        tempos['juncao'] = time.perf_counter() - inicio
+    return []
+
+# =====================================================================
+#  API
+# =====================================================================
+# Para embutir o compilador em outros programas (testes, editores) sem
+# passar por main(): nada é impresso, nada encerra o processo e os erros
+# voltam como diagnósticos no Resultado.
+class Resultado:
+    __slots__ = ('codigo', 'diagnosticos', 'avisos')
+
+    def __init__(self, codigo, diagnosticos, avisos=()):
+        self.codigo = codigo              # C gerado; None se houve erros
+        self.diagnosticos = diagnosticos  # lista de Diagnostico, em ordem
+        self.avisos = list(avisos)        # Diagnostico 'Aviso'; não impedem o C
+
+    @property
+    def ok(self):
+        return not self.diagnosticos
+
+    def __repr__(self):
+        if self.ok:
+            return f'Resultado(ok, {len(self.codigo)} caracteres de C)'
+        return f'Resultado({len(self.diagnosticos)} erro(s))'
+
+# O SLY guarda o estado da análise na própria instância, então cada thread
+# usa o seu par lexer/parser. Ambos zeram esse estado no início de cada
+# compilação, o que permite reutilizá-los indefinidamente.
+_por_thread = threading.local()
+
+def _instancias_da_thread(parser='sly'):
+    por_parser = getattr(_por_thread, 'instancias', None)
+    if por_parser is None:
+        por_parser = _por_thread.instancias = {}
+    instancias = por_parser.get(parser)
+    if instancias is None:
+        instancias = por_parser[parser] = (AnalisadorLexico(), _novo_parser(parser))
+    return instancias
+
+def _falha_interna(erro, parser):
+    # O que escapou do próprio compilador (pilha do Python, memória, um
+    # defeito) também volta como diagnóstico, sem linha. O par lexer/parser
+    # da thread pode ter ficado no meio de uma análise e é descartado.
+    _por_thread.instancias.pop(parser, None)
+    if isinstance(erro, RecursionError):
+        mensagem = "Programa aninhado demais para o compilador."
+    elif isinstance(erro, MemoryError):
+        mensagem = "Memória insuficiente para compilar o programa."
+    else:
+        mensagem = f"{type(erro).__name__}: {erro}"
+    return [Diagnostico('Erro Interno', mensagem, None)]
+
+def _resultado(tokens, analisador_lexico, gerador_codigo, otimizacao, linhas_fonte):
+    partes = []
+    avisos = []
+    diagnosticos = _traduzir(tokens, gerador_codigo, partes.append, otimizacao=otimizacao,
+                             avisos=avisos)
+    diagnosticos = analisador_lexico.diagnosticos + diagnosticos
+    if diagnosticos:
+        with linhas_fonte() as linhas:
+            return Resultado(None, _ordenar_diagnosticos(linhas, diagnosticos))
+    return Resultado(''.join(partes), [], avisos)
+
+def compilar_codigo(fonte, otimizacao=0, parser='sly'):
+    """Compila o texto de um programa (str, ou bytes em UTF-8) sem tocar
+    no disco e devolve um Resultado. parser escolhe o motor de análise
+    sintática: 'sly' ou 'fast'. Só um parser desconhecido levanta exceção;
+    qualquer outra falha volta como diagnóstico."""
+    analisador_lexico, gerador_codigo = _instancias_da_thread(parser)
+    try:
+        if isinstance(fonte, (bytes, bytearray, memoryview)):
+            fonte = bytes(fonte).decode('utf-8')
+        analisador_lexico.reiniciar()
+        return _resultado(analisador_lexico.tokenize(fonte), analisador_lexico,
+                          gerador_codigo, otimizacao, lambda: io.StringIO(fonte))
+    except Exception as erro:
+        return Resultado(None, _falha_interna(erro, parser))
+
+def compilar_arquivo(caminho, otimizacao=0, parser='sly'):
+    """Compila um arquivo .formiga e devolve um Resultado com o C gerado em
+    memória; nenhum .c é escrito. Um arquivo ilegível também vira
+    diagnóstico."""
+    analisador_lexico, gerador_codigo = _instancias_da_thread(parser)
+    try:
+        tokens = analisador_lexico.tokenizar_arquivo(caminho)
+        return _resultado(tokens, analisador_lexico, gerador_codigo, otimizacao,
+                          lambda: open(caminho, "r", encoding="utf-8"))
+    except Exception as erro:
+        return Resultado(None, _falha_interna(erro, parser))
+
+class Execucao:
+    __slots__ = ('saida', 'status', 'diagnosticos')
+
+    def __init__(self, saida, status, diagnosticos):
+        self.saida = saida                # bytes escritos pelo programa
+        self.status = status              # código de saída; None se não rodou até o fim
+        self.diagnosticos = diagnosticos  # de compilação, ou o erro de execução
+
+    @property
+    def ok(self):
+        return not self.diagnosticos
+
+    def __repr__(self):
+        if self.ok:
+            return f'Execucao(status={self.status}, {len(self.saida)} bytes de saída)'
+        return f'Execucao({len(self.diagnosticos)} erro(s))'
+
+def _execucao(tokens, analisador_lexico, gerador_codigo, otimizacao, linhas_fonte):
+    programa, diagnosticos = _gerar_bytecode(tokens, gerador_codigo, otimizacao=otimizacao)
+    diagnosticos = analisador_lexico.diagnosticos + diagnosticos
+    if diagnosticos:
+        with linhas_fonte() as linhas:
+            return Execucao(b'', None, _ordenar_diagnosticos(linhas, diagnosticos))
+    saida = io.BytesIO()
+    try:
+        status = programa.executar(saida)
+    except ErroExecucao as e:
+        return Execucao(saida.getvalue(), None, [e.diagnostico])
+    return Execucao(saida.getvalue(), status, [])
+
+def executar_codigo(fonte, otimizacao=0, parser='sly'):
+    """Compila o programa para bytecode e o executa na máquina virtual, sem
+    gcc nem arquivos. Devolve uma Execucao com a saída e o código de saída."""
+    analisador_lexico, gerador_codigo = _instancias_da_thread(parser)
+    try:
+        if isinstance(fonte, (bytes, bytearray, memoryview)):
+            fonte = bytes(fonte).decode('utf-8')
+        analisador_lexico.reiniciar()
+        return _execucao(analisador_lexico.tokenize(fonte), analisador_lexico,
+                         gerador_codigo, otimizacao, lambda: io.StringIO(fonte))
+    except Exception as erro:
+        return Execucao(b'', None, _falha_interna(erro, parser))
+
+def executar_arquivo(caminho, otimizacao=0, parser='sly'):
+    """Como executar_codigo(), para um arquivo .formiga."""
+    analisador_lexico, gerador_codigo = _instancias_da_thread(parser)
+    try:
+        tokens = analisador_lexico.tokenizar_arquivo(caminho)
+        return _execucao(tokens, analisador_lexico, gerador_codigo, otimizacao,
+                         lambda: open(caminho, "r", encoding="utf-8"))
+    except Exception as erro:
+        return Execucao(b'', None, _falha_interna(erro, parser))
+
+def _etapas(tempos):
+    # Só entram as etapas que rodaram: com o .c já atualizado não há
+    # análise, e as duas últimas só existem com --exe/--run/--vm. As tabelas
+    # LALR só são montadas se o SLY foi usado.
+    etapas = []
+    if GeradorCodigo.tempo_construcao is not None:
+        origem = 'cache' if GeradorCodigo.tabelas_do_cache else 'construídas'
+        etapas.append((f'tabelas LALR ({origem})', GeradorCodigo.tempo_construcao))
+    etapas.append(('regex do lexer', AnalisadorLexico.tempo_construcao))
+    for chave, rotulo in (('divisao', 'divisão em trechos'),
+                          ('trechos', 'trechos em paralelo'),
+                          ('lexico', 'análise léxica'), ('sintatico', 'análise sintática'),
+                          ('escrita', 'geração e escrita do C'),
+                          ('juncao', 'junção dos trechos'),
+                          ('bytecode', 'geração do bytecode'),
+                          ('compilador_c', f"compilador C ({tempos.get('origem_binario')})"),
+                          ('execucao', 'execução do programa')):
+        if chave in tempos:
+            etapas.append((rotulo, tempos[chave]))
+    return etapas
+
+def _estatisticas(gerador_codigo, bytes_emitidos, tempos=None):
+    # Contadores de uma compilação, no formato gravado por --stats. Os tempos
+    # só existem quando foram medidos (--timings ou --stats).
+    estatisticas = {
+        'arquivos': 1,
+        'tokens': gerador_codigo.tokens_lidos,
+        'reducoes': gerador_codigo.contagem_reducoes(),
+        'bytes_emitidos': bytes_emitidos,
+        'tempos': {},
+    }
+    for chave, segundos in (tempos or {}).items():
+        if isinstance(segundos, float):
+            estatisticas['tempos'][chave] = segundos
+    return estatisticas
+
+def _somar_estatisticas(total, parcial):
+    for chave in ('arquivos', 'tokens', 'bytes_emitidos'):
+        total[chave] += parcial[chave]
+    for campo in ('reducoes', 'tempos'):
+        for chave, valor in parcial[campo].items():
+            total[campo][chave] = total[campo].get(chave, 0) + valor
+
+def _salvar_estatisticas(caminho, estatisticas):
+    # As regras mais reduzidas primeiro.
+    estatisticas = dict(estatisticas, reducoes=dict(
+        sorted(estatisticas['reducoes'].items(), key=lambda item: (-item[1], item[0]))))
+    estatisticas['tempos']['regex_lexer'] = AnalisadorLexico.tempo_construcao
+    if GeradorCodigo.tempo_construcao is not None:
+        estatisticas['tempos']['tabelas_lalr'] = GeradorCodigo.tempo_construcao
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(estatisticas, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+def _imprimir_tempos(etapas):
+    print("Tempos:")
+    for rotulo, segundos in etapas:
+        print(f"  {rotulo:<26}{segundos * 1000:9.2f} ms")
+
+# ---------------------------------------------------------------------
+# Compilação incremental: um manifesto por diretório guarda, para cada
+# fonte, o hash do .formiga, a versão do compilador e o hash do .c gerado.
+# Se os três conferem, o arquivo não é recompilado e o .c não é tocado.
+# ---------------------------------------------------------------------
+ARQUIVO_MANIFESTO = '.formiga-manifesto.json'
+_versao_compilador = None
+
+def _hash_arquivo(caminho):
+    try:
+        with open(caminho, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def versao_compilador():
+    # O código do compilador (gramática e ações incluídas) e a versão do
+    # SLY entram no hash; não depende das tabelas LALR, que o --parser=fast
+    # nem chega a montar.
+    global _versao_compilador
+    if _versao_compilador is None:
+        h = hashlib.sha256(sly.__version__.encode())
+        h.update(_hash_arquivo(os.path.abspath(__file__)).encode())
+        _versao_compilador = h.hexdigest()
+    return _versao_compilador
+
+def _carregar_manifesto(diretorio):
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _salvar_manifesto(diretorio, manifesto):
+    try:
+        fd, temporario = tempfile.mkstemp(dir=diretorio or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, indent=1, sort_keys=True)
+        destino = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+        os.chmod(temporario, _permissoes(destino))
+        os.replace(temporario, destino)
+    except OSError:
+        pass
+
+def _esta_atualizado(arquivo_entrada, manifesto, hash_fonte, opcoes):
+    registro = manifesto.get(os.path.basename(arquivo_entrada))
+    return (registro is not None
+            and registro.get('fonte') == hash_fonte
+            and registro.get('compilador') == versao_compilador()
+            and registro.get('opcoes') == opcoes
+            and registro.get('saida') == _hash_arquivo(_arquivo_saida(arquivo_entrada)))
+
+def _registrar(arquivo_entrada, manifesto, hash_fonte, opcoes):
+    manifesto[os.path.basename(arquivo_entrada)] = {
+        'fonte': hash_fonte,
+        'compilador': versao_compilador(),
+        'opcoes': opcoes,
+        'saida': _hash_arquivo(_arquivo_saida(arquivo_entrada)),
+    }
+
+# No modo servidor várias threads podem atualizar o mesmo manifesto.
+_trava_manifesto = threading.Lock()
+
+def _compilar_se_preciso(arquivo_entrada, analisador_lexico, gerador_codigo,
+                         otimizacao=0, forcar=False, tempos=None, avisos=None, jobs=1):
+    # Devolve ('atual', saida) se nada mudou desde a última compilação ou
+    # ('ok', saida) se o .c acabou de ser gerado.
+    opcoes = f'-O{otimizacao}'
+    diretorio = os.path.dirname(arquivo_entrada)
+    hash_fonte = _hash_arquivo(arquivo_entrada)
+    with _trava_manifesto:
+        manifesto = _carregar_manifesto(diretorio)
+    if not forcar and _esta_atualizado(arquivo_entrada, manifesto, hash_fonte, opcoes):
+        return 'atual', _arquivo_saida(arquivo_entrada)
+
+    arquivo_saida = _compilar(arquivo_entrada, analisador_lexico, gerador_codigo, tempos,
+                              otimizacao, avisos, jobs)
+    with _trava_manifesto:
+        manifesto = _carregar_manifesto(diretorio)
+        _registrar(arquivo_entrada, manifesto, hash_fonte, opcoes)
+        _salvar_manifesto(diretorio, manifesto)
+    return 'ok', arquivo_saida
+
+# Cada processo do modo build monta o lexer e o parser uma única vez.
+_lexico_worker = None
+_gerador_worker = None
+_otimizacao_worker = 0
+_medir_worker = False
+
+def _iniciar_worker(otimizacao=0, medir=False, parser='sly'):
+    global _lexico_worker, _gerador_worker, _otimizacao_worker, _medir_worker
+    _lexico_worker = AnalisadorLexico()
+    _gerador_worker = _novo_parser(parser)
+    _otimizacao_worker = otimizacao
+    _medir_worker = medir
+
+def _compilar_no_worker(arquivo_entrada):
+    # Com medir (build --stats) devolve também os contadores do arquivo.
+    inicio = time.perf_counter()
+    tempos = {} if _medir_worker else None
+    estatisticas = None
+    avisos = []
+    try:
+        saida = _compilar(arquivo_entrada, _lexico_worker, _gerador_worker, tempos,
+                          _otimizacao_worker, avisos)
+        status = 'ok'
+        if _medir_worker:
+            estatisticas = _estatisticas(_gerador_worker, os.path.getsize(saida), tempos)
+    except (ValueError, TypeError, OSError) as e:
+        saida = str(e)
+        status = 'erro'
+    return (arquivo_entrada, status, saida, time.perf_counter() - inicio, estatisticas,
+            [f"{arquivo_entrada}:{aviso}" for aviso in avisos])
+
+def _encontrar_fontes(caminhos):
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for raiz, _, nomes in os.walk(caminho):
+                arquivos.extend(os.path.join(raiz, n) for n in nomes if n.endswith('.formiga'))
+        else:
+            arquivos.append(caminho)
+    return sorted(set(arquivos))
+
+def _adicionar_opcao_otimizacao(parser):
+    parser.add_argument('-O', dest='otimizacao', type=int, default=0, choices=[0, 1, 2],
+                        metavar='N', help='nível de otimização: 0 (padrão), 1 ou 2')
+
+def _adicionar_opcao_parser(parser):
+    parser.add_argument('--parser', choices=sorted(ANALISADORES_SINTATICOS), default='sly',
+                        help='motor da análise sintática: sly (LALR, padrão) ou fast '
+                             '(descendente recursivo, sem tabelas); o C gerado é o mesmo')
+
+def main_build(argv):
+    parser = argparse.ArgumentParser(
+        prog="python c_lasse_trabalhora.py build",
+        description="Compila vários arquivos .formiga em paralelo.")
+    parser.add_argument('caminhos', nargs='+', metavar='DIR|ARQUIVO')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='número de processos (padrão: número de CPUs)')
+    parser.add_argument('--force', action='store_true',
+                        help='recompila mesmo os arquivos que não mudaram')
+    _adicionar_opcao_otimizacao(parser)
+    _adicionar_opcao_parser(parser)
+    parser.add_argument('--stats', metavar='ARQUIVO',
+                        help='grava em JSON os contadores somados de todos os arquivos; '
+                             'implica --force')
+    args = parser.parse_args(argv)
+    opcoes = f'-O{args.otimizacao}'
+    medir = args.stats is not None
+
+    arquivos = _encontrar_fontes(args.caminhos)
+    if not arquivos:
+        print("Erro: Nenhum arquivo .formiga encontrado.")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    manifestos = {}
+    hashes = {}
+    pendentes = []
+    resultados = []
+    for arquivo in arquivos:
+        diretorio = os.path.dirname(arquivo)
+        if diretorio not in manifestos:
+            manifestos[diretorio] = _carregar_manifesto(diretorio)
+        hashes[arquivo] = _hash_arquivo(arquivo)
+        if not (args.force or medir) and _esta_atualizado(arquivo, manifestos[diretorio],
+                                                          hashes[arquivo], opcoes):
+            resultados.append((arquivo, 'atual', _arquivo_saida(arquivo), 0.0, None, []))
+        else:
+            pendentes.append(arquivo)
+
+    jobs = max(1, min(args.jobs, len(pendentes)))
+    if not pendentes:
+        pass
+    elif jobs == 1:
+        _iniciar_worker(args.otimizacao, medir, args.parser)
+        resultados.extend(_compilar_no_worker(a) for a in pendentes)
+    else:
+        # Lotes grandes o bastante para diluir o custo de IPC, pequenos o
+        # bastante para equilibrar a carga entre os processos.
+        lote = max(1, len(pendentes) // (jobs * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs,
+                                                    initializer=_iniciar_worker,
+                                                    initargs=(args.otimizacao, medir,
+                                                              args.parser)) as executor:
+            resultados.extend(executor.map(_compilar_no_worker, pendentes, chunksize=lote))
+
+    for arquivo, status, *_ in resultados:
+        if status == 'ok':
+            _registrar(arquivo, manifestos[os.path.dirname(arquivo)], hashes[arquivo], opcoes)
+    for diretorio, manifesto in manifestos.items():
+        _salvar_manifesto(diretorio, manifesto)
+    total = time.perf_counter() - inicio
+
+    falhas = 0
+    atuais = 0
+    for arquivo, status, saida, segundos, _, avisos in sorted(resultados, key=lambda r: r[0]):
+        if status == 'erro':
+            falhas += 1
+        elif status == 'atual':
+            atuais += 1
+        print(f"[{status.upper():>5}] {segundos * 1000:8.1f} ms  {arquivo}")
+        for linha in avisos + (saida.splitlines() if status == 'erro' else []):
+            print(f"        {linha}")
+    print(f"{len(resultados) - falhas - atuais} compilado(s), {atuais} já atualizado(s), "
+          f"{falhas} com erro, {total:.2f} s com {jobs} processo(s).")
+    if medir:
+        soma = {'arquivos': 0, 'tokens': 0, 'bytes_emitidos': 0, 'reducoes': {}, 'tempos': {}}
+        for *_, estatisticas, _ in resultados:
+            if estatisticas is not None:
+                _somar_estatisticas(soma, estatisticas)
+        _salvar_estatisticas(args.stats, soma)
+    if falhas:
+        sys.exit(1)
+
+# ---------------------------------------------------------------------
+# Driver (--exe/--run): passa o .c gerado por um compilador C. Os
+# executáveis ficam em cache, identificados pelo hash do C, do compilador
+# e das flags, então compilar de novo o mesmo programa não custa nada.
+# ---------------------------------------------------------------------
+PERFIS_CC = {
+    'depuracao': ['-O0', '-g'],
+    'padrao': ['-O2'],
+    'nativo': ['-O2', '-march=native'],
+    'maximo': ['-O3', '-march=native'],
+}
+
+def _identidade_cc(cc):
+    # Caminho real, tamanho e data do binário: trocar ou atualizar o
+    # compilador invalida o cache sem precisar rodar 'cc --version'.
+    caminho = shutil.which(cc)
+    if caminho is None:
+        raise ValueError(f"Erro: compilador C '{cc}' não encontrado.")
+    caminho = os.path.realpath(caminho)
+    info = os.stat(caminho)
+    return f'{caminho}:{info.st_size}:{info.st_mtime_ns}'
+
+def _compilar_c(arquivo_c, cc, flags, tempos=None):
+    """Devolve o caminho do executável (no cache) gerado a partir de arquivo_c."""
+    inicio = time.perf_counter()
+    comando = [cc, *flags]
+    h = hashlib.sha256(_identidade_cc(cc).encode())
+    h.update('\0'.join(comando).encode())
+    h.update(_hash_arquivo(arquivo_c).encode())
+    diretorio = os.path.join(_diretorio_cache(), 'binarios')
+    executavel = os.path.join(diretorio, h.hexdigest()[:32])
+
+    em_cache = os.path.exists(executavel)
+    if not em_cache:
+        os.makedirs(diretorio, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+        os.close(fd)
+        try:
+            # As mensagens do compilador C vão direto para o terminal.
+            if subprocess.run([*comando, arquivo_c, '-o', temporario]).returncode != 0:
+                raise ValueError(f"ERRO: {cc} não conseguiu compilar {arquivo_c}.")
+            os.replace(temporario, executavel)
+        finally:
+            if os.path.exists(temporario):
+                os.unlink(temporario)
+    if tempos is not None:
+        tempos['compilador_c'] = time.perf_counter() - inicio
+        tempos['origem_binario'] = 'cache' if em_cache else os.path.basename(cc)
+    return executavel
+
+def _usa_openmp(arquivo_c):
+    # Programas com marcharJuntas precisam de -fopenmp; sem ele o gcc ignora
+    # o pragma e o laço roda numa thread só.
+    with open(arquivo_c, encoding='utf-8') as f:
+        return any(linha.lstrip().startswith('#pragma omp') for linha in f)
+
+def _executar(executavel, tempos=None):
+    inicio = time.perf_counter()
+    codigo = subprocess.run([executavel]).returncode
+    if tempos is not None:
+        tempos['execucao'] = time.perf_counter() - inicio
+    return codigo
+
+# ---------------------------------------------------------------------
+# Modo servidor: um processo que fica no ar com lexers e parsers já
+# montados e atende pedidos por um socket Unix, uma linha JSON por pedido
+# e por resposta. O cliente (com a mesma linha de comando de main()) fica
+# em cliente.py.
+# ---------------------------------------------------------------------
+def _caminho_socket():
+    return os.environ.get('FORMIGA_SOCKET') or os.path.join(
+        tempfile.gettempdir(), f'formiga-{os.getuid()}.sock')
+
+def _diagnostico_json(diagnostico):
+    return {'linha': diagnostico.linha, 'coluna': diagnostico.coluna,
+            'categoria': diagnostico.categoria, 'mensagem': diagnostico.mensagem}
+
+class _AtendimentoCompilacao(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Uma conexão pode mandar vários pedidos, um por linha.
+        for linha in self.rfile:
+            try:
+                pedido = json.loads(linha)
+                if not isinstance(pedido, dict):
+                    raise ValueError
+            except ValueError:
+                resposta = {'status': 'erro', 'mensagem': 'Pedido inválido.', 'diagnosticos': []}
+            else:
+                resposta = self.server.atender(pedido)
+            self.wfile.write(json.dumps(resposta).encode() + b'\n')
+            self.wfile.flush()
+
+class ServidorCompilacao(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, caminho, instancias):
+        super().__init__(caminho, _AtendimentoCompilacao)
+        # Cada pedido pega um lexer, com os seus parsers, só para si e o
+        # devolve ao terminar; parse() e tokenizar_arquivo() zeram o estado
+        # (natureza encontrada, nome do programa, diagnósticos) a cada uso.
+        # Os parsers de cada motor são criados no primeiro pedido que o usa.
+        self.instancias = queue.Queue()
+        for _ in range(instancias):
+            self.instancias.put((AnalisadorLexico(), {}))
+
+    def atender(self, pedido):
+        arquivo_entrada = pedido.get('arquivo')
+        if not isinstance(arquivo_entrada, str) or not os.path.isabs(arquivo_entrada):
+            return {'status': 'erro', 'diagnosticos': [],
+                    'mensagem': "Pedido inválido: 'arquivo' deve ser um caminho absoluto."}
+        if not os.path.exists(arquivo_entrada):
+            return {'status': 'erro', 'diagnosticos': [],
+                    'mensagem': f"Erro: Arquivo não encontrado: {arquivo_entrada}"}
+        otimizacao = pedido.get('otimizacao', 0)
+        if otimizacao not in (0, 1, 2):
+            return {'status': 'erro', 'diagnosticos': [],
+                    'mensagem': f"Pedido inválido: nível de otimização {otimizacao!r}."}
+
+        parser = pedido.get('parser', 'sly')
+        if parser not in ANALISADORES_SINTATICOS:
+            return {'status': 'erro', 'diagnosticos': [],
+                    'mensagem': f"Pedido inválido: parser {parser!r}."}
+
+        tempos = {} if pedido.get('tempos') else None
+        avisos = []
+        analisador_lexico, parsers = self.instancias.get()
+        try:
+            gerador_codigo = parsers.get(parser)
+            if gerador_codigo is None:
+                gerador_codigo = parsers[parser] = _novo_parser(parser)
+            status, arquivo_saida = _compilar_se_preciso(
+                arquivo_entrada, analisador_lexico, gerador_codigo, otimizacao,
+                bool(pedido.get('forcar')), tempos, avisos)
+        except ErroCompilacao as e:
+            return {'status': 'erro', 'mensagem': str(e),
+                    'diagnosticos': [_diagnostico_json(d) for d in e.diagnosticos]}
+        except (ValueError, TypeError, OSError) as e:
+            return {'status': 'erro', 'mensagem': str(e), 'diagnosticos': []}
+        finally:
+            self.instancias.put((analisador_lexico, parsers))
+
+        resposta = {'status': status, 'saida': arquivo_saida, 'diagnosticos': [],
+                    'avisos': [_diagnostico_json(d) for d in avisos]}
+        if pedido.get('codigo', True):
+            with open(arquivo_saida, encoding='utf-8') as f:
+                resposta['codigo'] = f.read()
+        if tempos is not None:
+            resposta['tempos'] = _etapas(tempos)
+        return resposta
+
+def main_serve(argv):
+    parser = argparse.ArgumentParser(
+        prog='c_lasse_trabalhora.py serve',
+        description='Mantém o compilador carregado e atende pedidos por um socket Unix.')
+    parser.add_argument('--socket', default=_caminho_socket(),
+                        help='caminho do socket (padrão: $FORMIGA_SOCKET ou um arquivo no /tmp)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='pedidos atendidos ao mesmo tempo (padrão: número de CPUs)')
+    args = parser.parse_args(argv)
+
+    # Um socket que sobrou de um servidor encerrado à força é removido; um
+    # que ainda responde significa que já há um servidor no ar.
+    if os.path.exists(args.socket):
+        try:
+            with socket.socket(socket.AF_UNIX) as teste:
+                teste.connect(args.socket)
+            print(f"Erro: já existe um servidor em {args.socket}")
+            sys.exit(1)
+        except OSError:
+            os.unlink(args.socket)
+
+    # SIGTERM encerra como o Ctrl+C, removendo o socket.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with ServidorCompilacao(args.socket, max(1, args.jobs)) as servidor:
+        print(f"Servidor ouvindo em {args.socket} com {max(1, args.jobs)} instância(s).")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+
+def _main_vm(args, tempos):
+    arquivo_entrada = args.arquivo
+    gerador_codigo = _novo_parser(args.parser)
+    avisos = []
+    try:
+        programa = _compilar_bytecode(arquivo_entrada, AnalisadorLexico(), gerador_codigo,
+                                      tempos, args.otimizacao, avisos)
+    except (ValueError, TypeError) as e:
+        print(e)
+        return 1
+    for aviso in avisos:
+        print(f"{arquivo_entrada}:{aviso}")
+    sys.stdout.flush()
+    inicio = time.perf_counter()
+    try:
+        codigo_saida = programa.executar(sys.stdout.buffer)
+    except ErroExecucao as e:
+        sys.stdout.buffer.flush()
+        print(f"{arquivo_entrada}:{e}")
+        codigo_saida = 1
+    sys.stdout.buffer.flush()
+    if tempos is not None:
+        tempos['execucao'] = time.perf_counter() - inicio
+    if args.stats:
+        tamanho = len(programa.codigo) * programa.codigo.itemsize
+        _salvar_estatisticas(args.stats, _estatisticas(gerador_codigo, tamanho, tempos))
+    if args.timings:
+        _imprimir_tempos(_etapas(tempos))
+    return codigo_saida
+
+def _main_compilar(args):
+    arquivo_entrada = args.arquivo
+    if not os.path.exists(arquivo_entrada):
+        print(f"Erro: Arquivo não encontrado: {arquivo_entrada}")
+        sys.exit(1)
+
+    # --stats também precisa dos tempos, mas só --timings os imprime.
+    tempos = {} if args.timings or args.stats else None
+    if args.vm:
+        sys.exit(_main_vm(args, tempos))
+    gerador_codigo = _novo_parser(args.parser)
+    avisos = []
+    try:
+        status, arquivo_saida = _compilar_se_preciso(arquivo_entrada, AnalisadorLexico(),
+                                                     gerador_codigo, args.otimizacao,
+                                                     args.force or bool(args.stats), tempos,
+                                                     avisos, args.jobs)
+    except (ValueError, TypeError) as e:
+        print(e)
+        sys.exit(1)
+    for aviso in avisos:
+        print(f"{arquivo_entrada}:{aviso}")
+
+    if status == 'atual':
+        print(f"Nada a fazer: {arquivo_saida} já está atualizado.")
+        if not (args.exe or args.run):
+            return
+    else:
+        print(f"Compilação concluída! Arquivo C gerado: {arquivo_saida}")
+
+    codigo_saida = 0
+    if args.exe or args.run:
+        flags = PERFIS_CC[args.perfil] + args.cflags.split()
+        if _usa_openmp(arquivo_saida):
+            flags.insert(0, '-fopenmp')
+        try:
+            executavel = _compilar_c(arquivo_saida, args.cc, flags, tempos)
+        except (ValueError, OSError) as e:
+            print(e)
+            sys.exit(1)
+        if args.exe:
+            destino = os.path.splitext(arquivo_entrada)[0]
+            shutil.copy2(executavel, destino)
+            print(f"Executável gerado: {destino}")
+        else:
+            sys.stdout.flush()
+            codigo_saida = _executar(executavel, tempos)
+    if args.stats:
+        _salvar_estatisticas(args.stats, _estatisticas(
+            gerador_codigo, os.path.getsize(arquivo_saida), tempos))
+    if args.timings:
+        _imprimir_tempos(_etapas(tempos))
+    sys.exit(codigo_saida)
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        main_build(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        main_serve(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        usage="python c_lasse_trabalhora.py [--timings] [--force] [-O N] "
+              "[--parser {sly,fast}] [-j N] [--exe | --run | --vm] [--perfil P] [--stats J] "
+              "[--profile P] <arquivo.formiga>")
+    parser.add_argument('arquivo')
+    parser.add_argument('--timings', action='store_true',
+                        help='mostra o tempo de cada etapa da compilação')
+    parser.add_argument('--force', action='store_true',
+                        help='recompila mesmo que o arquivo não tenha mudado')
+    _adicionar_opcao_otimizacao(parser)
+    _adicionar_opcao_parser(parser)
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help='divide um arquivo grande entre as declarações de nível superior '
+                             'e analisa os trechos em N processos (padrão: 1)')
+    driver = parser.add_mutually_exclusive_group()
+    driver.add_argument('--exe', action='store_true',
+                        help='também compila o C e gera o executável ao lado do fonte')
+    driver.add_argument('--run', action='store_true',
+                        help='compila o C e executa o programa')
+    driver.add_argument('--vm', action='store_true',
+                        help='executa o programa na máquina virtual embutida, sem gerar '
+                             'o .c nem chamar o compilador C')
+    parser.add_argument('--perfil', choices=sorted(PERFIS_CC), default='padrao',
+                        help='flags do compilador C: ' + '; '.join(
+                            f"{nome}: {' '.join(flags)}" for nome, flags in sorted(PERFIS_CC.items())))
+    parser.add_argument('--cc', default=os.environ.get('CC', 'cc'),
+                        help='compilador C (padrão: $CC ou cc)')
+    parser.add_argument('--cflags', default='',
+                        help='flags extras para o compilador C, depois das do perfil')
+    parser.add_argument('--stats', metavar='ARQUIVO',
+                        help='grava em JSON tokens lidos, reduções por regra da gramática '
+                             '(só com --parser sly), bytes emitidos e tempo de cada etapa; '
+                             'implica --force')
+    parser.add_argument('--profile', metavar='ARQUIVO',
+                        help='roda tudo sob o cProfile e grava as estatísticas (pstats) '
+                             'neste arquivo')
+    args = parser.parse_args()
+    if args.jobs > 1 and (args.vm or args.stats):
+        parser.error("-j não se aplica a --vm nem a --stats")
+
+    if not args.profile:
+        _main_compilar(args)
+        return
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        _main_compilar(args)
+    finally:
+        perfil.disable()
+        perfil.dump_stats(args.profile)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+
+# Cliente do modo servidor (python c_lasse_trabalhora.py serve). Aceita a
+# mesma linha de comando que o compilador, mas só repassa o pedido ao
+# servidor e imprime a resposta. Usa apenas a biblioteca padrão: importar
+# o compilador montaria o lexer e o parser, justamente o custo que o
+# servidor existe para evitar.
+
+def _caminho_socket():
+    # Mesmo padrão de c_lasse_trabalhora._caminho_socket().
+    return os.environ.get('FORMIGA_SOCKET') or os.path.join(
+        tempfile.gettempdir(), f'formiga-{os.getuid()}.sock')
+
+def pedir(pedido, caminho_socket=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexao:
+        conexao.connect(caminho_socket or _caminho_socket())
+        conexao.sendall(json.dumps(pedido).encode() + b'\n')
+        with conexao.makefile('rb') as resposta:
+            return json.loads(resposta.readline())
+
+def imprimir_diagnostico(arquivo, d):
+    posicao = d['linha'] if d['coluna'] is None else f"{d['linha']}:{d['coluna']}"
+    print(f"{arquivo}:{posicao}: {d['categoria']}: {d['mensagem']}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python cliente.py [--timings] [--force] [-O N] [--parser {sly,fast}] "
+              "<arquivo.formiga>")
+    parser.add_argument('arquivo')
+    parser.add_argument('--timings', action='store_true',
+                        help='mostra o tempo de cada etapa da compilação')
+    parser.add_argument('--force', action='store_true',
+                        help='recompila mesmo que o arquivo não tenha mudado')
+    parser.add_argument('-O', dest='otimizacao', type=int, default=0, choices=[0, 1, 2],
+                        metavar='N', help='nível de otimização: 0 (padrão), 1 ou 2')
+    parser.add_argument('--parser', choices=['fast', 'sly'], default='sly',
+                        help='motor da análise sintática: sly (padrão) ou fast')
+    parser.add_argument('--socket', default=_caminho_socket(), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    arquivo_entrada = args.arquivo
+    if not os.path.exists(arquivo_entrada):
+        print(f"Erro: Arquivo não encontrado: {arquivo_entrada}")
+        sys.exit(1)
+
+    pedido = {
+        'arquivo': os.path.abspath(arquivo_entrada),
+        'otimizacao': args.otimizacao,
+        'parser': args.parser,
+        'forcar': args.force,
+        'tempos': args.timings,
+        'codigo': False,
+    }
+    try:
+        resposta = pedir(pedido, args.socket)
+    except (OSError, ValueError):
+        print(f"Erro: nenhum servidor respondendo em {args.socket}. "
+              f"Inicie um com: python c_lasse_trabalhora.py serve")
+        sys.exit(1)
+
+    arquivo_saida = arquivo_entrada.replace(".formiga", ".c")
+    for d in resposta.get('avisos', []):
+        imprimir_diagnostico(arquivo_entrada, d)
+    if resposta['status'] == 'erro':
+        diagnosticos = resposta['diagnosticos']
+        if not diagnosticos:
+            print(resposta['mensagem'])
+            sys.exit(1)
+        for d in diagnosticos:
+            imprimir_diagnostico(arquivo_entrada, d)
+        print(f"ERRO: Compilação interrompida: {len(diagnosticos)} "
+              f"{'erro encontrado' if len(diagnosticos) == 1 else 'erros encontrados'}.")
+        sys.exit(1)
+    if resposta['status'] == 'atual':
+        print(f"Nada a fazer: {arquivo_saida} já está atualizado.")
+        return
+    print(f"Compilação concluída! Arquivo C gerado: {arquivo_saida}")
+    if 'tempos' in resposta:
+        print("Tempos:")
+        for rotulo, segundos in resposta['tempos']:
+            print(f"  {rotulo:<26}{segundos * 1000:9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+import os
+import sys
+import random
+import argparse
+import signal
+import tempfile
+import subprocess
+
+import c_lasse_trabalhora
+from c_lasse_trabalhora import (AnalisadorLexico, compilar_codigo, executar_codigo,
+                                _encontrar_fontes)
+
+# Teste diferencial da máquina virtual: cada programa roda pelo caminho
+# normal (C gerado + compilador C) e pela VM (--vm), e a saída e o código
+# de saída têm de ser idênticos. Os programas vêm dos arquivos indicados
+# e/ou de um gerador aleatório que só produz código sem comportamento
+# indefinido (laços limitados, divisores constantes positivos, índices
+# dentro dos vetores). O C é compilado com -fwrapv, que dá aos inteiros
+# com sinal o mesmo estouro circular da VM. Com -O2, a VM também roda o
+# programa compilado com -O1, sem a otimização de laços, e as duas saídas
+# têm de ser iguais.
+#
+# Como o gerador conta com esse estouro circular, o -fwrapv esconderia um
+# estouro que a otimização criasse. Por isso, com -O1 e -O2 o C otimizado
+# também roda sem -fwrapv e com o UBSan: se ele acusa comportamento
+# indefinido e o C sem otimização, compilado do mesmo jeito, não acusa, a
+# otimização o introduziu. Esse C é compilado com -O0, para que o gcc não
+# leve de volta para dentro do laço uma conta que o nosso -O2 tirou dele.
+#
+# Com --parsers, o que se compara são os dois motores de análise sintática:
+# o C gerado, os diagnósticos e os avisos do --parser=fast têm de ser os do
+# SLY. Além dos programas válidos, cada um é comparado também em versões
+# estragadas (tokens apagados, repetidos ou inseridos), para exercitar a
+# recuperação de erros.
+#
+# Em qualquer modo, e também sem argumentos, rodam antes os casos de
+# REGRESSOES: entradas que já travaram ou derrubaram o compilador.
+FLAGS_CC = ['-O2', '-fwrapv', '-ffp-contract=off', '-w']
+FLAGS_UBSAN = ['-O0', '-fsanitize=undefined', '-fno-sanitize-recover', '-ffp-contract=off', '-w']
+
+TIPOS_INTEIROS = {
+    'formigaInteira': 'int', 'formigaAncia': 'long', 'operario': 'unsigned',
+    'formigaLarva': 'short', 'formigaLetra': 'char', 'formigaSentinela': 'bool',
+}
+TIPOS_REAIS = {'formigaFlutuante': 'float', 'formigaFlutuante^2': 'double'}
+TEXTOS = ['x=', ' ', 'carga ', '50% ', 'a\\tb', 'formiga ç']
+
+class GeradorProgramas(random.Random):
+    """Gera programas aleatórios e bem definidos em C-lasse Trabalhadora."""
+
+    def programa(self):
+        self.linhas = []
+        self.contador = 0
+        self.funcoes = []   # (nome, quantidade de parâmetros) das auxiliares
+        for _ in range(self.randint(0, 3)):
+            self.funcao_auxiliar()
+        self.linhas.append('tunelVazio natureza() {')
+        self.auxiliar = False
+        self.escopos = [[]]
+        self.lacos = []     # 'marchar' ou 'outro', do mais externo ao mais interno
+        self.contadores = []
+        self.em_escolha = 0
+        self.vetores = []
+        for _ in range(self.randint(2, 4)):
+            self.declaracao(1)
+        for _ in range(self.randint(0, 2)):
+            self.vetor(1)
+        for _ in range(self.randint(4, 12)):
+            self.instrucao(1, 3)
+        self.imprimir_tudo(1)
+        self.escrever(1, f'entregar {self.inteiro(2)} % 100;')
+        self.linhas.append('}')
+        return '\n'.join(self.linhas) + '\n'
+
+    def nome(self, prefixo):
+        self.contador += 1
+        return f'{prefixo}{self.contador}'
+
+    def escrever(self, nivel, texto):
+        self.linhas.append('    ' * nivel + texto)
+
+    # --- Declarações -----------------------------------------------------
+    def funcao_auxiliar(self):
+        nome = self.nome('f')
+        parametros = self.randint(0, 3)
+        nomes = [self.nome('p') for _ in range(parametros)]
+        assinatura = ', '.join(f'formigaInteira {p}' for p in nomes)
+        self.linhas.append(f'formigaInteira {nome}({assinatura}) {{')
+        # As auxiliares não imprimem: C não define a ordem em que os
+        # operandos e argumentos são avaliados, e a saída dependeria dela.
+        self.auxiliar = True
+        self.escopos = [[(p, 'formigaInteira', True) for p in nomes]]
+        self.lacos = []
+        self.contadores = []
+        self.em_escolha = 0
+        self.vetores = []
+        for _ in range(self.randint(0, 2)):
+            self.declaracao(1)
+        for _ in range(self.randint(0, 3)):
+            self.instrucao(1, 2)
+        self.escrever(1, f'entregar {self.inteiro(3)};')
+        self.linhas.append('}')
+        self.funcoes.append((nome, parametros))
+
+    def declaracao(self, nivel):
+        tipo = self.choice(list(TIPOS_INTEIROS) * 2 + list(TIPOS_REAIS))
+        nome = self.nome('v')
+        valor = self.real(2) if tipo in TIPOS_REAIS else self.inteiro(2)
+        self.escrever(nivel, f'{tipo} {nome} = {valor};')
+        self.escopos[-1].append((nome, tipo, True))
+
+    def vetor(self, nivel):
+        tipo = self.choice(['formigaInteira', 'formigaAncia', 'formigaFlutuante^2'])
+        nome = self.nome('a')
+        tamanho = self.randint(1, 6)
+        self.escrever(nivel, f'{tipo} {nome}[{tamanho}];')
+        valor = self.real(1) if tipo in TIPOS_REAIS else self.inteiro(1)
+        self.escrever(nivel, f'preencher({nome}, {valor});')
+        self.vetores.append((nome, tipo, tamanho))
+
+    def variaveis(self, reais=False, atribuiveis=False):
+        return [(nome, tipo) for escopo in self.escopos for nome, tipo, livre in escopo
+                if (tipo in TIPOS_REAIS) == reais and (livre or not atribuiveis)]
+
+    # --- Instruções ------------------------------------------------------
+    def instrucao(self, nivel, profundidade):
+        opcoes = ['atribuicao'] * 4
+        if not self.auxiliar:
+            opcoes += ['imprimir'] * 2
+        if profundidade > 0:
+            opcoes += ['se', 'escada', 'marchar', 'enquanto', 'cavar', 'escolha']
+            # Logo depois de um '{', construir ... descansar seria o corpo
+            # inteiro, e nada mais poderia vir antes do '}'.
+            if not self.linhas[-1].endswith('{'):
+                opcoes.append('construir')
+        if self.vetores:
+            opcoes += ['vetor']
+        if self.lacos or self.em_escolha:
+            opcoes.append('interromper')
+        if self.lacos and self.lacos[-1] == 'marchar':
+            opcoes.append('continuar')
+        getattr(self, 'instrucao_' + self.choice(opcoes))(nivel, profundidade)
+
+    def bloco(self, nivel, profundidade, quantas=None):
+        self.escopos.append([])
+        for _ in range(quantas if quantas is not None else self.randint(1, 3)):
+            self.instrucao(nivel, profundidade)
+        self.escopos.pop()
+
+    def instrucao_atribuicao(self, nivel, profundidade):
+        reais = bool(self.variaveis(reais=True, atribuiveis=True)) and self.random() < 0.3
+        candidatas = self.variaveis(reais=reais, atribuiveis=True)
+        if not candidatas:
+            return self.declaracao(nivel)
+        nome, tipo = self.choice(candidatas)
+        valor = self.real(3) if reais else self.inteiro(3)
+        self.escrever(nivel, f'{nome} = {valor};')
+
+    def instrucao_imprimir(self, nivel, profundidade):
+        argumentos = []
+        for _ in range(self.randint(1, 3)):
+            if self.random() < 0.3:
+                argumentos.append('"' + self.choice(TEXTOS) + '"')
+            elif self.random() < 0.3 and self.variaveis(reais=True):
+                argumentos.append(self.real(2))
+            else:
+                argumentos.append(self.inteiro(2))
+        self.escrever(nivel, f'sinalizar({", ".join(argumentos)});')
+
+    def instrucao_vetor(self, nivel, profundidade):
+        nome, tipo, tamanho = self.choice(self.vetores)
+        real = tipo in TIPOS_REAIS
+        acao = self.randint(0, 2)
+        if acao == 0:
+            valor = self.real(2) if real else self.inteiro(2)
+            self.escrever(nivel, f'{nome}[{self.randint(0, tamanho - 1)}] = {valor};')
+        elif acao == 1:
+            self.escrever(nivel, f'preencher({nome}, {self.real(1) if real else self.inteiro(1)});')
+        else:
+            iguais = [v for v in self.vetores if v[1] == tipo]
+            self.escrever(nivel, f'copiar({nome}, {self.choice(iguais)[0]});')
+
+    def instrucao_se(self, nivel, profundidade):
+        self.escrever(nivel, f'seObstaculo ({self.condicao()}) {{')
+        self.bloco(nivel + 1, profundidade - 1)
+        for _ in range(self.randint(0, 2)):
+            self.escrever(nivel, f'}} senaoSeOutroObstaculo ({self.condicao()}) {{')
+            self.bloco(nivel + 1, profundidade - 1)
+        if self.random() < 0.5:
+            self.escrever(nivel, '} senaoCavar {')
+            self.bloco(nivel + 1, profundidade - 1)
+        self.escrever(nivel, '}')
+
+    def instrucao_escada(self, nivel, profundidade):
+        # Cadeia de 'x == c' sobre uma variável, que o -O1 transforma em
+        # switch; valores repetidos e fora do alcance do tipo entram de
+        # propósito.
+        candidatas = self.variaveis()
+        if not candidatas:
+            return self.instrucao_se(nivel, profundidade)
+        nome, _ = self.choice(candidatas)
+        for i in range(self.randint(2, 6)):
+            valor = self.choice([self.randint(-2, 6), self.randint(-2, 6), 300, 70000])
+            comparacao = f'{nome} == {valor}' if self.random() < 0.8 else f'{valor} == {nome}'
+            palavra = 'seObstaculo' if i == 0 else '} senaoSeOutroObstaculo'
+            self.escrever(nivel, f'{palavra} ({comparacao}) {{')
+            self.bloco(nivel + 1, profundidade - 1)
+        if self.random() < 0.3:
+            self.escrever(nivel, f'}} senaoSeOutroObstaculo ({self.condicao()}) {{')
+            self.bloco(nivel + 1, profundidade - 1)
+        if self.random() < 0.5:
+            self.escrever(nivel, '} senaoCavar {')
+            self.bloco(nivel + 1, profundidade - 1)
+        self.escrever(nivel, '}')
+
+    def laco(self, tipo, nivel, profundidade):
+        self.lacos.append(tipo)
+        self.bloco(nivel + 1, profundidade - 1)
+        self.lacos.pop()
+
+    def instrucao_marchar(self, nivel, profundidade):
+        # O contador não pode ser atribuído no corpo, para o laço terminar.
+        # Ele às vezes conta para trás, para exercitar a redução de força
+        # do -O2 com passos negativos.
+        contador = self.nome('i')
+        tipo = self.choice(['formigaInteira'] * 3 + ['formigaAncia', 'operario'])
+        passo = self.randint(1, 3)
+        if tipo != 'operario' and self.random() < 0.3:
+            self.escrever(nivel, f'marchar ({tipo} {contador} = {self.randint(0, 9)}; '
+                                 f'{contador} > {self.randint(-3, 3)}; '
+                                 f'{contador} = {contador} - {passo}) {{')
+        else:
+            self.escrever(nivel, f'marchar ({tipo} {contador} = {self.randint(0, 2)}; {contador} < '
+                                 f'{self.randint(0, 9)}; {contador} = {contador} + {passo}) {{')
+        self.escopos.append([(contador, tipo, False)])
+        self.contadores.append(contador)
+        self.laco('marchar', nivel, profundidade)
+        self.contadores.pop()
+        self.escopos.pop()
+        self.escrever(nivel, '}')
+
+    def instrucao_enquanto(self, nivel, profundidade):
+        # O incremento fica no início do corpo: um ignorarFolha não o pularia,
+        # mas mesmo assim só geramos ignorarFolha dentro de marchar.
+        contador = self.nome('w')
+        self.escrever(nivel, f'formigaInteira {contador} = 0;')
+        self.escopos[-1].append((contador, 'formigaInteira', False))
+        self.escrever(nivel, f'enquantoHouverComida ({contador} < {self.randint(0, 4)}) {{')
+        self.escrever(nivel + 1, f'{contador} = {contador} + 1;')
+        self.laco('outro', nivel, profundidade)
+        self.escrever(nivel, '}')
+
+    def instrucao_cavar(self, nivel, profundidade):
+        contador = self.nome('w')
+        self.escrever(nivel, f'formigaInteira {contador} = 0;')
+        self.escopos[-1].append((contador, 'formigaInteira', False))
+        self.escrever(nivel, 'cavarAteEnquanto {')
+        self.escrever(nivel + 1, f'{contador} = {contador} + 1;')
+        self.laco('outro', nivel, profundidade)
+        self.escrever(nivel, f'}} enquantoHouverComida ({contador} < {self.randint(1, 4)});')
+
+    def instrucao_escolha(self, nivel, profundidade):
+        self.escrever(nivel, f'inspecionarTunel (({self.inteiro(2)}) % 4) {{')
+        self.em_escolha += 1
+        for _ in range(self.randint(1, 4)):
+            valor = self.randint(-3, 3)
+            self.escrever(nivel + 1, f'caminho {valor}:')
+            self.bloco(nivel + 2, profundidade - 1, self.randint(0, 2))
+            if self.random() < 0.7:
+                self.escrever(nivel + 2, 'retornarAoNinho;')
+        self.em_escolha -= 1
+        self.escrever(nivel, '}')
+
+    def instrucao_construir(self, nivel, profundidade):
+        self.escrever(nivel, 'construir')
+        self.bloco(nivel + 1, profundidade - 1)
+        self.escrever(nivel, 'descansar')
+
+    def instrucao_interromper(self, nivel, profundidade):
+        self.escrever(nivel, 'retornarAoNinho;')
+
+    def instrucao_continuar(self, nivel, profundidade):
+        self.escrever(nivel, 'ignorarFolha;')
+
+    def imprimir_tudo(self, nivel):
+        for nome, _ in self.variaveis() + self.variaveis(reais=True):
+            self.escrever(nivel, f'sinalizar("{nome}=", {nome});')
+        for nome, _, _ in self.vetores:
+            self.escrever(nivel, f'sinalizar("soma {nome}=", somar({nome}));')
+
+    # --- Expressões ------------------------------------------------------
+    def literal_inteiro(self):
+        if self.random() < 0.1:
+            return str(self.choice([2147483000, 1000000007, 65535, 255]))
+        return str(self.randint(0, 20))
+
+    def inteiro(self, profundidade):
+        escolha = self.random()
+        variaveis = self.variaveis()
+        if profundidade <= 0 or escolha < 0.25:
+            if variaveis and self.random() < 0.6:
+                return self.choice(variaveis)[0]
+            return self.literal_inteiro()
+        if escolha < 0.35 and self.funcoes:
+            nome, parametros = self.choice(self.funcoes)
+            argumentos = ', '.join(self.inteiro(profundidade - 1) for _ in range(parametros))
+            return f'{nome}({argumentos})'
+        if escolha < 0.45 and self.vetores:
+            inteiros = [v for v in self.vetores if v[1] not in TIPOS_REAIS]
+            if inteiros:
+                nome, _, tamanho = self.choice(inteiros)
+                if self.random() < 0.5:
+                    return f'somar({nome})'
+                return f'{nome}[{self.randint(0, tamanho - 1)}]'
+        if escolha < 0.5 and self.contadores:
+            return f'{self.choice(self.contadores)} * {self.choice([self.literal_inteiro(), self.inteiro(0)])}'
+        if escolha < 0.55:
+            return f'-({self.inteiro(profundidade - 1)})'
+        if escolha < 0.65:
+            return f'({self.inteiro(profundidade - 1)}) {self.choice("/%")} {self.randint(1, 9)}'
+        if escolha < 0.75:
+            return f'({self.condicao(profundidade - 1)})'
+        op = self.choice('+-*')
+        return f'({self.inteiro(profundidade - 1)}) {op} ({self.inteiro(profundidade - 1)})'
+
+    def real(self, profundidade):
+        variaveis = self.variaveis(reais=True)
+        if profundidade <= 0 or self.random() < 0.3:
+            if variaveis and self.random() < 0.6:
+                return self.choice(variaveis)[0]
+            return f'{self.randint(0, 99)}.{self.randint(0, 99):02d}'
+        op = self.choice(['+', '-', '*', '/'])
+        direita = (f'{self.randint(1, 9)}.5' if op == '/' else self.real(profundidade - 1))
+        esquerda = self.real(profundidade - 1) if self.random() < 0.7 else self.inteiro(1)
+        return f'({esquerda}) {op} ({direita})'
+
+    def condicao(self, profundidade=2):
+        if profundidade > 0 and self.random() < 0.3:
+            op = self.choice(['&&', '||'])
+            return f'({self.condicao(profundidade - 1)}) {op} ({self.condicao(profundidade - 1)})'
+        if self.random() < 0.1:
+            return f'!({self.condicao(profundidade - 1)})'
+        op = self.choice(['<', '>', '<=', '>=', '=='])
+        return f'({self.inteiro(1)}) {op} ({self.inteiro(1)})'
+
+def executar_c(codigo, cc, flags=FLAGS_CC):
+    """Compila e roda o C; devolve (saída, código de saída, saída de erros)."""
+    with tempfile.TemporaryDirectory() as diretorio:
+        fonte = os.path.join(diretorio, 'programa.c')
+        executavel = os.path.join(diretorio, 'programa')
+        with open(fonte, 'w', encoding='utf-8') as f:
+            f.write(codigo)
+        subprocess.run([cc, *flags, fonte, '-o', executavel], check=True)
+        processo = subprocess.run([executavel], capture_output=True, timeout=10)
+        return processo.stdout, processo.returncode, processo.stderr
+
+def comportamento_indefinido(codigo, cc):
+    """Roda o C sem -fwrapv e com o UBSan; devolve o primeiro erro acusado, ou None."""
+    for linha in executar_c(codigo, cc, FLAGS_UBSAN)[2].decode(errors='replace').splitlines():
+        if 'runtime error:' in linha:
+            return linha.split('runtime error:', 1)[1].strip()
+    return None
+
+def comparar(nome, fonte, otimizacao, cc):
+    """Devolve None se os dois caminhos concordam, senão uma descrição."""
+    resultado = compilar_codigo(fonte, otimizacao)
+    if not resultado.ok:
+        return f'{nome}: não compila: {resultado.diagnosticos[0]}'
+    saida_c, status_c, _ = executar_c(resultado.codigo, cc)
+    execucao = executar_codigo(fonte, otimizacao)
+    if not execucao.ok:
+        # Um erro de execução na VM corresponde a um sinal no executável.
+        if status_c < 0:
+            return None
+        return f'{nome}: a VM parou com "{execucao.diagnosticos[0]}", o C não'
+    if (saida_c, status_c) != (execucao.saida, execucao.status):
+        linhas_c = saida_c.splitlines()
+        linhas_vm = execucao.saida.splitlines()
+        for i, (c, vm) in enumerate(zip(linhas_c, linhas_vm)):
+            if c != vm:
+                return f'{nome}: linha {i + 1} da saída: C {c!r}, VM {vm!r}'
+        return (f'{nome}: C {len(linhas_c)} linha(s), status {status_c}; '
+                f'VM {len(linhas_vm)} linha(s), status {execucao.status}')
+    if otimizacao >= 2:
+        referencia = executar_codigo(fonte, 1)
+        if (referencia.saida, referencia.status) != (execucao.saida, execucao.status):
+            return f'{nome}: a saída com -O{otimizacao} difere da saída com -O1'
+    if otimizacao >= 1:
+        erro = comportamento_indefinido(resultado.codigo, cc)
+        if erro is not None and comportamento_indefinido(compilar_codigo(fonte).codigo, cc) is None:
+            return f'{nome}: -O{otimizacao} introduz comportamento indefinido: {erro}'
+    return None
+
+# Entradas que já travaram ou derrubaram o compilador: (descrição, fonte,
+# se compila). Rodam sempre, com os dois parsers; cada uma tem de terminar
+# dentro do limite com um Resultado, sem exceção.
+REGRESSOES = [
+    ("'descansar' solto entre chaves depois de um erro",
+     'tunelVazio natureza() {\n seObstaculo (1) { x = ; descansar }\n}\n', False),
+    ("'}' solto entre construir e descansar",
+     'tunelVazio natureza() {\n construir x = 1; } descansar\n}\n', False),
+    ("'caminho' solto entre chaves depois de um erro",
+     'tunelVazio natureza() {\n x = ; caminho 1:\n}\n', False),
+    ("10000 blocos construir aninhados",
+     'tunelVazio natureza() {\n formigaInteira x = 0;\n' + 'construir\n' * 10000
+     + 'x = x + 1;\n' + 'descansar\n' * 10000 + '}\n', True),
+    ("soma de 5000 termos",
+     'tunelVazio natureza() {\n formigaInteira x = ' + ' + '.join(['1'] * 5000)
+     + ';\n}\n', True),
+    ("3000 seObstaculo aninhados",
+     'tunelVazio natureza() {\n formigaInteira x = 0;\n' + 'seObstaculo (x < 5) {\n' * 3000
+     + 'x = x + 1;\n' + '}\n' * 3000 + '}\n', True),
+    ("3000 parênteses e unários aninhados",
+     'tunelVazio natureza() {\n formigaInteira x = ' + '-(' * 3000 + '1' + ')' * 3000
+     + ';\n}\n', True),
+]
+LIMITE_REGRESSAO = 10  # segundos
+
+class _SemResposta(Exception):
+    pass
+
+def _interromper(*_):
+    raise _SemResposta
+
+def verificar_regressoes():
+    """Devolve a lista de problemas encontrados nas REGRESSOES."""
+    problemas = []
+    anterior = signal.signal(signal.SIGALRM, _interromper)
+    try:
+        for descricao, fonte, compila in REGRESSOES:
+            for motor in ('sly', 'fast'):
+                signal.alarm(LIMITE_REGRESSAO)
+                try:
+                    resultado = compilar_codigo(fonte, parser=motor)
+                except _SemResposta:
+                    problemas.append(f'{descricao} ({motor}): não terminou em '
+                                     f'{LIMITE_REGRESSAO} s')
+                    continue
+                except Exception as e:
+                    problemas.append(f'{descricao} ({motor}): {type(e).__name__}: {e}')
+                    continue
+                finally:
+                    signal.alarm(0)
+                if resultado.ok != compila:
+                    problemas.append(f'{descricao} ({motor}): esperava '
+                                     f"{'compilar' if compila else 'diagnósticos'}, veio "
+                                     f"{resultado.diagnosticos[:1] or 'C gerado'}")
+    finally:
+        signal.signal(signal.SIGALRM, anterior)
+    return problemas
+
+# Tokens inseridos pelas mutações: os que mais mexem na recuperação de erros.
+INSERCOES = [';', '}', '{', '(', ')', ',', '[', ':', '+', '=', 'x', '1', '"t"', 'construir',
+             'descansar', 'caminho', 'seObstaculo', 'senaoCavar', 'senaoSeOutroObstaculo',
+             'formigaInteira', 'colonia']
+
+def mutar(aleatorio, fonte):
+    """Devolve o fonte com de um a três tokens apagados, repetidos ou inseridos."""
+    for _ in range(aleatorio.randint(1, 3)):
+        tokens = list(AnalisadorLexico().tokenize(fonte))
+        if not tokens:
+            break
+        tok = aleatorio.choice(tokens)
+        sorteio = aleatorio.random()
+        if sorteio < 0.4:
+            # Espaços no lugar do token, para não mudar as linhas.
+            fonte = fonte[:tok.index] + ' ' * (tok.end - tok.index) + fonte[tok.end:]
+            continue
+        if sorteio < 0.8:
+            novo = aleatorio.choice(INSERCOES)
+        else:
+            outro = aleatorio.choice(tokens)
+            novo = fonte[outro.index:outro.end]
+        fonte = fonte[:tok.index] + f' {novo} ' + fonte[tok.index:]
+    return fonte
+
+def _resumo(resultado):
+    return (resultado.codigo,
+            [(d.linha, d.coluna, d.categoria, d.mensagem) for d in resultado.diagnosticos],
+            [(d.linha, d.coluna, d.mensagem) for d in resultado.avisos])
+
+def comparar_parsers(nome, fonte, otimizacao):
+    """Como comparar(), para os dois parsers."""
+    sly = _resumo(compilar_codigo(fonte, otimizacao, parser='sly'))
+    fast = _resumo(compilar_codigo(fonte, otimizacao, parser='fast'))
+    if sly == fast:
+        return None
+    for campo, a, b in zip(('o C gerado', 'os diagnósticos', 'os avisos'), sly, fast):
+        if a != b:
+            return f'{nome}: {campo} do --parser=fast diferem dos do SLY'
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara a máquina virtual (--vm) com o caminho C + compilador C, "
+                    "ou, com --parsers, o --parser=fast com o SLY.")
+    parser.add_argument('caminhos', nargs='*', metavar='DIR|ARQUIVO',
+                        help='programas .formiga a comparar')
+    parser.add_argument('--aleatorios', type=int, default=0, metavar='N',
+                        help='também gera e compara N programas aleatórios')
+    parser.add_argument('--semente', type=int, default=0,
+                        help='semente do gerador (o programa k usa semente + k)')
+    parser.add_argument('--salvar', metavar='DIR',
+                        help='guarda em DIR os programas em que os dois caminhos divergem')
+    parser.add_argument('-O', dest='otimizacao', type=int, default=0, choices=[0, 1, 2],
+                        metavar='N', help='nível de otimização do compilador .formiga')
+    parser.add_argument('--cc', default=os.environ.get('CC', 'cc'))
+    parser.add_argument('--parsers', action='store_true',
+                        help='compara os dois motores de análise sintática em vez da VM com o C')
+    parser.add_argument('--mutacoes', type=int, default=5, metavar='N',
+                        help='com --parsers, versões estragadas de cada programa (padrão: 5)')
+    args = parser.parse_args()
+    # As cadeias geradas são curtas; aqui elas também viram switch, para que
+    # a conversão do -O1 seja exercitada.
+    c_lasse_trabalhora.MINIMO_ESCADA = 2
+
+    programas = []
+    for caminho in _encontrar_fontes(args.caminhos):
+        with open(caminho, encoding='utf-8') as f:
+            programas.append((caminho, f.read()))
+    for k in range(args.aleatorios):
+        programas.append((f'aleatorio-{args.semente + k}',
+                          GeradorProgramas(args.semente + k).programa()))
+    if args.parsers:
+        aleatorio = random.Random(args.semente)
+        programas += [(f'{nome}~{k}', mutar(aleatorio, fonte))
+                      for nome, fonte in list(programas) for k in range(args.mutacoes)]
+
+    problemas = verificar_regressoes()
+    for problema in problemas:
+        print(problema)
+    divergencias = len(problemas)
+    for nome, fonte in programas:
+        if args.parsers:
+            problema = comparar_parsers(nome, fonte, args.otimizacao)
+        else:
+            problema = comparar(nome, fonte, args.otimizacao, args.cc)
+        if problema is None:
+            continue
+        divergencias += 1
+        print(problema)
+        if args.salvar:
+            os.makedirs(args.salvar, exist_ok=True)
+            with open(os.path.join(args.salvar, os.path.basename(nome).replace('.formiga', '')
+                                   + '.formiga'), 'w', encoding='utf-8') as f:
+                f.write(fonte)
+    print(f"{len(REGRESSOES)} caso(s) de regressão, {len(programas)} programa(s), "
+          f"{divergencias} divergência(s).")
+    sys.exit(1 if divergencias else 0)
+
+if __name__ == "__main__":
+    main()